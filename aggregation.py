@@ -0,0 +1,131 @@
+import sys
+from fractions import Fraction
+import units
+
+class Instance:
+    """One normalized ingredient line from one recipe."""
+    __slots__ = ("raw", "quantity", "unit", "source", "original_name")
+
+    def __init__(self, raw, quantity, unit, source, original_name):
+        self.raw = raw
+        self.quantity = quantity
+        self.unit = unit
+        self.source = source
+        self.original_name = original_name
+
+    def to_dict(self):
+        return {
+            "raw": self.raw,
+            "quantity": self.quantity,
+            "unit": self.unit,
+            "source": self.source,
+            "original_name": self.original_name
+        }
+
+class IngredientGroup:
+    """
+    All instances that share a base name.
+
+    Quantities are summed as plain floats per unit string and combined across
+    units once, when the group is serialized.
+    """
+    __slots__ = ("base_name", "likely_have", "instances", "task_ids", "totals")
+
+    def __init__(self, base_name, likely_have):
+        self.base_name = base_name
+        self.likely_have = likely_have
+        self.instances = []
+        self.task_ids = []
+        self.totals = {}  # unit -> [magnitude, item count], in first-seen order
+
+    def add(self, instance, task_id, magnitude, unit):
+        self.instances.append(instance)
+        # Tasks are folded in one at a time, so a repeat is always the last id
+        if not self.task_ids or self.task_ids[-1] != task_id:
+            self.task_ids.append(task_id)
+        total = self.totals.get(unit)
+        if total is None:
+            self.totals[unit] = [magnitude, 1]
+        else:
+            total[0] += magnitude
+            total[1] += 1
+
+    def absorb(self, other):
+        """Take over another group's instances and totals (a near-duplicate name)."""
+        self.instances.extend(other.instances)
+        for task_id in other.task_ids:
+            if task_id not in self.task_ids:
+                self.task_ids.append(task_id)
+        for unit, (magnitude, count) in other.totals.items():
+            total = self.totals.get(unit)
+            if total is None:
+                self.totals[unit] = [magnitude, count]
+            else:
+                total[0] += magnitude
+                total[1] += count
+
+    def total_quantity(self):
+        """Sum of all instances in the first unit seen (see units.sum_quantities)."""
+        return units.sum_quantities(self.totals)
+
+    def to_dict(self, name):
+        return {
+            "base_name": self.base_name,
+            "name": name,
+            "instances": [instance.to_dict() for instance in self.instances],
+            "original_task_ids": list(self.task_ids),
+            "likely_have": self.likely_have
+        }
+
+def parse_quantity(qty_str):
+    """'1 1/2' -> 1.5, '1/2' -> 0.5, '2-3' -> 3.0 (upper bound of a range)."""
+    if "/" in qty_str and " " in qty_str:
+        parts = qty_str.split()
+        return float(parts[0]) + float(Fraction(parts[1]))
+    if "/" in qty_str:
+        return float(Fraction(qty_str))
+    if "-" in qty_str:
+        return float(qty_str.split("-")[-1])
+    return float(qty_str)
+
+def add_ingredient(groups, item, norm, task_id, is_likely_have):
+    """Fold one (item, norm) pair into `groups`, a dict of base name -> IngredientGroup."""
+    base_name = norm["name"]
+    unit = norm["unit"]
+    try:
+        magnitude = parse_quantity(norm["quantity"])
+        total_unit = sys.intern(unit if unit else "count")
+    except Exception as e:
+        print(f"Quantity parsing error for {norm}: {e}")
+        magnitude, total_unit = 1.0, "count"
+
+    group = groups.get(base_name)
+    if group is None:
+        group = groups[base_name] = IngredientGroup(base_name, is_likely_have(base_name))
+    group.add(Instance(item["raw"], norm["quantity"], sys.intern(unit) if isinstance(unit, str) else unit,
+                       sys.intern(item["source"]), base_name),
+              task_id, magnitude, total_unit)
+
+def merge_groups(groups, renames):
+    """
+    Fold groups into their representatives, per `renames` ({base_name: representative}).
+    A merged group takes the position of its first-seen member and the
+    representative's likely_have flag; instances keep their original_name.
+    """
+    if not renames:
+        return groups
+    merged = {}
+    for base_name, group in groups.items():
+        target = renames.get(base_name, base_name)
+        into = merged.get(target)
+        if into is None:
+            if target == base_name:
+                merged[target] = group
+                continue
+            into = merged[target] = IngredientGroup(target, groups[target].likely_have)
+        into.absorb(group)
+    return merged
+
+def serialize(groups, format_name):
+    """The scan payload's ingredient list: one dict per group, named by format_name(base_name, total_qty)."""
+    return [group.to_dict(format_name(group.base_name, group.total_quantity())) for group in groups.values()]
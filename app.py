@@ -4,53 +4,78 @@ import secrets
 import signal
 import sys
 from flask import Flask, render_template, redirect, request, session, url_for, jsonify
-import requests
 from concurrent.futures import ThreadPoolExecutor
-from recipe_scrapers import scrape_me
 from dotenv import load_dotenv
-from openai import OpenAI
 import re
 import json
+import queue
+import hashlib
 from datetime import datetime
 from flask import Response, stream_with_context
 import database
-from fractions import Fraction
-from pint import UnitRegistry
-
-# Initialize Pint unit registry
-ureg = UnitRegistry()
-# Define a base unit for simple counts
-ureg.define('count = [count]')
-# Define some common culinary units that might not be in default pint or need aliases
-ureg.define('pinch = 0.0625 * teaspoon')
-ureg.define('dash = 0.125 * teaspoon')
-ureg.define('clove = 1 * count') # garlic cloves
-ureg.define('can = 1 * count')
-ureg.define('jar = 1 * count')
-ureg.define('package = 1 * count')
-ureg.define('pkg = 1 * package')
-ureg.define('bunch = 1 * count')
-ureg.define('head = 1 * count')
-ureg.define('bag = 1 * count')
-ureg.define('slice = 1 * count')
-ureg.define('piece = 1 * count')
-ureg.define('box = 1 * count')
-ureg.define('container = 1 * count')
-ureg.define('bottle = 1 * count')
-ureg.define('stalk = 1 * count')
-ureg.define('sprig = 1 * count')
+from cache import LRUCache
+import aggregation
+import fuzzy
+import ingredient_parser
+import units
+from lazy import LazyProxy, once
+from ticktick_client import TickTickClient
+import packages
+import pantry
+import reconcile
+import jobs
 
 # Load environment variables
 load_dotenv()
 
+# Session signing key: SECRET_KEY, else a key generated once and kept next to the database,
+# so every worker process (and every restart) accepts the same session cookies
+SECRET_KEY_FILE = os.getenv("SECRET_KEY_FILE",
+                            os.path.join(os.path.dirname(os.getenv("DB_PATH", "meal_planner.db")), "secret_key"))
+
+def load_secret_key():
+    key = os.getenv("SECRET_KEY")
+    if key:
+        return key
+    if not os.path.exists(SECRET_KEY_FILE):
+        tmp_path = f"{SECRET_KEY_FILE}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # Linking is atomic and fails if another worker created the file first; its key wins
+            os.link(tmp_path, SECRET_KEY_FILE)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(SECRET_KEY_FILE) as f:
+        return f.read().strip()
+
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)
 
-# Initialize DB
-try:
-    database.init_db()
-except Exception as e:
-    print(f"Database initialization failed: {e}. This is expected in some test environments.")
+class LazyKeySessionInterface(type(app.session_interface)):
+    """Flask's cookie sessions, loading the signing key on first use so importing app never writes a key file."""
+
+    def get_signing_serializer(self, app):
+        if not app.secret_key:
+            app.secret_key = load_secret_key()  # every thread/worker gets the same key
+        return super().get_signing_serializer(app)
+
+app.session_interface = LazyKeySessionInterface()
+
+# Initialize DB on the first request rather than at import
+@once
+def ensure_db():
+    try:
+        database.init_db()
+        jobs.fail_stale()
+    except Exception as e:
+        print(f"Database initialization failed: {e}. This is expected in some test environments.")
+
+@app.before_request
+def init_db_before_request():
+    ensure_db()
 
 # TickTick Config
 CLIENT_ID = os.getenv("TICKTICK_CLIENT_ID")
@@ -59,50 +84,90 @@ REDIRECT_URI = "http://127.0.0.1:5000/callback"
 
 # LLM Config
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "default")
-if LLM_PROVIDER == "gemini":
-    llm_client = OpenAI(
-        api_key=os.getenv("GEMINI_API_KEY"),
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-        timeout=60.0
-    )
-    LLM_MODEL = "gemini-3-flash-preview"
-else:
-    llm_client = OpenAI(
+LLM_MODEL = "gemini-3-flash-preview" if LLM_PROVIDER == "gemini" else "default"
+
+def build_llm_client():
+    # openai pulls in pydantic/httpx, so it is imported with the first LLM call
+    from openai import OpenAI
+    if LLM_PROVIDER == "gemini":
+        return OpenAI(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+            timeout=60.0
+        )
+    return OpenAI(
         base_url=os.getenv("LLM_HOST"),
         api_key="sk-no-key-required",
         timeout=60.0
     )
-    LLM_MODEL = "default"
+
+llm_client = LazyProxy(build_llm_client)
+
+def scrape_me(url):
+    # recipe_scrapers imports every site scraper up front; defer that to the first URL
+    from recipe_scrapers import scrape_me as _scrape_me
+    return _scrape_me(url)
+
+ticktick = TickTickClient()
 
 # Endpoints
 AUTH_URL = "https://ticktick.com/oauth/authorize"
 TOKEN_URL = "https://ticktick.com/oauth/token"
-API_BASE = "https://api.ticktick.com/open/v1/project"
 TOKEN_FILE = "token.json"
 
 URL_PATTERN = re.compile(r'https?://[^\s\)\>\]\"\'\s]+')
 
-# Caching for project list
-PROJECT_CACHE = {}  # token -> (timestamp, projects)
-CACHE_TTL = 300     # 5 minutes
-
-def get_projects(access_token):
-    now = time.time()
-    if access_token in PROJECT_CACHE:
-        timestamp, projects = PROJECT_CACHE[access_token]
-        if now - timestamp < CACHE_TTL:
-            return projects
-
-    headers = {"Authorization": f"Bearer {access_token}"}
-    try:
-        res = requests.get(API_BASE, headers=headers)
-        if res.status_code == 200:
+# Scan streams: no caching, and no buffering by nginx-style proxies (which would hold back progress)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Scan pipeline: max concurrent workers per stage
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "4"))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "4"))
+NORMALIZE_WORKERS = int(os.getenv("NORMALIZE_WORKERS", "4"))
+
+# Scan-wide normalization packs raw strings into requests of at most this many
+# estimated tokens (prompt lines plus the JSON each line produces)
+NORMALIZE_TOKEN_BUDGET = int(os.getenv("NORMALIZE_TOKEN_BUDGET", "3000"))
+NORMALIZE_TOKENS_PER_ITEM = 30
+# Lines the rule-based parser scores at least this confidently skip the LLM (above 1 disables it)
+PARSER_MIN_CONFIDENCE = float(os.getenv("PARSER_MIN_CONFIDENCE", "0.8"))
+
+# Caching for project list: token hash -> {lowercase name: project id}
+CACHE_TTL = int(os.getenv("PROJECT_CACHE_TTL", "300"))  # 5 minutes
+# Set PROJECT_CACHE_SHARED=1 to also keep project lists in the project_cache table, so
+# workers share one fetch; the memory tier then only holds them for PROJECT_CACHE_MEMORY_TTL
+PROJECT_CACHE_SHARED = os.getenv("PROJECT_CACHE_SHARED", "0") == "1"
+PROJECT_CACHE = LRUCache(maxsize=int(os.getenv("PROJECT_CACHE_SIZE", "64")),
+                         ttl=int(os.getenv("PROJECT_CACHE_MEMORY_TTL", "60")) if PROJECT_CACHE_SHARED else CACHE_TTL)
+
+def index_projects(projects):
+    """Lowercase name -> id; the first project wins on duplicate names, as the old linear scans did."""
+    by_name = {}
+    for p in projects:
+        by_name.setdefault(p.get("name", "").lower(), p["id"])
+    return by_name
+
+def _load_projects(access_token, token_key):
+    projects = database.get_shared_projects(token_key, CACHE_TTL) if PROJECT_CACHE_SHARED else None
+    if projects is None:
+        try:
+            res = ticktick.get_projects(access_token)
+            if res.status_code != 200:
+                return None
             projects = res.json()
-            PROJECT_CACHE[access_token] = (now, projects)
-            return projects
-    except Exception as e:
-        print(f"Error fetching projects: {e}")
-    return None
+        except Exception as e:
+            print(f"Error fetching projects: {e}")
+            return None
+        if PROJECT_CACHE_SHARED:
+            database.save_shared_projects(token_key, projects)
+    return index_projects(projects)
+
+def find_project_id(access_token, name):
+    """Id of the project called `name` (case-insensitive), or None if it is missing or projects can't be fetched."""
+    # Keyed by a hash so raw tokens are never kept in memory or written to the database
+    token_key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:32]
+    by_name = PROJECT_CACHE.get_or_load(token_key, lambda: _load_projects(access_token, token_key))
+    return by_name.get(name.lower()) if by_name is not None else None
 
 def load_token():
     if os.path.exists(TOKEN_FILE):
@@ -149,7 +214,7 @@ def callback():
         "redirect_uri": REDIRECT_URI
     }
     
-    response = requests.post(TOKEN_URL, data=payload)
+    response = ticktick.exchange_code(TOKEN_URL, payload)
     if response.status_code == 200:
         token_data = response.json()
         save_token(token_data) # Save token locally
@@ -163,20 +228,105 @@ def audit():
     logs = database.get_audit_logs(limit=500)
     return render_template("audit.html", logs=logs)
 
+@app.route("/api/admin/recipe_cache/invalidate", methods=["POST"])
+def invalidate_recipe_cache():
+    data = request.json or {}
+    url = data.get("url")
+    # Clearing everything must be asked for, so a misspelled key can't wipe the cache
+    if not url and data.get("all") is not True:
+        return jsonify({"error": 'url is required (or {"all": true} to clear the whole cache)'}), 400
+    removed = database.invalidate_recipe_cache(url)
+    return jsonify({"status": "success", "removed": removed})
+
+@app.route("/api/admin/llm_cache/purge", methods=["POST"])
+def purge_llm_cache():
+    data = request.json or {}
+    title = data.get("title")
+    if not title:
+        return jsonify({"error": "title is required"}), 400
+    title_key = normalize_title(title)
+    LLM_TITLE_CACHE.discard_where(lambda key: key[0] == title_key)
+    removed = database.purge_llm_title_cache(title_key)
+    return jsonify({"status": "success", "removed": removed})
+
+@app.route("/api/admin/cache_stats")
+def cache_stats():
+    stats = database.get_cache_stats()
+    stats["llm_title_memory"] = LLM_TITLE_CACHE.stats()
+    stats["projects_memory"] = PROJECT_CACHE.stats()
+    return jsonify(stats)
+
+@app.route("/api/admin/ticktick_stats")
+def ticktick_stats():
+    return jsonify(ticktick.stats())
+
+@app.route("/api/pantry")
+def get_pantry():
+    return jsonify(database.get_pantry_items())
+
+@app.route("/api/pantry", methods=["POST"])
+def set_pantry_item():
+    data = request.json or {}
+    keyword = (data.get("keyword") or "").strip().lower()
+    exclusions = data.get("exclusions") or []
+    if not keyword or not isinstance(exclusions, list):
+        return jsonify({"error": "keyword (and optionally a list of exclusions) is required"}), 400
+    database.set_pantry_item(keyword, [str(e) for e in exclusions])
+    pantry.invalidate()
+    return jsonify({"status": "success"})
+
+@app.route("/api/pantry/<path:keyword>", methods=["DELETE"])
+def remove_pantry_item(keyword):
+    removed = database.remove_pantry_item(keyword.strip().lower())
+    pantry.invalidate()
+    if not removed:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"status": "success"})
+
+@app.route("/api/analytics")
+def analytics():
+    top = request.args.get("top", 10, type=int)
+    return jsonify(database.get_rollups(top=max(1, min(top, 100))))
+
+EXTRACT_SYSTEM_PROMPT = "You are a helpful culinary assistant. Provide only a simple bulleted list of high-level ingredient names. Do not include any Markdown code blocks, JSON formatting, or preamble/postamble. If no ingredients are needed, return an empty response."
+EXTRACT_GUIDELINES = (
+    "GUIDELINES:\n"
+    "- Keep ingredients high level (spices can be assumed).\n"
+    "- If the input contains multiple distinct dishes or items (e.g., 'Chicken tenders, fries, salad'), treat each one as a 'prepped' item and return them as the ingredients themselves.\n"
+    "- IMPORTANT: If an item is commonly sold pre-made or is a 'prepped' dish (e.g., 'Chicken Tenders', 'Salad Kit', 'Frozen Pizza', 'Risotto', 'Mac n Cheese'), **DO NOT break it down**. Return that item name as the sole ingredient.\n"
+    "- If the entry is a non-recipe item (e.g., 'left overs', 'takeout', 'date night'), return an empty response."
+)
+
+# Dish title -> ingredients. Memory tier in front of the shared llm_title_cache table;
+# the short TTL bounds how long a purge in another worker can be missed.
+LLM_TITLE_CACHE = LRUCache(maxsize=int(os.getenv("LLM_CACHE_SIZE", "512")), ttl=int(os.getenv("LLM_CACHE_MEMORY_TTL", "600")))
+
+def prompt_key(system_prompt):
+    """Fingerprint of a system prompt and model; cached LLM answers are only valid under the same key."""
+    return hashlib.sha256(f"{LLM_MODEL}\n{system_prompt}".encode("utf-8")).hexdigest()[:16]
+
+def normalize_title(title):
+    """Case/whitespace-insensitive form of a dish title used as a cache key."""
+    return " ".join(title.lower().split()).strip(".,!?:;-")
+
 def get_ingredients_from_llm(recipe_name, session_id=None, ignore_recipe=None):
-    system_prompt = "You are a helpful culinary assistant. Provide only a simple bulleted list of high-level ingredient names. Do not include any Markdown code blocks, JSON formatting, or preamble/postamble. If no ingredients are needed, return an empty response."
-    user_prompt = (
-        f"List the ingredients required for a typical version of '{recipe_name}'. \n"
-        "GUIDELINES:\n"
-        "- Keep ingredients high level (spices can be assumed).\n"
-        "- If the input contains multiple distinct dishes or items (e.g., 'Chicken tenders, fries, salad'), treat each one as a 'prepped' item and return them as the ingredients themselves.\n"
-        "- IMPORTANT: If an item is commonly sold pre-made or is a 'prepped' dish (e.g., 'Chicken Tenders', 'Salad Kit', 'Frozen Pizza', 'Risotto', 'Mac n Cheese'), **DO NOT break it down**. Return that item name as the sole ingredient.\n"
-        "- If the entry is a non-recipe item (e.g., 'left overs', 'takeout', 'date night'), return an empty response."
-    )
+    system_prompt = EXTRACT_SYSTEM_PROMPT
+    user_prompt = f"List the ingredients required for a typical version of '{recipe_name}'. \n" + EXTRACT_GUIDELINES
 
     if ignore_recipe:
         user_prompt += f"\n- Ignore the ingredients for {ignore_recipe} since its ingredients are extracted separately."
 
+    cache_key = (normalize_title(recipe_name), ignore_recipe or "", prompt_key(system_prompt + EXTRACT_GUIDELINES))
+    cached = LLM_TITLE_CACHE.get(cache_key)
+    if cached is None:
+        cached = database.get_llm_title_cache(*cache_key)
+        if cached is not None:
+            LLM_TITLE_CACHE.set(cache_key, cached)
+    if cached is not None:
+        if session_id:
+            database.log_event(session_id, "llm_cache_hit", {"recipe": recipe_name, "ingredients": cached})
+        return list(cached)
+
     if session_id:
         database.log_event(session_id, "llm_prompt", {
             "recipe": recipe_name, 
@@ -208,7 +358,10 @@ def get_ingredients_from_llm(recipe_name, session_id=None, ignore_recipe=None):
                 line = re.sub(r'^[\s\-\*\d\.\)]+', '', line).strip()
                 if line:
                     ingredients.append(line)
-            return ingredients
+
+            LLM_TITLE_CACHE.set(cache_key, ingredients)
+            database.save_llm_title_cache(*cache_key, ingredients)
+            return list(ingredients)
         except Exception as e:
             if "503" in str(e) and attempt < max_retries - 1:
                 time.sleep(2 ** attempt) # Exponential backoff
@@ -218,26 +371,22 @@ def get_ingredients_from_llm(recipe_name, session_id=None, ignore_recipe=None):
                 database.log_event(session_id, "llm_error", {"recipe": recipe_name, "error": str(e)})
             raise e
 
-def normalize_ingredients_batch(recipe_ingredients, session_id=None):
-    if not recipe_ingredients:
-        return []
-    
-    ingredients = [i['raw'] for i in recipe_ingredients]
-    
-    system_prompt = (
-        "You are a culinary data specialist. Your task is to normalize raw ingredient strings into structured JSON. \n"
-        "Return a JSON object with an 'ingredients' key containing an array of objects. \n"
-        "Each object must have 'name', 'quantity', 'unit', and 'original_index'. \n"
-        "GUIDELINES:\n"
-        "- 'name': Use the most generic singular noun (e.g., 'Parmesan cheese' -> 'parmesan', 'cannellini beans' -> 'white beans', 'garlic cloves' -> 'garlic').\n"
-        "  CRITICAL (Component Awareness): If an item is a component of another (e.g., 'oil from sun-dried tomatoes'), normalize it to the parent item (e.g., 'sun-dried tomatoes in oil') to ensure they aggregate into a single purchase.\n"
-        "  CRITICAL (Compound Items): If an input has multiple items (e.g., 'Cilantro and avocado'), split them into separate objects with the same 'original_index'.\n"
-        "- 'quantity': A numeric string (e.g., '1', '0.5'). Ignore leading redundant numbers (e.g., '1 15oz can' -> quantity '15').\n"
-        "- 'unit': Standardize to 'cup', 'tbsp', 'oz', 'lb', 'gram', 'clove', 'can', 'pkg', 'piece', 'box', or 'count' (for simple counts).\n"
-        "- 'original_index': The integer index (0-based) from the input list.\n"
-        "CRITICAL: Strip prices (e.g., '($0.63)') and return ONLY the JSON object."
-    )
-    
+NORMALIZE_SYSTEM_PROMPT = (
+    "You are a culinary data specialist. Your task is to normalize raw ingredient strings into structured JSON. \n"
+    "Return a JSON object with an 'ingredients' key containing an array of objects. \n"
+    "Each object must have 'name', 'quantity', 'unit', and 'original_index'. \n"
+    "GUIDELINES:\n"
+    "- 'name': Use the most generic singular noun (e.g., 'Parmesan cheese' -> 'parmesan', 'cannellini beans' -> 'white beans', 'garlic cloves' -> 'garlic').\n"
+    "  CRITICAL (Component Awareness): If an item is a component of another (e.g., 'oil from sun-dried tomatoes'), normalize it to the parent item (e.g., 'sun-dried tomatoes in oil') to ensure they aggregate into a single purchase.\n"
+    "  CRITICAL (Compound Items): If an input has multiple items (e.g., 'Cilantro and avocado'), split them into separate objects with the same 'original_index'.\n"
+    "- 'quantity': A numeric string (e.g., '1', '0.5'). Ignore leading redundant numbers (e.g., '1 15oz can' -> quantity '15').\n"
+    "- 'unit': Standardize to 'cup', 'tbsp', 'oz', 'lb', 'gram', 'clove', 'can', 'pkg', 'piece', 'box', or 'count' (for simple counts).\n"
+    "- 'original_index': The integer index (0-based) from the input list.\n"
+    "CRITICAL: Strip prices (e.g., '($0.63)') and return ONLY the JSON object."
+)
+
+def _normalize_with_llm(ingredients):
+    """Ask the LLM to normalize raw strings. Returns {raw: [norm, ...]} for every string it answered."""
     user_prompt = "Normalize these ingredients:\n" + "\n".join([f"{i}: {ing}" for i, ing in enumerate(ingredients)])
 
     max_retries = 3
@@ -246,41 +395,126 @@ def normalize_ingredients_batch(recipe_ingredients, session_id=None):
             response = llm_client.chat.completions.create(
                 model=LLM_MODEL,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": NORMALIZE_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
                 response_format={"type": "json_object"}
             )
             data = json.loads(response.choices[0].message.content)
             normalized_list = data.get("ingredients", [])
-            
+
             # Match back to original list using original_index
-            results = []
             indexed_norms = {}
             for norm in normalized_list:
                 idx = int(norm.get("original_index", -1))
-                if idx not in indexed_norms:
-                    indexed_norms[idx] = []
-                indexed_norms[idx].append({
+                if not 0 <= idx < len(ingredients):
+                    continue
+                indexed_norms.setdefault(ingredients[idx], []).append({
                     "name": str(norm.get("name", "unknown")),
                     "quantity": str(norm.get("quantity", "1")),
                     "unit": str(norm.get("unit", "count"))
                 })
-
-            for i, item in enumerate(recipe_ingredients):
-                norms = indexed_norms.get(i)
-                if norms:
-                    for n in norms:
-                        results.append((item, n))
-                else:
-                    results.append((item, {"name": item['raw'], "quantity": "1", "unit": "count"}))
-            return results
+            return indexed_norms
         except Exception as e:
             if "503" in str(e) and attempt < max_retries - 1:
                 time.sleep(2 ** attempt)
                 continue
             print(f"Batch Normalization LLM Error: {e}")
-            return [(item, {"name": item['raw'], "quantity": "1", "unit": "count"}) for item in recipe_ingredients]
+            return {}
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for request packing."""
+    return len(text) // 4 + 1
+
+def chunk_by_token_budget(ingredients, budget=None):
+    """
+    Pack raw strings into as few normalization requests as the token budget allows.
+
+    Each line costs its own prompt tokens plus NORMALIZE_TOKENS_PER_ITEM for the JSON
+    it produces; a single oversized line still gets a chunk of its own.
+    """
+    budget = NORMALIZE_TOKEN_BUDGET if budget is None else budget
+    chunks = []
+    current = []
+    used = 0
+    for raw in ingredients:
+        cost = estimate_tokens(f"{len(current)}: {raw}") + NORMALIZE_TOKENS_PER_ITEM
+        if current and used + cost > budget:
+            chunks.append(current)
+            current = []
+            used = 0
+        current.append(raw)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def normalize_ingredient_lists(ingredient_lists, session_id=None, pool=None, fallbacks=None):
+    """
+    Normalize several recipes' ingredients in one scan-wide pass.
+
+    Raw strings are deduplicated across recipes, memo hits are served from the
+    normalization_memo table, and lines the rule-based parser is confident
+    about (PARSER_MIN_CONFIDENCE) are parsed locally. The rest are packed into
+    token-budgeted requests (run concurrently when a pool is given); a line the
+    LLM does not answer falls back to the parser's guess (or the raw string).
+    Returns one list of (item, norm) pairs per input list, in input order; raw
+    strings that fell back are added to the `fallbacks` set if one is given.
+    """
+    raws = [item['raw'] for items in ingredient_lists for item in items]
+    if not raws:
+        return [[] for _ in ingredient_lists]
+
+    key = prompt_key(NORMALIZE_SYSTEM_PROMPT)
+    memo = database.get_normalization_memo(key, raws)
+
+    parsed = {}
+    misses = []
+    for raw in dict.fromkeys(raws):
+        if raw in memo:
+            continue
+        norm, confidence = ingredient_parser.parse_ingredient(raw)
+        if norm and confidence >= PARSER_MIN_CONFIDENCE:
+            memo[raw] = [norm]
+        else:
+            misses.append(raw)
+            if norm:
+                parsed[raw] = [norm]
+    if misses:
+        chunks = chunk_by_token_budget(misses)
+        if pool and len(chunks) > 1:
+            answers = list(pool.map(_normalize_with_llm, chunks))
+        else:
+            answers = [_normalize_with_llm(chunk) for chunk in chunks]
+        fresh = {}
+        for answer in answers:
+            fresh.update(answer)
+        if fresh:
+            database.save_normalization_memo(key, fresh)
+            memo.update(fresh)
+        for raw, norms in parsed.items():
+            memo.setdefault(raw, norms)
+        if fallbacks is not None:
+            fallbacks.update(raw for raw in misses if raw not in fresh)
+
+    all_results = []
+    for items in ingredient_lists:
+        results = []
+        for item in items:
+            norms = memo.get(item['raw'])
+            if norms:
+                for n in norms:
+                    results.append((item, n))
+            else:
+                results.append((item, {"name": item['raw'], "quantity": "1", "unit": "count"}))
+        all_results.append(results)
+    return all_results
+
+def normalize_ingredients_batch(recipe_ingredients, session_id=None):
+    """Normalize a single recipe's ingredients into (item, norm) pairs in input order."""
+    if not recipe_ingredients:
+        return []
+    return normalize_ingredient_lists([recipe_ingredients], session_id=session_id)[0]
 
 def normalize_ingredient(text, session_id=None):
     """
@@ -289,257 +523,276 @@ def normalize_ingredient(text, session_id=None):
     results = normalize_ingredients_batch([{"raw": text, "source": "manual", "type": "manual"}], session_id=session_id)
     return results[0][1]
 
-import math
-
 def format_quantity(quantity_obj):
-    """Formats a Pint Quantity object into a readable string and unit."""
-    try:
-        # If it's a volume, try to simplify to cups/tbsp/tsp
-        if quantity_obj.check('[volume]'):
-            if quantity_obj >= ureg.cup:
-                val = quantity_obj.to(ureg.cup)
-                return f"{round(val.magnitude, 2)}".rstrip('0').rstrip('.'), "cup"
-            if quantity_obj >= ureg.tablespoon:
-                val = quantity_obj.to(ureg.tablespoon)
-                return f"{round(val.magnitude, 2)}".rstrip('0').rstrip('.'), "tbsp"
-            val = quantity_obj.to(ureg.teaspoon)
-            return f"{round(val.magnitude, 2)}".rstrip('0').rstrip('.'), "tsp"
-        
-        # If it's a weight, try to simplify to lbs/oz
-        if quantity_obj.check('[mass]'):
-            if quantity_obj >= ureg.pound:
-                val = quantity_obj.to(ureg.pound)
-                return f"{round(val.magnitude, 2)}".rstrip('0').rstrip('.'), "lb"
-            val = quantity_obj.to(ureg.ounce)
-            return f"{round(val.magnitude, 2)}".rstrip('0').rstrip('.'), "oz"
-            
-        # Default fallback
-        m = round(quantity_obj.magnitude, 2)
-        m_str = f"{m}".rstrip('0').rstrip('.')
-        u_str = str(quantity_obj.units)
-        if u_str == "count": u_str = ""
-        return m_str, u_str
-    except:
-        return str(round(quantity_obj.magnitude, 2)), str(quantity_obj.units)
-
-PACKAGE_SIZES = [
-    {"keywords": ["pasta", "penne", "spaghetti", "linguine", "fusilli", "rotini", "macaroni", "noodles"], "size": 16 * ureg.ounce, "unit": "box"},
-    {"keywords": ["tuna"], "size": 5 * ureg.ounce, "unit": "can"},
-    {"keywords": ["black beans", "kidney beans", "garbanzo beans", "chickpeas", "cannellini beans"], "size": 15 * ureg.ounce, "unit": "can"},
-    {"keywords": ["diced tomatoes", "crushed tomatoes", "tomato sauce", "tomato puree"], "size": 14.5 * ureg.ounce, "unit": "can"},
-    {"keywords": ["broth", "stock"], "size": 32 * ureg.ounce, "unit": "carton"},
-    {"keywords": ["rice"], "size": 32 * ureg.ounce, "unit": "bag"},
-]
+    """Formats a quantity into a readable (amount, unit) pair of strings."""
+    return units.format_quantity(quantity_obj)
 
 def format_ingredient_quantity(name, qty_obj):
     """Formats quantity, rounding up to common package sizes if applicable."""
     if not qty_obj:
         return name
     
-    name_lower = name.lower()
-    for entry in PACKAGE_SIZES:
-        if any(kw in name_lower for kw in entry['keywords']):
-            try:
-                # Ensure dimensions match (e.g., both mass)
-                pkg_size = entry['size']
-                if qty_obj.check(pkg_size.dimensionality):
-                    total_in_pkg_unit = qty_obj.to(pkg_size.units).magnitude
-                    pkg_size_mag = pkg_size.magnitude
-                    num_pkgs = math.ceil(total_in_pkg_unit / pkg_size_mag)
-                    
-                    q_str, u_str = format_quantity(qty_obj)
-                    total_desc = f" ({q_str} {u_str})" if u_str else f" ({q_str})"
-                    
-                    unit_name = entry['unit']
-                    if num_pkgs > 1:
-                        if unit_name.endswith('x'): unit_name += "es"
-                        else: unit_name += "s"
-                    
-                    return f"{num_pkgs} {unit_name} {name}{total_desc}"
-            except Exception as e:
-                print(f"Error calculating package size for {name}: {e}")
-                break
+    package = packages.lookup(name)
+    if package is not None:
+        try:
+            # None unless dimensions match (e.g., both mass)
+            num_pkgs = units.packages_needed(qty_obj, package.size)
+            if num_pkgs is not None:
+                q_str, u_str = format_quantity(qty_obj)
+                total_desc = f" ({q_str} {u_str})" if u_str else f" ({q_str})"
+                
+                unit_name = package.unit
+                if num_pkgs > 1:
+                    if unit_name.endswith('x'): unit_name += "es"
+                    else: unit_name += "s"
+                
+                return f"{num_pkgs} {unit_name} {name}{total_desc}"
+        except Exception as e:
+            print(f"Error calculating package size for {name}: {e}")
 
     q_str, u_str = format_quantity(qty_obj)
     if u_str:
         return f"{q_str} {u_str} {name}"
     return f"{q_str} {name}"
 
-LIKELY_HAVE_KEYWORDS = {
-    "salt", "pepper", "black pepper", "kosher salt", "cooking oil", "olive oil", 
-    "vegetable oil", "butter", "unsalted butter", "water", "sugar", "brown sugar", 
-    "flour", "all-purpose flour", "garlic", "garlic powder", "onion powder", 
-    "oregano", "basil", "thyme", "cayenne", "paprika", "cumin", "chili powder", 
-    "soy sauce", "mayonnaise", "ketchup", "mustard", "stock", "broth", "vinegar"
-}
-
 def is_likely_have(name):
-    name_lower = name.lower()
-    for kw in LIKELY_HAVE_KEYWORDS:
-        pattern = r'\b' + re.escape(kw) + r'\b'
-        if re.search(pattern, name_lower):
-            if kw == "pepper":
-                fresh_peppers = ["bell", "chili", "chile", "jalapeno", "serrano", "habanero", "poblano", "sweet", "anaheim"]
-                if any(p in name_lower for p in fresh_peppers):
-                    continue
-            return True
-    return False
+    return pantry.is_likely_have(name)
+
+DAYS_PATTERN = re.compile(r'\b(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|wed|thu|fri|sat|sun)\b[:\-]?\s*', re.IGNORECASE)
+
+def _scrape_stage(i, total_tasks, task, emit):
+    """Stage 1: strip day names, find URLs and scrape the first one that yields ingredients."""
+    title = task.get("title", "")
+    content = task.get("content", "")
+    desc = task.get("desc", "")
+    all_text = DAYS_PATTERN.sub('', f"{title} {content} {desc}")
+    urls = URL_PATTERN.findall(all_text)
+
+    ctx = {
+        "task": task,
+        "recipe_name": title,
+        "recipe_ingredients": [],
+        "scraped_title": None,
+        "llm_text": None,
+    }
 
-def process_tasks(tasks, session_id):
+    if urls:
+        emit({'status': f'[{i+1}/{total_tasks}] Scraping recipe: {title[:50]}...'})
+        for url in urls:
+            try:
+                clean_url = url.strip(').,!? :;')
+                cached = database.get_cached_recipe(clean_url)
+                if cached:
+                    scraped_title, ings = cached
+                else:
+                    scraper = scrape_me(clean_url)
+                    ings = scraper.ingredients()
+                    if ings:
+                        scraped_title = scraper.title()
+                        database.cache_recipe(clean_url, scraped_title, ings)
+                if ings:
+                    for ing in ings:
+                        ctx["recipe_ingredients"].append({"raw": ing, "source": scraped_title, "type": "scrape"})
+                    ctx["recipe_name"] = scraped_title
+                    ctx["scraped_title"] = scraped_title
+                    break
+            except Exception as e:
+                print(f"Failed to scrape {url}: {e}")
+                ctx["incomplete"] = True  # the next scan tries the site again
+
+    # Extract remaining text after scraping URLs
+    remaining_text = all_text
+    for url in urls:
+        remaining_text = remaining_text.replace(url, "")
+    remaining_text = remaining_text.strip('., :-\t\n\r')
+
+    if remaining_text:
+        # Skip LLM if text is likely just the recipe name we already scraped
+        skip_llm = False
+        scraped_title = ctx["scraped_title"]
+        if scraped_title:
+            clean_rem = remaining_text.lower().strip(': ')
+            if not clean_rem or len(clean_rem) < 3:
+                skip_llm = True
+            elif clean_rem in scraped_title.lower() or scraped_title.lower() in clean_rem:
+                skip_llm = True
+
+        if not skip_llm:
+            ctx["llm_text"] = remaining_text
+
+    return ctx
+
+def _llm_stage(i, total_tasks, ctx, session_id, emit):
+    """Stage 2: ask the LLM for ingredients of whatever text the scraper did not cover."""
+    remaining_text = ctx["llm_text"]
+    emit({'status': f'[{i+1}/{total_tasks}] Asking LLM for: {remaining_text[:50]}...'})
+    try:
+        llm_ings = get_ingredients_from_llm(remaining_text, session_id=session_id, ignore_recipe=ctx["scraped_title"])
+        if llm_ings:
+            for ing in llm_ings:
+                ctx["recipe_ingredients"].append({"raw": ing, "source": f"LLM: {remaining_text[:30]}", "type": "llm"})
+    except Exception as e:
+        emit({'status': f'⚠️ LLM failed for {remaining_text[:30]}: {str(e)}'})
+        ctx["incomplete"] = True
+    return ctx
+
+def _aggregate_task(aggregated_ingredients, ctx, session_id):
+    """Stage 4: fold one recipe's normalized ingredients into the running aggregate."""
+    task = ctx["task"]
+    recipe_name = ctx["recipe_name"]
+    recipe_ingredients = ctx["recipe_ingredients"]
+
+    types = list(set(i['type'] for i in recipe_ingredients))
+    source_type = "mixed" if len(types) > 1 else (types[0] if types else "unknown")
+
+    database.log_event(session_id, "raw_ingredients", {
+        "recipe": recipe_name,
+        "source": source_type,
+        "ingredients": [r['raw'] for r in recipe_ingredients]
+    })
+
+    for item, norm in ctx["normalized_results"]:
+        database.log_event(session_id, "normalization", {
+            "input": item["raw"],
+            "output": norm
+        })
+
+        aggregation.add_ingredient(aggregated_ingredients, item, norm, task["id"], is_likely_have)
+
+def _run_stage(events, stage, done_kind, i, *args):
+    """Run one pipeline stage on a worker thread and report its result to the event queue."""
+    try:
+        events.put((done_kind, i, stage(i, *args)))
+    except Exception as e:
+        events.put(("error", i, e))
+
+def task_fingerprint(task):
+    """Hash of the task text a scan reads, plus the LLM prompts/model, so changing either invalidates it."""
+    text = json.dumps([task.get("title", ""), task.get("content", ""), task.get("desc", ""),
+                       prompt_key(EXTRACT_SYSTEM_PROMPT + EXTRACT_GUIDELINES), prompt_key(NORMALIZE_SYSTEM_PROMPT)])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def _reuse_task_results(tasks):
+    """{index: ctx} for tasks whose stored result from an earlier scan still matches their fingerprint."""
+    previous = database.get_task_results([task["id"] for task in tasks if task.get("id")])
+    reused = {}
+    for i, task in enumerate(tasks):
+        entry = previous.get(task.get("id"))
+        if not entry or entry["fingerprint"] != task_fingerprint(task):
+            continue
+        stored = entry["normalized"]
+        ingredients = stored["ingredients"]
+        reused[i] = {
+            "task": task,
+            "recipe_name": entry["recipe_name"],
+            "recipe_ingredients": ingredients,
+            "scraped_title": None,
+            "llm_text": None,
+            "normalized_results": [(ingredients[index], norm) for index, norm in stored["normalized"]],
+        }
+    return reused
+
+def _save_task_results(contexts, session_id, fallbacks):
+    """
+    Remember each freshly processed task's normalized ingredients. Failures are
+    never kept: empty results, tasks where scraping or extraction failed part-way
+    (`incomplete`), and tasks with a line the LLM did not answer (`fallbacks`)
+    are processed again by the next scan.
+    """
+    rows = []
+    for ctx in contexts:
+        ingredients = ctx["recipe_ingredients"]
+        if not ingredients or not ctx["task"].get("id") or ctx.get("incomplete"):
+            continue
+        if any(item["raw"] in fallbacks for item in ingredients):
+            continue
+        positions = {id(item): index for index, item in enumerate(ingredients)}
+        stored = {"ingredients": ingredients,
+                  "normalized": [[positions[id(item)], norm] for item, norm in ctx["normalized_results"]]}
+        rows.append((ctx["task"]["id"], task_fingerprint(ctx["task"]), ctx["recipe_name"], stored))
+    if rows:
+        database.save_task_results(session_id, rows)
+
+def process_tasks(tasks, session_id, incremental=False):
+    """
+    Scan tasks as a pipeline: scrape -> LLM extraction -> normalization -> aggregation.
+
+    Scraping and LLM extraction run per task on their own bounded pools, so
+    different tasks overlap in different stages. Normalization then runs once
+    for the whole scan (see normalize_ingredient_lists). Status events are
+    streamed as they happen. Aggregation runs on the calling thread in task
+    order, so the final payload is the same as a sequential scan.
+
+    With incremental=True, tasks whose text is unchanged since an earlier
+    scan reuse that scan's normalized ingredients (task_results), and only
+    new or edited tasks go through scraping, the LLM and normalization.
+    """
     try:
         total_tasks = len(tasks)
         aggregated_ingredients = {}
         skipped_meals = []
 
-        days_pattern = re.compile(r'\b(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|mon|tue|wed|thu|fri|sat|sun)\b[:\-]?\s*', re.IGNORECASE)
-
-        for i, task in enumerate(tasks):
-            title = task.get("title", "")
-            content = task.get("content", "")
-            desc = task.get("desc", "")
-            all_text = f"{title} {content} {desc}"
-
-            all_text = days_pattern.sub('', all_text)
-            urls = URL_PATTERN.findall(all_text)
-
-            recipe_ingredients = []
-            recipe_name = title
-            scraped_successfully = False
-            scraped_title = None
-
-            if urls:
-                yield f"data: {json.dumps({'status': f'[{i+1}/{total_tasks}] Scraping recipe: {title[:50]}...'})}\n\n"
-                for url in urls:
-                    try:
-                        clean_url = url.strip(').,!? :;')
-                        scraper = scrape_me(clean_url)
-                        ings = scraper.ingredients()
-                        if ings:
-                            scraped_title = scraper.title()
-                            for ing in ings:
-                                recipe_ingredients.append({"raw": ing, "source": scraped_title, "type": "scrape"})
-                            recipe_name = scraped_title
-                            scraped_successfully = True
-                            break
-                    except Exception as e:
-                        print(f"Failed to scrape {url}: {e}")
-
-            # Extract remaining text after scraping URLs
-            remaining_text = all_text
-            for url in urls:
-                remaining_text = remaining_text.replace(url, "")
-            remaining_text = remaining_text.strip('., :-\t\n\r')
-
-            if remaining_text:
-                # Skip LLM if text is likely just the recipe name we already scraped
-                skip_llm = False
-                if scraped_successfully:
-                    clean_rem = remaining_text.lower().strip(': ')
-                    if not clean_rem or len(clean_rem) < 3:
-                        skip_llm = True
-                    elif scraped_title and (clean_rem in scraped_title.lower() or scraped_title.lower() in clean_rem):
-                        skip_llm = True
-                
-                if not skip_llm:
-                    yield f"data: {json.dumps({'status': f'[{i+1}/{total_tasks}] Asking LLM for: {remaining_text[:50]}...'})}\n\n"
-                    try:
-                        llm_ings = get_ingredients_from_llm(remaining_text, session_id=session_id, ignore_recipe=scraped_title if scraped_successfully else None)
-                        if llm_ings:
-                            for ing in llm_ings:
-                                recipe_ingredients.append({"raw": ing, "source": f"LLM: {remaining_text[:30]}", "type": "llm"})
-                    except Exception as e:
-                        yield f"data: {json.dumps({'status': f'⚠️ LLM failed for {remaining_text[:30]}: {str(e)}'})}\n\n"
-
-            if not recipe_ingredients:
-                skipped_meals.append(recipe_name)
-                yield f"data: {json.dumps({'status': f'⏩ Skipping {recipe_name[:30]} (no ingredients found)'})}\n\n"
-                continue
+        events = queue.Queue()
+        emit = lambda status: events.put(("status", None, status))
 
-            # Batch normalize all ingredients for this recipe
-            yield f"data: {json.dumps({'status': f'[{i+1}/{total_tasks}] Normalizing {len(recipe_ingredients)} ingredients...'})}\n\n"
-            
-            # Returns list of (item, norm)
-            normalized_results = normalize_ingredients_batch(recipe_ingredients, session_id=session_id)
+        reused = _reuse_task_results(tasks) if incremental else {}
+        for i, ctx in reused.items():
+            title = ctx["recipe_name"][:50]
+            yield f"data: {json.dumps({'status': f'[{i+1}/{total_tasks}] Unchanged since last scan: {title}'})}\n\n"
 
-            types = list(set(i['type'] for i in recipe_ingredients))
-            source_type = "mixed" if len(types) > 1 else (types[0] if types else "unknown")
+        with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as scrape_pool, \
+             ThreadPoolExecutor(max_workers=LLM_WORKERS) as llm_pool, \
+             ThreadPoolExecutor(max_workers=NORMALIZE_WORKERS) as normalize_pool:
 
-            database.log_event(session_id, "raw_ingredients", {
-                "recipe": recipe_name,
-                "source": source_type,
-                "ingredients": [r['raw'] for r in recipe_ingredients]
-            })
+            for i, task in enumerate(tasks):
+                if i not in reused:
+                    scrape_pool.submit(_run_stage, events, _scrape_stage, "scraped", i, total_tasks, task, emit)
 
-            for item, norm in normalized_results:
-                raw_ing = item["raw"]
-                source_name = item["source"]
+            extracted = dict(reused)
+            while len(extracted) < total_tasks:
+                kind, i, payload = events.get()
 
-                database.log_event(session_id, "normalization", {
-                    "input": raw_ing,
-                    "output": norm
-                })
-
-                base_name = norm["name"]
-                
-                # Create Pint quantity
-                try:
-                    # Handle fractions or ranges in quantity
-                    qty_str = norm["quantity"]
-                    if "/" in qty_str and " " in qty_str:
-                        parts = qty_str.split()
-                        qty_val = float(parts[0]) + float(Fraction(parts[1]))
-                    elif "/" in qty_str:
-                        qty_val = float(Fraction(qty_str))
-                    elif "-" in qty_str:
-                        qty_val = float(qty_str.split("-")[-1]) # Take upper bound
-                    else:
-                        qty_val = float(qty_str)
-                    
-                    unit_str = norm["unit"] if norm["unit"] else "count"
-                    item_qty = qty_val * ureg(unit_str)
-                except Exception as e:
-                    print(f"Pint parsing error for {norm}: {e}")
-                    item_qty = 1 * ureg.count
-
-                if base_name not in aggregated_ingredients:
-                    aggregated_ingredients[base_name] = {
-                        "base_name": base_name,
-                        "name": base_name,
-                        "instances": [],
-                        "original_task_ids": set(),
-                        "total_qty": None,
-                        "likely_have": is_likely_have(base_name)
-                    }
-
-                # Add to totals
-                if aggregated_ingredients[base_name]["total_qty"] is None:
-                    aggregated_ingredients[base_name]["total_qty"] = item_qty
-                else:
-                    try:
-                        aggregated_ingredients[base_name]["total_qty"] += item_qty
-                    except Exception as e:
-                        try:
-                            aggregated_ingredients[base_name]["total_qty"] += item_qty.to(aggregated_ingredients[base_name]["total_qty"].units)
-                        except:
-                            pass
-
-                aggregated_ingredients[base_name]["instances"].append({
-                    "raw": raw_ing,
-                    "quantity": norm["quantity"],
-                    "unit": norm["unit"],
-                    "source": source_name,
-                    "original_name": norm["name"]
-                })
-                aggregated_ingredients[base_name]["original_task_ids"].add(task["id"])
+                if kind == "status":
+                    yield f"data: {json.dumps(payload)}\n\n"
+                    continue
+                if kind == "error":
+                    raise payload
 
-        results = []
-        for k, v in aggregated_ingredients.items():
-            v["original_task_ids"] = list(v["original_task_ids"])
+                ctx = payload
+                if kind == "scraped" and ctx["llm_text"]:
+                    llm_pool.submit(_run_stage, events, _llm_stage, "extracted", i, total_tasks, ctx, session_id, emit)
+                    continue
+                extracted[i] = ctx
+
+            contexts = [extracted[i] for i in range(total_tasks)]
+            recipes = [ctx for i, ctx in enumerate(contexts) if ctx["recipe_ingredients"] and i not in reused]
+            if recipes:
+                total_ings = sum(len(ctx["recipe_ingredients"]) for ctx in recipes)
+                yield f"data: {json.dumps({'status': f'Normalizing {total_ings} ingredients from {len(recipes)} recipes...'})}\n\n"
+                # Returns one list of (item, norm) per recipe
+                fallbacks = set()
+                normalized = normalize_ingredient_lists([ctx["recipe_ingredients"] for ctx in recipes], session_id=session_id,
+                                                        pool=normalize_pool, fallbacks=fallbacks)
+                for ctx, normalized_results in zip(recipes, normalized):
+                    ctx["normalized_results"] = normalized_results
+                if incremental:
+                    _save_task_results(recipes, session_id, fallbacks)
+
+        for ctx in contexts:
+            if not ctx["recipe_ingredients"]:
+                recipe_name = ctx["recipe_name"]
+                skipped_meals.append(recipe_name)
+                yield f"data: {json.dumps({'status': f'⏩ Skipping {recipe_name[:30]} (no ingredients found)'})}\n\n"
+                continue
+            _aggregate_task(aggregated_ingredients, ctx, session_id)
 
-            qty_obj = v.pop("total_qty")
-            v["name"] = format_ingredient_quantity(v["base_name"], qty_obj)
+        # Near-duplicate base names ("parmesan", "parmesan cheese") become one card
+        renames = fuzzy.cluster_names({name: len(group.instances) for name, group in aggregated_ingredients.items()})
+        if renames:
+            database.log_event(session_id, "fuzzy_merge", renames)
+            aggregated_ingredients = aggregation.merge_groups(aggregated_ingredients, renames)
 
-            results.append(v)
+        results = aggregation.serialize(aggregated_ingredients, format_ingredient_quantity)
 
         database.log_event(session_id, "aggregation", {"result": results})
         database.log_event(session_id, "skipped_meals", skipped_meals)
@@ -561,31 +814,26 @@ def scan_meals():
     input_list_name = data.get("input_list_name", "Week's Meal Ideas")
     target_section_name = "Weekly Plan"
 
+    session_id = database.create_session()
+
     def generate():
-        session_id = database.create_session()
         database.log_event(session_id, "start_scan", {"input_list": input_list_name})
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-        
         # 1. Find Project ID by Name
         yield f"data: {json.dumps({'status': f'Finding list: {input_list_name}'})}\n\n"
-        projects = get_projects(access_token)
-        target_project_id = None
-        
-        if projects:
-            for p in projects:
-                if p.get("name", "").lower() == input_list_name.lower():
-                    target_project_id = p["id"]
-                    break
-        
+        target_project_id = find_project_id(access_token, input_list_name)
         if not target_project_id:
             yield f"data: {json.dumps({'error': f'Could not find list named {input_list_name}'})}\n\n"
             return
 
         # 2. Fetch Tasks and Columns
         yield f"data: {json.dumps({'status': 'Fetching tasks...'})}\n\n"
-        tasks_url = f"{API_BASE}/{target_project_id}/data"
-        tasks_res = requests.get(tasks_url, headers=headers)
+        try:
+            tasks_res = ticktick.get_project_data(access_token, target_project_id)
+        except Exception as e:
+            print(f"Error fetching tasks: {e}")
+            yield f"data: {json.dumps({'error': 'Could not fetch tasks from TickTick'})}\n\n"
+            return
         
         plan_tasks = []
         if tasks_res.status_code == 200:
@@ -601,9 +849,9 @@ def scan_meals():
             
             plan_tasks = [t for t in tasks if not target_column_id or t.get("columnId") == target_column_id]
 
-        yield from process_tasks(plan_tasks, session_id)
+        yield from process_tasks(plan_tasks, session_id, incremental=True)
 
-    return Response(stream_with_context(generate()), mimetype="text/event-stream")
+    return start_scan_job(session_id, generate)
 
 @app.route("/api/test_scan", methods=["POST"])
 def test_scan():
@@ -611,8 +859,9 @@ def test_scan():
     tasks_data = data.get("tasks", [])
     raw_text = data.get("text", "")
 
+    session_id = database.create_session()
+
     def generate():
-        session_id = database.create_session()
         database.log_event(session_id, "start_test_scan", {"input_tasks": tasks_data, "input_text": raw_text})
 
         # Parse text into dummy tasks
@@ -638,7 +887,53 @@ def test_scan():
 
         yield from process_tasks(tasks, session_id)
 
-    return Response(stream_with_context(generate()), mimetype="text/event-stream")
+    return start_scan_job(session_id, generate)
+
+def start_scan_job(session_id, generate):
+    """
+    Run a scan as a background job and stream its events. The first event is
+    {"job_id": ...}; the rest carry no `id:` lines so existing readers parse
+    them unchanged, and the k-th one after job_id is event k of
+    /api/scans/<job_id>/events. Closing this stream does not stop the scan.
+    """
+    job = jobs.start(session_id, generate)
+
+    def stream():
+        yield f"data: {json.dumps({'job_id': session_id})}\n\n"
+        for item in job.follow():
+            yield ": heartbeat\n\n" if item is None else f"data: {json.dumps(item[1])}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+@app.route("/api/scans/<session_id>/events")
+def scan_job_events(session_id):
+    """A scan's events as `id:`/`data:` pairs; reconnecting with Last-Event-ID replays only the events after it."""
+    if database.get_scan_job(session_id) is None:
+        return jsonify({"error": "Unknown scan"}), 404
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or "0"
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    def stream():
+        for item in jobs.follow(session_id, after):
+            if item is None:
+                yield ": heartbeat\n\n"
+            else:
+                seq, event = item
+                yield f"id: {seq}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+@app.route("/api/scans/<session_id>/result")
+def scan_job_result(session_id):
+    """Final payload of a scan: 202 while it is still running, then its ingredients (or its error)."""
+    job = database.get_scan_job(session_id)
+    if job is None:
+        return jsonify({"error": "Unknown scan"}), 404
+    if job["status"] == "running" and database.fail_stale_scan_jobs(jobs.SCAN_JOB_STALE_AFTER, session_id):
+        job = database.get_scan_job(session_id)
+    if job["status"] == "running":
+        return jsonify({"status": "running"}), 202
+    return jsonify(dict(job["result"], status=job["status"]))
 
 @app.route("/api/create_grocery_list", methods=["POST"])
 def create_grocery_list():
@@ -710,13 +1005,11 @@ def create_grocery_list():
         if session_id:
             database.log_event(session_id, "rejections", rejected_items)
 
-    # Audit Log: Record all selected items
+    # Audit Log: Record all outcomes and mark the session complete in one transaction
     if session_id:
-        # First, mark session complete
-        database.complete_session(session_id)
-
         selected_objects = data.get("selected_objects", [])
-        
+        audit_rows = []
+
         # Collect raw ingredients flagged as bad info to merge into outcomes
         bad_info_raws = set()
         for item in bad_info_items:
@@ -733,15 +1026,8 @@ def create_grocery_list():
                 outcome = "added"
                 if raw in bad_info_raws:
                     outcome += "_ai_error"
-                
-                database.log_audit(
-                    session_id, 
-                    raw, 
-                    base_name, 
-                    final_name, 
-                    inst.get('source'), 
-                    outcome
-                )
+
+                audit_rows.append((raw, base_name, final_name, inst.get('source'), outcome))
 
         # 2. Rejections
         for rej in rejected_items:
@@ -749,12 +1035,14 @@ def create_grocery_list():
                 outcome = f"rejected_{rej.get('reason')}"
                 if raw in bad_info_raws:
                     outcome += "_ai_error"
-                    
-                database.log_audit(session_id, raw, rej.get('name'), rej.get('name'), "Unknown", outcome)
+
+                audit_rows.append((raw, rej.get('name'), rej.get('name'), "Unknown", outcome))
 
         # 3. Manual items
         for item in manual_items:
-             database.log_audit(session_id, "N/A", item, item, "Manual Entry", "added_manual")
+            audit_rows.append(("N/A", item, item, "Manual Entry", "added_manual"))
+
+        database.log_audit_bulk(session_id, audit_rows, complete=True)
 
     if not selected_items:
         return jsonify({"status": "No items to add", "bad_info_saved": len(bad_info_items)})
@@ -762,19 +1050,20 @@ def create_grocery_list():
     if test_mode:
         return jsonify({"status": "success", "count": len(selected_items), "test_mode": True})
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    
-    target_project_id = "inbox" # Default
-    projects = get_projects(access_token)
-    if projects:
-        for p in projects:
-            if p.get("name", "").lower() == output_list_name.lower():
-                target_project_id = p["id"]
-                break
-    
+    target_project_id = find_project_id(access_token, output_list_name) or "inbox"
+
+    # Reconcile with the list's open tasks: skip lines already there, update changed quantities
+    open_tasks = []
+    if target_project_id != "inbox":
+        try:
+            res = ticktick.get_project_data(access_token, target_project_id)
+            payload = res.json() if res.status_code == 200 else None
+            if isinstance(payload, dict):
+                open_tasks = payload.get("tasks", [])
+        except Exception as e:
+            print(f"Error fetching {output_list_name} tasks, creating all items: {e}")
+    creates, updates, skips = reconcile.plan(selected_items, open_tasks)
+
     def create_task(item):
         task_payload = {
             "projectId": target_project_id,
@@ -782,25 +1071,44 @@ def create_grocery_list():
             "status": 0
         }
         try:
-            res = requests.post("https://api.ticktick.com/open/v1/task", json=task_payload, headers=headers)
+            res = ticktick.create_task(access_token, task_payload)
             return res.status_code
         except Exception as e:
             print(f"Error creating task for {item}: {e}")
             return 500
 
-    responses = []
+    def update_task(change):
+        task, item = change
+        try:
+            res = ticktick.update_task(access_token, task["id"], {"id": task["id"], "projectId": target_project_id, "title": item})
+            return res.status_code
+        except Exception as e:
+            print(f"Error updating task for {item}: {e}")
+            return 500
+
     with ThreadPoolExecutor(max_workers=5) as executor:
-        responses = list(executor.map(create_task, selected_items))
-        
-    return jsonify({"status": "success", "count": len(responses)})
+        list(executor.map(create_task, creates))
+        list(executor.map(update_task, updates))
+
+    if session_id:
+        database.log_event(session_id, "grocery_sync", {
+            "created": creates,
+            "updated": [{"from": task["title"], "to": item} for task, item in updates],
+            "skipped": skips
+        })
+
+    return jsonify({"status": "success", "count": len(selected_items),
+                    "created": len(creates), "updated": len(updates), "skipped": len(skips)})
 
 def graceful_shutdown(sig, frame):
     print("Shutting down gracefully...")
+    database.flush_events()
     database.close_db()
     sys.exit(0)
 
-signal.signal(signal.SIGINT, graceful_shutdown)
-signal.signal(signal.SIGTERM, graceful_shutdown)
-
 if __name__ == "__main__":
+    # Development server only; gunicorn.conf.py is the production entry point and
+    # installs its own signal handling (see worker_exit there)
+    signal.signal(signal.SIGINT, graceful_shutdown)
+    signal.signal(signal.SIGTERM, graceful_shutdown)
     app.run(host="0.0.0.0", debug=True)
@@ -1,40 +1,76 @@
+import argparse
 import database
-import json
-from collections import Counter
 
-def perform_audit():
-    # Fetch a larger sample for analysis
-    logs = database.get_audit_logs(limit=1000)
-    
-    if not logs:
-        print("No audit logs found.")
+def build_filters(since=None, until=None, session_id=None, clauses=()):
+    """WHERE clause and parameters for the common date-range/session filters."""
+    clauses = list(clauses)
+    params = []
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("created_at < ?")
+        params.append(until)
+    if session_id:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+def perform_audit(since=None, until=None, session_id=None):
+    if not (since or until or session_id):
+        # Unfiltered reports come straight from the incrementally maintained rollups
+        rollups = database.get_rollups()
+        print_report(rollups["total_samples"], rollups["outcomes"].items(),
+                     [(r["raw"], r["final"], r["count"]) for r in rollups["top_corrections"]],
+                     [(r["raw"], r["count"]) for r in rollups["top_rejections"]],
+                     [(r["source"], r["count"]) for r in rollups["top_sources"][:5]])
         return
 
+    c = database.get_connection().cursor()
+
+    where, params = build_filters(since, until, session_id)
+    c.execute(f"SELECT COUNT(*) FROM audit_log{where}", params)
+    total = c.fetchone()[0]
+
     # 1. Outcome Distribution
-    outcomes = Counter(l['outcome'] for l in logs)
-    
+    c.execute(f"SELECT outcome, COUNT(*) FROM audit_log{where} GROUP BY outcome ORDER BY COUNT(*) DESC", params)
+    outcomes = c.fetchall()
+
     # 2. Correction Analysis (LLM Normalization)
-    corrections = [l for l in logs if l['correction_made']]
-    common_corrections = Counter((l['ingredient_raw'], l['ingredient_final']) for l in corrections).most_common(10)
-    
+    where_corr, params_corr = build_filters(since, until, session_id, ["correction_made = 1"])
+    c.execute(f"""SELECT ingredient_raw, ingredient_final, COUNT(*) AS n FROM audit_log{where_corr}
+                  GROUP BY ingredient_raw, ingredient_final ORDER BY n DESC LIMIT 10""", params_corr)
+    common_corrections = c.fetchall()
+
     # 3. Rejection Analysis
-    rejections = [l for l in logs if l['outcome'].startswith('rejected')]
-    common_rejections = Counter(l['ingredient_raw'] for l in rejections).most_common(10)
-    
+    where_rej, params_rej = build_filters(since, until, session_id, ["outcome LIKE 'rejected%'"])
+    c.execute(f"""SELECT ingredient_raw, COUNT(*) AS n FROM audit_log{where_rej}
+                  GROUP BY ingredient_raw ORDER BY n DESC LIMIT 10""", params_rej)
+    common_rejections = c.fetchall()
+
     # 4. Source Analysis
-    sources = Counter(l['source_recipe'] for l in logs).most_common(5)
+    c.execute(f"""SELECT source_recipe, COUNT(*) AS n FROM audit_log{where}
+                  GROUP BY source_recipe ORDER BY n DESC LIMIT 5""", params)
+    sources = c.fetchall()
+
+    print_report(total, outcomes, common_corrections, common_rejections, sources)
+
+def print_report(total, outcomes, common_corrections, common_rejections, sources):
+    if not total:
+        print("No audit logs found.")
+        return
 
-    # 5. Summary Report
     print("### Audit Log Trend Analysis")
-    print(f"\n**Total Samples Analyzed:** {len(logs)}")
+    print(f"\n**Total Samples Analyzed:** {total}")
     
     print("\n#### Outcome Distribution")
-    for outcome, count in outcomes.items():
-        percent = (count / len(logs)) * 100
+    for outcome, count in outcomes:
+        percent = (count / total) * 100
         print(f"- {outcome}: {count} ({percent:.1f}%)")
 
     print("\n#### Top 10 LLM Corrections (Raw -> Final)")
-    for (raw, final), count in common_corrections:
+    for raw, final, count in common_corrections:
         print(f"- '{raw}' -> '{final}' (count: {count})")
 
     print("\n#### Top 10 Rejections")
@@ -45,5 +81,13 @@ def perform_audit():
     for source, count in sources:
         print(f"- {source}: {count} ingredients")
 
+def parse_args(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--since", help="only rows created at or after this ISO date/time")
+    parser.add_argument("--until", help="only rows created before this ISO date/time")
+    parser.add_argument("--session", help="only rows from this session id")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    perform_audit()
+    args = parse_args("Summarize user outcomes from the audit_log table.")
+    perform_audit(since=args.since, until=args.until, session_id=args.session)
@@ -0,0 +1,140 @@
+"""
+Compare the old per-item dict/Pint aggregation loop with aggregation.py on a
+synthetic multi-week plan: CPU time and traced allocation.
+
+    python benchmarks/bench_aggregation.py [--weeks 12] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import aggregation
+from app import is_likely_have
+from pint import UnitRegistry
+
+# The registry app.py used to build at import time, for the legacy loop
+ureg = UnitRegistry()
+ureg.define('count = [count]')
+ureg.define('pinch = 0.0625 * teaspoon')
+ureg.define('dash = 0.125 * teaspoon')
+for _name in ("clove", "can", "jar", "package", "bunch", "head", "bag", "slice", "piece", "box",
+              "container", "bottle", "stalk", "sprig"):
+    ureg.define(f'{_name} = 1 * count')
+
+UNITS = ["cup", "tablespoon", "teaspoon", "ounce", "pound", "count", "clove", "can", "", "gram"]
+QUANTITIES = ["1", "2", "1/2", "1 1/2", "3", "2-3", "0.25", "4"]
+
+def make_plan(weeks, seed=7):
+    """(task_id, item, norm) rows for `weeks` of 3 meals a day, ~12 ingredients each."""
+    rng = random.Random(seed)
+    names = [f"ingredient {i}" for i in range(400)] + ["salt", "olive oil", "garlic"]
+    rows = []
+    for t in range(weeks * 21):
+        source = f"Recipe {rng.randrange(150)}"
+        for _ in range(12):
+            name = rng.choice(names)
+            unit = rng.choice(UNITS)
+            qty = rng.choice(QUANTITIES)
+            item = {"raw": f"{qty} {unit} {name}", "source": source, "type": "scrape"}
+            rows.append((f"task-{t}", item, {"name": name, "quantity": qty, "unit": unit}))
+    return rows
+
+def legacy_fold(rows):
+    """The loop process_tasks ran before aggregation.py (per-item Pint quantities and dicts)."""
+    aggregated = {}
+    for task_id, item, norm in rows:
+        base_name = norm["name"]
+        try:
+            qty_str = norm["quantity"]
+            if "/" in qty_str and " " in qty_str:
+                parts = qty_str.split()
+                qty_val = float(parts[0]) + float(Fraction(parts[1]))
+            elif "/" in qty_str:
+                qty_val = float(Fraction(qty_str))
+            elif "-" in qty_str:
+                qty_val = float(qty_str.split("-")[-1])
+            else:
+                qty_val = float(qty_str)
+            unit_str = norm["unit"] if norm["unit"] else "count"
+            item_qty = qty_val * ureg(unit_str)
+        except Exception:
+            item_qty = 1 * ureg.count
+        if base_name not in aggregated:
+            aggregated[base_name] = {"base_name": base_name, "name": base_name, "instances": [],
+                                     "original_task_ids": set(), "total_qty": None,
+                                     "likely_have": is_likely_have(base_name)}
+        group = aggregated[base_name]
+        if group["total_qty"] is None:
+            group["total_qty"] = item_qty
+        else:
+            try:
+                group["total_qty"] += item_qty
+            except Exception:
+                try:
+                    group["total_qty"] += item_qty.to(group["total_qty"].units)
+                except:
+                    pass
+        group["instances"].append({"raw": item["raw"], "quantity": norm["quantity"], "unit": norm["unit"],
+                                   "source": item["source"], "original_name": norm["name"]})
+        group["original_task_ids"].add(task_id)
+    return aggregated
+
+def legacy_serialize(aggregated):
+    results = []
+    for v in aggregated.values():
+        v["original_task_ids"] = list(v["original_task_ids"])
+        qty = v.pop("total_qty")
+        v["name"] = f"{v['base_name']} {qty.magnitude:.2f}"
+        results.append(v)
+    return results
+
+def engine_fold(rows):
+    groups = {}
+    for task_id, item, norm in rows:
+        aggregation.add_ingredient(groups, item, norm, task_id, is_likely_have)
+    return groups
+
+def engine_serialize(groups):
+    return aggregation.serialize(groups, lambda name, qty: f"{name} {qty.magnitude:.2f}")
+
+def measure(fold, serialize, rows, repeat):
+    """Best-of-`repeat` fold and total times, plus memory held after folding and the overall peak."""
+    fold_times, total_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        state = fold(rows)
+        fold_times.append(time.perf_counter() - start)
+        serialize(state)
+        total_times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    state = fold(rows)
+    held = tracemalloc.get_traced_memory()[0]
+    serialize(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(fold_times), min(total_times), held, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_plan(args.weeks)
+    groups = engine_fold(rows)
+    print(f"{args.weeks} weeks, {len(rows)} ingredient instances, {len(groups)} groups")
+    legacy = measure(legacy_fold, legacy_serialize, rows, args.repeat)
+    engine = measure(engine_fold, engine_serialize, rows, args.repeat)
+    print(f"{'':8} {'fold ms':>9} {'total ms':>9} {'held KiB':>9} {'peak KiB':>9}")
+    for label, (fold_time, total_time, held, peak) in (("legacy", legacy), ("engine", engine)):
+        print(f"{label:8} {fold_time * 1000:9.1f} {total_time * 1000:9.1f} {held / 1024:9.0f} {peak / 1024:9.0f}")
+    print(f"fold {legacy[0] / engine[0]:.1f}x faster, total {legacy[1] / engine[1]:.1f}x faster, "
+          f"{legacy[2] / engine[2]:.1f}x less memory held while folding")
+
+if __name__ == "__main__":
+    main()
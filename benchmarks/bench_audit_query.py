@@ -0,0 +1,74 @@
+"""
+Time the /audit page query (database.get_audit_logs) on a large audit_log table,
+before and after the schema-2 indexes.
+
+    python benchmarks/bench_audit_query.py [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+
+OUTCOMES = ["added", "added_ai_error", "rejected_have_it", "rejected_not_needed", "added_manual"]
+
+def populate(conn, rows):
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    batch = []
+    for i in range(rows):
+        created = start + timedelta(seconds=rng.randrange(0, 3 * 365 * 24 * 3600))
+        batch.append((f"session-{i // 40}", f"{i % 7} cup item {i % 5000}", f"item {i % 5000}",
+                      f"{i % 7} cup item {i % 5000}", f"Recipe {i % 300}", rng.choice(OUTCOMES), 0, created.isoformat()))
+        if len(batch) == 50000:
+            conn.executemany("""INSERT INTO audit_log (session_id, ingredient_raw, ingredient_normalized, ingredient_final,
+                                source_recipe, outcome, correction_made, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", batch)
+            batch = []
+    if batch:
+        conn.executemany("""INSERT INTO audit_log (session_id, ingredient_raw, ingredient_normalized, ingredient_final,
+                            source_recipe, outcome, correction_made, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", batch)
+    conn.commit()
+
+def time_query(repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        database.get_audit_logs(limit=500)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_FILE = os.path.join(tmp, "bench.db")
+        database.close_db()
+        conn = database.get_connection()
+        database.migrate(conn, target=1)
+
+        start = time.perf_counter()
+        populate(conn, args.rows)
+        print(f"Inserted {args.rows:,} audit rows in {time.perf_counter() - start:.1f}s")
+
+        before = time_query(args.repeat)
+        print(f"schema v{database.get_schema_version(conn)} (no indexes): get_audit_logs(limit=500) {before:8.1f} ms")
+
+        start = time.perf_counter()
+        database.migrate(conn)
+        print(f"Migrated to schema v{database.get_schema_version(conn)} in {time.perf_counter() - start:.1f}s")
+
+        after = time_query(args.repeat)
+        print(f"schema v{database.get_schema_version(conn)} (indexed):    get_audit_logs(limit=500) {after:8.1f} ms")
+        print(f"Speedup: {before / after:.0f}x")
+        database.close_db()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Time the fuzzy base-name merge on names from audit_log: the trigram index with
+prefix filtering against comparing every pair.
+
+    python benchmarks/bench_fuzzy.py [--db meal_planner.db] [--names 5000] [--threshold 0.75]
+
+Names come from audit_log.ingredient_normalized. When the database has fewer
+than --names distinct ones, the rest are synthesized as plural, descriptor
+and typo variants of ingredient words, and the report says how many.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import fuzzy
+
+WORDS = ["chicken", "beef", "pork", "onion", "garlic", "tomato", "pepper", "rice", "bean", "cheese", "parmesan",
+         "cheddar", "basil", "cilantro", "lime", "lemon", "potato", "carrot", "celery", "spinach", "mushroom",
+         "broth", "sauce", "oil", "vinegar", "sugar", "flour", "butter", "cream", "milk", "yogurt", "egg"]
+MODIFIERS = ["red", "green", "white", "brown", "ground", "smoked", "sweet", "black", "dried", "frozen", "baby"]
+
+def historical_names(path):
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT DISTINCT ingredient_normalized FROM audit_log WHERE ingredient_normalized IS NOT NULL")
+        return [row[0] for row in rows]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+def synthesize(count, seed=11):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        name = " ".join([rng.choice(MODIFIERS)] * rng.randint(0, 1) + rng.sample(WORDS, rng.randint(1, 2)))
+        variant = rng.random()
+        if variant < 0.2:
+            name += "s"
+        elif variant < 0.3:
+            i = rng.randrange(len(name))
+            name = name[:i] + rng.choice("aeiou") + name[i + 1:]
+        elif variant < 0.4:
+            name = "fresh " + name
+        names.add(name)
+    return sorted(names)
+
+def all_pairs(keys, threshold):
+    grams = [fuzzy.trigrams(key) for key in keys]
+    pairs = []
+    for i in range(len(grams)):
+        for j in range(i):
+            shared = len(grams[i] & grams[j])
+            if shared / (len(grams[i]) + len(grams[j]) - shared) >= threshold:
+                pairs.append((j, i))
+    return pairs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=database.DB_FILE)
+    parser.add_argument("--names", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=fuzzy.FUZZY_MERGE_THRESHOLD)
+    args = parser.parse_args()
+
+    history = historical_names(args.db)
+    names = list(dict.fromkeys(history + synthesize(args.names)))[:args.names]
+    keys = list(dict.fromkeys(fuzzy.name_key(name) for name in names))
+    print(f"{len(names)} names ({min(len(history), len(names))} from {args.db} audit_log, rest synthetic), "
+          f"{len(keys)} distinct keys, threshold {args.threshold}")
+
+    start = time.perf_counter()
+    brute = all_pairs(keys, args.threshold)
+    brute_s = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = fuzzy.similar_pairs(keys, args.threshold)
+    indexed_s = time.perf_counter() - start
+    assert set(brute) == set(indexed)
+
+    start = time.perf_counter()
+    renames = fuzzy.cluster_names({name: 1 for name in names}, args.threshold)
+    cluster_s = time.perf_counter() - start
+
+    print(f"  all pairs:     {brute_s * 1000:8.1f} ms  ({len(keys) * (len(keys) - 1) // 2} comparisons)")
+    print(f"  trigram index: {indexed_s * 1000:8.1f} ms  ({len(indexed)} similar pairs, {brute_s / indexed_s:.0f}x)")
+    print(f"  cluster_names: {cluster_s * 1000:8.1f} ms  ({len(renames)} names merged into another)")
+
+if __name__ == "__main__":
+    main()
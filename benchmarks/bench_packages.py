@@ -0,0 +1,70 @@
+"""
+Compare the old linear substring scan over PACKAGE_SIZES with the token-indexed
+package catalog as the catalog grows.
+
+    python benchmarks/bench_packages.py [--names 20000] [--products 6,100,500] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import packages
+
+def legacy_lookup(name, entries):
+    """The scan format_ingredient_quantity used: first entry with a keyword substring of the name."""
+    name_lower = name.lower()
+    for entry in entries:
+        if any(kw in name_lower for kw in entry['keywords']):
+            return entry
+    return None
+
+def make_catalog(base, products, seed=7):
+    """The shipped catalog plus synthetic products, 3 keywords each, up to `products` entries."""
+    rng = random.Random(seed)
+    entries = list(base)
+    for i in range(len(base), products):
+        keywords = [f"product{i} {rng.choice(['sauce', 'mix', 'chips', 'bar'])}" for _ in range(3)]
+        entries.append({"keywords": keywords, "size": rng.choice([8, 12, 16]), "size_unit": "ounce", "unit": "box"})
+    return entries
+
+def make_names(count, seed=7):
+    rng = random.Random(seed)
+    words = ["fresh", "brown", "chicken", "black", "diced", "large", "organic", "rice", "beans", "tomatoes",
+             "broth", "pasta", "onion", "garlic", "spinach", "tuna", "cheddar", "noodles", "licorice"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))) for _ in range(count)]
+
+def best_of(repeat, func, names):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            func(name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=20000)
+    parser.add_argument("--products", default="6,100,500")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(packages.PACKAGE_CATALOG) as f:
+        base = json.load(f)
+    names = make_names(args.names)
+    print(f"{len(names)} names, us/name")
+    print(f"{'products':>9} {'linear scan':>12} {'index':>8}")
+    for products in (int(p) for p in args.products.split(",")):
+        entries = make_catalog(base, products)
+        catalog = packages.PackageCatalog(entries)
+        legacy = best_of(args.repeat, lambda name: legacy_lookup(name, entries), names)
+        indexed = best_of(args.repeat, catalog.lookup, names)
+        print(f"{len(entries):>9} {legacy / len(names) * 1e6:>12.2f} {indexed / len(names) * 1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
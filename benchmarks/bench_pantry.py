@@ -0,0 +1,73 @@
+"""
+Compare the old per-keyword regex loop for is_likely_have with the compiled
+pantry matcher on a synthetic list of ingredient names.
+
+    python benchmarks/bench_pantry.py [--names 100000] [--keywords 0] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database
+import pantry
+
+FRESH_PEPPERS = ["bell", "chili", "chile", "jalapeno", "serrano", "habanero", "poblano", "sweet", "anaheim"]
+
+def legacy_is_likely_have(name, keywords):
+    """The loop app.py ran per name: one \\b-anchored re.search per keyword."""
+    name_lower = name.lower()
+    for kw in keywords:
+        if re.search(r'\b' + re.escape(kw) + r'\b', name_lower):
+            if kw == "pepper" and any(p in name_lower for p in FRESH_PEPPERS):
+                continue
+            return True
+    return False
+
+def make_names(count, seed=7):
+    rng = random.Random(seed)
+    words = ["fresh", "chopped", "red", "green", "large", "boneless", "chicken", "thighs", "tomatoes",
+             "onion", "carrots", "basil", "rice", "beans", "cheddar", "spinach", "lemon", "bell", "pepper"]
+    pantry_words = list(database.PANTRY_SEED)
+    names = []
+    for _ in range(count):
+        parts = [rng.choice(words) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.3:
+            parts.append(rng.choice(pantry_words))
+        names.append(" ".join(parts))
+    return names
+
+def best_of(repeat, func, names):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = sum(1 for name in names if func(name))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, hits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--keywords", type=int, default=0, help="extra synthetic pantry keywords")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    items = dict(database.PANTRY_SEED)
+    items.update({f"staple {i}": [] for i in range(args.keywords)})
+    names = make_names(args.names)
+    matcher = pantry.PantryMatcher(items)
+
+    legacy, legacy_hits = best_of(args.repeat, lambda name: legacy_is_likely_have(name, items), names)
+    compiled, compiled_hits = best_of(args.repeat, matcher.matches, names)
+    assert legacy_hits == compiled_hits, (legacy_hits, compiled_hits)
+
+    print(f"{len(names)} names, {len(items)} pantry keywords, {compiled_hits} likely-have")
+    print(f"  legacy regex loop: {legacy / len(names) * 1e6:6.2f} us/name")
+    print(f"  compiled matcher:  {compiled / len(names) * 1e6:6.2f} us/name  ({legacy / compiled:.1f}x)")
+
+if __name__ == "__main__":
+    main()
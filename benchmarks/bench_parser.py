@@ -0,0 +1,53 @@
+"""
+Measure how many typical recipe lines the rule-based ingredient parser handles
+without the LLM, and how long it takes per line.
+
+    python benchmarks/bench_parser.py [--repeat 2000] [--verbose]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import PARSER_MIN_CONFIDENCE
+from ingredient_parser import parse_ingredient
+
+# Lines in the style recipe-scrapers returns from common recipe sites
+SAMPLE = [
+    "2 cups all-purpose flour", "1 teaspoon baking soda", "1/2 teaspoon salt", "1 cup (2 sticks) unsalted butter, softened",
+    "3/4 cup granulated sugar", "2 large eggs", "1 teaspoon vanilla extract", "2 cups semisweet chocolate chips",
+    "1 tablespoon olive oil", "1 medium onion, diced", "3 cloves garlic, minced", "1 (28 oz) can crushed tomatoes",
+    "1 pound ground beef", "1 (15 oz) can kidney beans, drained and rinsed", "2 tablespoons chili powder",
+    "1 teaspoon ground cumin", "Salt and pepper to taste", "½ cup chopped fresh cilantro", "1 lime, cut into wedges",
+    "8 ounces spaghetti", "1/4 cup grated parmesan cheese", "2 boneless skinless chicken breasts",
+    "1 cup low-sodium chicken broth", "2 tbsp soy sauce", "1 tbsp honey", "1 red bell pepper, sliced",
+    "1 1/2 cups long-grain white rice", "2-3 green onions, thinly sliced", "1 lemon, juiced", "Juice of 1 lemon",
+    "4 oz cream cheese, at room temperature", "1 cup frozen peas", "Fresh basil, for garnish", "1 pinch red pepper flakes",
+    "2 cups shredded mozzarella cheese", "1 head broccoli, cut into florets", "1 avocado ($1.25)",
+    "1/2 cup heavy cream", "1 bay leaf", "2 carrots, peeled and chopped",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="print every line the LLM would still see")
+    args = parser.parse_args()
+
+    local = [raw for raw in SAMPLE if parse_ingredient(raw)[1] >= PARSER_MIN_CONFIDENCE]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for raw in SAMPLE:
+            parse_ingredient(raw)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(local)}/{len(SAMPLE)} lines parsed locally ({len(local) / len(SAMPLE):.0%}) "
+          f"at confidence >= {PARSER_MIN_CONFIDENCE}")
+    print(f"{elapsed / (args.repeat * len(SAMPLE)) * 1e6:.1f} us/line")
+    if args.verbose:
+        for raw in SAMPLE:
+            if raw not in local:
+                print(f"  LLM: {raw}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load-test the production server: concurrent /api/test_scan streams against
+gunicorn (gunicorn.conf.py) with an increasing number of worker processes.
+
+    python benchmarks/bench_serving.py [--workers 1,2,4] [--clients 8] [--scans 32] [--tasks 8] [--llm-delay 0.05]
+
+The LLM is a local stand-in that answers every extraction prompt with plain
+ingredient lines after --llm-delay seconds; the rule-based parser handles
+those lines, so the measured work is this app's own (parsing, aggregation,
+fuzzy merge, SSE streaming, SQLite logging). Every scan uses fresh dish names,
+so nothing is served from the LLM title cache.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Names only, as the extraction prompt asks for
+INGREDIENTS = ["flour", "chicken breast", "garlic", "olive oil", "rice", "tomatoes", "onion", "parmesan cheese",
+               "salt", "butter", "black beans", "milk", "eggs", "red bell pepper", "cilantro"]
+
+def fake_llm(delay):
+    """OpenAI-compatible /chat/completions server; returns (server, base_url)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            body = json.dumps({
+                "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": "bench",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "\n".join(f"- {i}" for i in INGREDIENTS)}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workers, env, port):
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning",
+                             "--access-logfile", "/dev/null"],
+                            cwd=REPO, env=dict(env, GUNICORN_WORKERS=str(workers), PORT=str(port)))
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/admin/cache_stats", timeout=1).read()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+def scan(port, run, tasks):
+    """Stream one test scan to completion; returns seconds."""
+    text = "\n".join(f"Dish {run}-{i}" for i in range(tasks))
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/api/test_scan", data=json.dumps({"text": text}).encode(),
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        events = response.read().decode().strip().split("\n\n")
+    elapsed = time.perf_counter() - start
+    if "ingredients" not in json.loads(events[-1][6:]):
+        raise RuntimeError(f"scan failed: {events[-1]}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent scans")
+    parser.add_argument("--scans", type=int, default=32, help="scans per worker count")
+    parser.add_argument("--tasks", type=int, default=8, help="meal tasks per scan")
+    parser.add_argument("--llm-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    llm, llm_url = fake_llm(args.llm_delay)
+    print(f"{os.cpu_count()} cores, {args.clients} concurrent clients, {args.scans} scans of {args.tasks} tasks")
+    print(f"{'workers':>7} {'scans/s':>8} {'p50 s':>7} {'p95 s':>7}")
+    try:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(os.environ, DB_PATH=os.path.join(tmp, "bench.db"), SECRET_KEY="bench",
+                           LLM_HOST=llm_url, DB_LOG_BUFFERED="1", DB_JOURNAL_MODE="WAL")
+                port = free_port()
+                proc = start_server(workers, env, port)
+                try:
+                    # Concurrent warm-up so every worker has done its lazy imports before timing
+                    with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+                        list(pool.map(lambda run: scan(port, f"warm-{workers}-{run}", 1), range(workers * 4)))
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+                        latencies = sorted(pool.map(lambda run: scan(port, f"{workers}-{run}", args.tasks),
+                                                    range(args.scans)))
+                    wall = time.perf_counter() - start
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{workers:>7} {args.scans / wall:>8.2f} {statistics.median(latencies):>7.2f} {p95:>7.2f}")
+    finally:
+        llm.shutdown()
+
+if __name__ == "__main__":
+    main()
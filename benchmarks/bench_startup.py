@@ -0,0 +1,75 @@
+"""
+Measure app startup in fresh interpreters: an `-X importtime` breakdown of
+`import app`, then import time, time to the first served request, and the
+cost that lazy initialization defers to first use.
+
+    python benchmarks/bench_startup.py [--runs 5] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMING_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get("/")
+first_request = time.perf_counter()
+# Eagerly built trees have no proxy, so there is nothing left to resolve
+getattr(app.llm_client, "resolve", lambda: None)()
+llm = time.perf_counter()
+import recipe_scrapers
+scrapers = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": first_request - start,
+                  "llm_client": llm - first_request, "recipe_scrapers": scrapers - llm}))
+"""
+
+def run(args, cwd):
+    env = dict(os.environ, PYTHONPATH=REPO, DB_PATH=os.path.join(cwd, "startup.db"))
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+def import_breakdown(cwd, top):
+    """(cumulative microseconds, module) for app and the modules it imports directly."""
+    stderr = run(["-X", "importtime", "-c", "import app"], cwd).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if cumulative.strip().isdigit() and depth <= 1:
+            rows.append((int(cumulative), name.strip()))
+    app_row = [row for row in rows if row[1] == "app"]
+    direct = sorted((row for row in rows if row[1] != "app"), reverse=True)[:top]
+    return app_row, direct
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        app_row, direct = import_breakdown(cwd, args.top)
+        print("import app (-X importtime, cumulative):")
+        for cumulative, name in app_row + direct:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        samples = [json.loads(run(["-c", TIMING_SCRIPT], cwd).stdout.strip().splitlines()[-1])
+                   for _ in range(args.runs)]
+
+    print(f"\nmedian of {args.runs} fresh interpreters:")
+    for key, label in (("import", "import app"), ("first_request", "import + first request (GET /)"),
+                       ("llm_client", "deferred: first LLM client use"),
+                       ("recipe_scrapers", "deferred: first recipe scrape import")):
+        print(f"  {statistics.median(s[key] for s in samples) * 1000:8.1f} ms  {label}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class _Flight:
+    """One in-progress load that concurrent callers for the same key wait on."""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with an optional per-entry TTL (seconds)."""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._loading = {}  # key -> _Flight
+        self._lock = threading.Lock()
+
+    def _fresh(self, key):
+        """Unexpired value for key or _MISSING; caller holds the lock."""
+        entry = self._data.get(key)
+        if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+            return entry[1]
+        return _MISSING
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """
+        Cached value for key, else the result of loader(). Loads are single-flight
+        per key: concurrent misses wait for the one call in progress instead of
+        each calling loader. A None result is returned but not cached, and a
+        loader error is raised in every waiting caller.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            value = self._fresh(key)
+            if value is not _MISSING:
+                return value
+            flight = self._loading.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._loading[key] = _Flight()
+                self.loads += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+            if flight.value is not None:
+                self.set(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+            flight.done.set()
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate):
+        """Drop every entry whose key matches predicate. Returns the number dropped."""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "loads": self.loads, "size": len(self._data),
+                    "maxsize": self.maxsize}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
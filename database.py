@@ -3,19 +3,66 @@ import sqlite3
 import json
 import uuid
 import threading
-import shutil
-from datetime import datetime
+import queue
+import time
+import atexit
+import random
+import zlib
+import re
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 DB_FILE = os.getenv("DB_PATH", "meal_planner.db")
-BACKUP_FILE = DB_FILE + ".bak"
+RECIPE_CACHE_TTL = int(os.getenv("RECIPE_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days
+# Online backups: rotating generations written by a background thread
+BACKUP_GENERATIONS = int(os.getenv("DB_BACKUP_GENERATIONS", "3"))
+BACKUP_INTERVAL = float(os.getenv("DB_BACKUP_INTERVAL", "0"))  # seconds; 0 = only when requested
+BACKUP_PAGES_PER_STEP = int(os.getenv("DB_BACKUP_PAGES_PER_STEP", "256"))
+BACKUP_STEP_SLEEP = 0.005  # seconds between steps
+# DELETE mode is the most reliable on container volumes; WAL is optional
+JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "DELETE").upper()
+
+# Buffered event logging: log_event enqueues and a background writer commits in batches
+LOG_BUFFERED = os.getenv("DB_LOG_BUFFERED", "0") == "1"
+LOG_FLUSH_INTERVAL = float(os.getenv("DB_LOG_FLUSH_INTERVAL", "0.5"))  # seconds
+LOG_BATCH_SIZE = int(os.getenv("DB_LOG_BATCH_SIZE", "500"))
+
+# Cache hit/miss counts are kept in memory and added to cache_stats at most this often (seconds)
+CACHE_STATS_FLUSH_INTERVAL = float(os.getenv("CACHE_STATS_FLUSH_INTERVAL", "10"))
+
+# Per-event-type storage policy for the logs table:
+#   compress: always zlib-compress (otherwise only payloads over COMPRESS_MIN_BYTES are)
+#   sample:   fraction of events kept (high-volume, low-value types)
+EVENT_POLICIES = {
+    "aggregation": {"compress": True},
+    "llm_prompt": {"compress": True},
+    "normalization": {"sample": float(os.getenv("LOG_SAMPLE_NORMALIZATION", "1.0"))},
+}
+COMPRESS_MIN_BYTES = int(os.getenv("LOG_COMPRESS_MIN_BYTES", "2048"))
+# Rows folded into the rollups per write transaction, so a long catch-up never holds the lock for long
+ROLLUP_BATCH_SIZE = int(os.getenv("ROLLUP_BATCH_SIZE", "5000"))
+# Retention: logs older than this are rolled up into session_summaries and pruned/archived
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "90"))
+
 _local = threading.local()
 
+def _connect(path):
+    if JOURNAL_MODE not in ("DELETE", "WAL"):
+        raise ValueError(f"Unsupported DB_JOURNAL_MODE: {JOURNAL_MODE}")
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    if JOURNAL_MODE == "WAL":
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 def get_connection():
     """Get a thread-local persistent SQLite connection."""
     if not hasattr(_local, "conn"):
-        _local.conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-        # Switch to DELETE mode for better reliability in container volumes
-        _local.conn.execute("PRAGMA journal_mode=DELETE")
+        _local.conn = _connect(DB_FILE)
     return _local.conn
 
 def close_db():
@@ -28,16 +75,81 @@ def close_db():
         del _local.conn
 
 def backup_db():
-    """Create a simple backup of the database file."""
+    """Ask the background backup thread for a fresh backup. Never blocks the caller."""
+    _start_backup_thread()
+    _backup_done.clear()
+    _backup_requested.set()
+
+def wait_for_backup(timeout=None):
+    """Block until no backup is pending or running. Returns False on timeout."""
+    return _backup_done.wait(timeout)
+
+def backup_path(generation=0):
+    """Path of a backup generation: 0 is the newest (DB_FILE.bak), then DB_FILE.bak.1, ..."""
+    path = DB_FILE + ".bak"
+    return path if generation == 0 else f"{path}.{generation}"
+
+def run_backup():
+    """
+    Copy the live database with SQLite's online backup API and rotate generations.
+
+    Pages are copied BACKUP_PAGES_PER_STEP at a time with a short sleep in between,
+    so writers are never locked out for the whole copy, and the result is a
+    consistent snapshot even if the database changes while it runs. Every
+    worker process may run backups: each copies to its own temporary file and
+    rotation is serialized with a lock file next to the backups.
+    """
+    if not os.path.exists(DB_FILE):
+        return
+    tmp_path = f"{backup_path()}.{os.getpid()}.tmp"
+    src = sqlite3.connect(DB_FILE)
+    dst = sqlite3.connect(tmp_path)
     try:
-        if os.path.exists(DB_FILE):
-            shutil.copy2(DB_FILE, BACKUP_FILE)
-    except Exception as e:
-        print(f"Backup failed: {e}")
+        src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
 
-def init_db():
-    conn = get_connection()
-    c = conn.cursor()
+    with open(backup_path() + ".lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        oldest = backup_path(BACKUP_GENERATIONS - 1)
+        if BACKUP_GENERATIONS > 1 and os.path.exists(oldest):
+            os.remove(oldest)
+        for generation in range(BACKUP_GENERATIONS - 2, -1, -1):
+            if os.path.exists(backup_path(generation)):
+                os.replace(backup_path(generation), backup_path(generation + 1))
+        os.replace(tmp_path, backup_path())
+
+_backup_requested = threading.Event()
+_backup_done = threading.Event()
+_backup_done.set()
+_backup_thread = None
+_backup_thread_lock = threading.Lock()
+
+def _start_backup_thread():
+    global _backup_thread
+    if _backup_thread is not None and _backup_thread.is_alive():
+        return
+    with _backup_thread_lock:
+        if _backup_thread is None or not _backup_thread.is_alive():
+            _backup_thread = threading.Thread(target=_backup_loop, name="db-backup", daemon=True)
+            _backup_thread.start()
+
+def _backup_loop():
+    """Run a backup whenever one is requested, or every BACKUP_INTERVAL seconds if set."""
+    while True:
+        _backup_requested.wait(timeout=BACKUP_INTERVAL or None)
+        _backup_requested.clear()
+        try:
+            run_backup()
+        except Exception as e:
+            print(f"Backup failed: {e}")
+        if not _backup_requested.is_set():
+            _backup_done.set()
+
+def _migration_001_base_schema(c):
+    """Tables that existed before versioned migrations (IF NOT EXISTS keeps old DBs valid)."""
     c.execute('''CREATE TABLE IF NOT EXISTS sessions
                  (id TEXT PRIMARY KEY, created_at TEXT, completed_at TEXT, is_complete INTEGER DEFAULT 0)''')
     c.execute('''CREATE TABLE IF NOT EXISTS logs
@@ -54,7 +166,135 @@ def init_db():
                   correction_made INTEGER DEFAULT 0,
                   created_at TEXT,
                   FOREIGN KEY(session_id) REFERENCES sessions(id))''')
-    conn.commit()
+    c.execute('''CREATE TABLE IF NOT EXISTS recipe_cache
+                 (url TEXT PRIMARY KEY, title TEXT, ingredients TEXT, fetched_at TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS normalization_memo
+                 (prompt_key TEXT, raw TEXT, normalized TEXT, created_at TEXT,
+                  PRIMARY KEY(prompt_key, raw))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS llm_title_cache
+                 (title TEXT, ignore_recipe TEXT, prompt_key TEXT, ingredients TEXT, created_at TEXT,
+                  PRIMARY KEY(title, ignore_recipe, prompt_key))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS cache_stats
+                 (name TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0)''')
+
+def _migration_002_log_indexes(c):
+    """Indexes for the /audit page, per-session event lookups and event-type reports."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_created_at ON audit_log(created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_session ON audit_log(session_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_logs_session_event ON logs(session_id, event_type)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_logs_event_created ON logs(event_type, created_at)")
+
+def _migration_003_log_encoding(c):
+    """Compressed log payloads (encoding NULL = plain JSON text) and per-session rollups."""
+    c.execute("ALTER TABLE logs ADD COLUMN encoding TEXT")
+    c.execute('''CREATE TABLE IF NOT EXISTS session_summaries
+                 (session_id TEXT PRIMARY KEY, created_at TEXT, completed_at TEXT, is_complete INTEGER,
+                  event_counts TEXT, ingredient_count INTEGER, skipped_meals TEXT, summarized_at TEXT)''')
+
+def _migration_004_rollups(c):
+    """Running totals for the analysis reports, maintained by refresh_rollups from a per-table watermark."""
+    c.execute("CREATE TABLE IF NOT EXISTS rollup_watermarks (source TEXT PRIMARY KEY, last_id INTEGER)")
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_outcomes
+                 (day TEXT, outcome TEXT, n INTEGER, PRIMARY KEY(day, outcome))''')
+    c.execute("CREATE TABLE IF NOT EXISTS rollup_rejections (raw TEXT PRIMARY KEY, n INTEGER)")
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_corrections
+                 (raw TEXT, final TEXT, n INTEGER, PRIMARY KEY(raw, final))''')
+    c.execute("CREATE TABLE IF NOT EXISTS rollup_sources (source TEXT PRIMARY KEY, n INTEGER)")
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_events
+                 (day TEXT, event_type TEXT, n INTEGER, PRIMARY KEY(day, event_type))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_normalizations
+                 (raw TEXT, normalized TEXT, n INTEGER, PRIMARY KEY(raw, normalized))''')
+    c.execute("CREATE TABLE IF NOT EXISTS rollup_llm_extractions (ingredient TEXT PRIMARY KEY, n INTEGER)")
+
+# Default pantry (what app.py hard-coded as LIKELY_HAVE_KEYWORDS): keyword -> exclusions.
+# A keyword does not count when the name contains one of its exclusions.
+PANTRY_SEED = {
+    "salt": [], "pepper": ["bell", "chili", "chile", "jalapeno", "serrano", "habanero", "poblano", "sweet", "anaheim"],
+    "black pepper": [], "kosher salt": [], "cooking oil": [], "olive oil": [], "vegetable oil": [],
+    "butter": [], "unsalted butter": [], "water": [], "sugar": [], "brown sugar": [], "flour": [],
+    "all-purpose flour": [], "garlic": [], "garlic powder": [], "onion powder": [], "oregano": [],
+    "basil": [], "thyme": [], "cayenne": [], "paprika": [], "cumin": [], "chili powder": [],
+    "soy sauce": [], "mayonnaise": [], "ketchup": [], "mustard": [], "stock": [], "broth": [], "vinegar": [],
+}
+
+def _migration_005_pantry(c):
+    """Editable pantry keywords; triggers bump pantry_version on every change so matchers can recompile."""
+    c.execute("CREATE TABLE IF NOT EXISTS pantry_items (keyword TEXT PRIMARY KEY, exclusions TEXT, updated_at TEXT)")
+    c.execute("CREATE TABLE IF NOT EXISTS pantry_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER)")
+    c.execute("INSERT OR IGNORE INTO pantry_version (id, version) VALUES (1, 0)")
+    for action in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f"""CREATE TRIGGER IF NOT EXISTS pantry_items_{action.lower()} AFTER {action} ON pantry_items
+                      BEGIN UPDATE pantry_version SET version = version + 1 WHERE id = 1; END""")
+    now = datetime.now().isoformat()
+    c.executemany("INSERT OR IGNORE INTO pantry_items (keyword, exclusions, updated_at) VALUES (?, ?, ?)",
+                  [(keyword, json.dumps(exclusions), now) for keyword, exclusions in PANTRY_SEED.items()])
+
+def _migration_006_task_results(c):
+    """Per-task scan results, so a re-scan only reprocesses meal tasks whose text changed."""
+    c.execute("""CREATE TABLE IF NOT EXISTS task_results
+                 (task_id TEXT PRIMARY KEY, fingerprint TEXT, recipe_name TEXT, normalized TEXT,
+                  session_id TEXT, updated_at TEXT)""")
+
+def _migration_007_project_cache(c):
+    """Project lists shared between worker processes, keyed by a hash of the access token."""
+    c.execute("""CREATE TABLE IF NOT EXISTS project_cache
+                 (token_key TEXT PRIMARY KEY, projects TEXT, fetched_at REAL)""")
+
+def _migration_008_scan_jobs(c):
+    """Background scans: job state and final payload per session, and every progress event for replay."""
+    c.execute("""CREATE TABLE IF NOT EXISTS scan_jobs
+                 (session_id TEXT PRIMARY KEY, status TEXT, result TEXT, created_at TEXT, finished_at TEXT)""")
+    c.execute("""CREATE TABLE IF NOT EXISTS scan_events
+                 (session_id TEXT, seq INTEGER, data TEXT, created_at TEXT, PRIMARY KEY(session_id, seq))""")
+
+def _migration_009_scan_job_owner(c):
+    """Which process runs each scan and when it last made progress, so a dead worker's scans can be failed."""
+    c.execute("ALTER TABLE scan_jobs ADD COLUMN owner_pid INTEGER")
+    c.execute("ALTER TABLE scan_jobs ADD COLUMN updated_at REAL")
+
+def _migration_010_scan_result_encoding(c):
+    """Compressed scan results (encoding NULL = plain JSON text), as for logs."""
+    c.execute("ALTER TABLE scan_jobs ADD COLUMN encoding TEXT")
+
+# Schema version N is reached by applying MIGRATIONS[N-1]. Only ever append.
+MIGRATIONS = [
+    _migration_001_base_schema,
+    _migration_002_log_indexes,
+    _migration_003_log_encoding,
+    _migration_004_rollups,
+    _migration_005_pantry,
+    _migration_006_task_results,
+    _migration_007_project_cache,
+    _migration_008_scan_jobs,
+    _migration_009_scan_job_owner,
+    _migration_010_scan_result_encoding,
+]
+
+def get_schema_version(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn=None, target=None):
+    """Apply pending migrations, each in its own transaction, tracked by PRAGMA user_version."""
+    conn = conn or get_connection()
+    target = len(MIGRATIONS) if target is None else target
+    for version in range(get_schema_version(conn) + 1, target + 1):
+        c = conn.cursor()
+        # IMMEDIATE takes the write lock first, so concurrent workers apply each step once
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) < version:
+                MIGRATIONS[version - 1](c)
+                c.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def init_db():
+    migrate(get_connection())
+    if BACKUP_INTERVAL:
+        _start_backup_thread()
 
 def log_audit(session_id, raw, normalized, final, source, outcome, correction=0):
     conn = get_connection()
@@ -73,13 +313,105 @@ def create_session():
     conn.commit()
     return session_id
 
+def encode_event_data(event_type, data):
+    """Apply the event type's storage policy. Returns (payload, encoding), or None if sampled out."""
+    policy = EVENT_POLICIES.get(event_type, {})
+    sample = policy.get("sample", 1.0)
+    if sample < 1.0 and random.random() >= sample:
+        return None
+    text = json.dumps(data)
+    if policy.get("compress") or len(text) >= COMPRESS_MIN_BYTES:
+        return zlib.compress(text.encode("utf-8")), "zlib"
+    return text, None
+
+def decode_event_data(payload, encoding=None):
+    """Inverse of encode_event_data: returns the logged Python object."""
+    if encoding == "zlib":
+        payload = zlib.decompress(payload).decode("utf-8")
+    return json.loads(payload)
+
 def log_event(session_id, event_type, data):
+    encoded = encode_event_data(event_type, data)
+    if encoded is None:
+        return
+    row = (session_id, event_type, encoded[0], encoded[1], datetime.now().isoformat())
+    if LOG_BUFFERED:
+        _start_event_writer()
+        _event_queue.put(row)
+        return
     conn = get_connection()
     c = conn.cursor()
-    c.execute("INSERT INTO logs (session_id, event_type, data, created_at) VALUES (?, ?, ?, ?)",
-              (session_id, event_type, json.dumps(data), datetime.now().isoformat()))
+    c.execute("INSERT INTO logs (session_id, event_type, data, encoding, created_at) VALUES (?, ?, ?, ?, ?)", row)
     conn.commit()
 
+def iter_events(event_type=None, session_id=None):
+    """Stream (session_id, event_type, data, created_at) with payloads decoded."""
+    query = "SELECT session_id, event_type, data, encoding, created_at FROM logs WHERE 1=1"
+    params = []
+    if event_type:
+        query += " AND event_type = ?"
+        params.append(event_type)
+    if session_id:
+        query += " AND session_id = ?"
+        params.append(session_id)
+    c = get_connection().cursor()
+    c.execute(query + " ORDER BY id", params)
+    for sid, etype, payload, encoding, created_at in c:
+        yield sid, etype, decode_event_data(payload, encoding), created_at
+
+_event_queue = queue.Queue()
+_event_writer = None
+_event_writer_lock = threading.Lock()
+_FLUSH = object()
+
+def _start_event_writer():
+    global _event_writer
+    if _event_writer is not None and _event_writer.is_alive():
+        return
+    with _event_writer_lock:
+        if _event_writer is None or not _event_writer.is_alive():
+            _event_writer = threading.Thread(target=_event_writer_loop, name="event-writer", daemon=True)
+            _event_writer.start()
+
+def _event_writer_loop():
+    """Drain the event queue, committing once per batch or per LOG_FLUSH_INTERVAL."""
+    conn, conn_path = None, None
+    while True:
+        batch = [_event_queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while batch[-1] is not _FLUSH and len(batch) < LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_event_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        rows = [row for row in batch if row is not _FLUSH]
+        try:
+            if rows:
+                if conn_path != DB_FILE:
+                    if conn is not None:
+                        conn.close()
+                    conn, conn_path = _connect(DB_FILE), DB_FILE
+                conn.executemany("INSERT INTO logs (session_id, event_type, data, encoding, created_at) VALUES (?, ?, ?, ?, ?)", rows)
+                conn.commit()
+        except Exception as e:
+            print(f"Event log write failed, dropped {len(rows)} events: {e}")
+        finally:
+            for _ in batch:
+                _event_queue.task_done()
+
+def flush_events():
+    """Block until every buffered event has been committed."""
+    if _event_writer is None or not _event_writer.is_alive():
+        return
+    _event_queue.put(_FLUSH)
+    _event_queue.join()
+
+atexit.register(flush_events)
+
 def get_audit_logs(limit=200):
     conn = get_connection()
     c = conn.cursor()
@@ -91,9 +423,551 @@ def get_audit_logs(limit=200):
         results.append(dict(zip(columns, row)))
     return results
 
+def log_audit_bulk(session_id, rows, complete=False):
+    """
+    Write a whole session's audit outcomes in one transaction.
+
+    rows are (raw, normalized, final, source, outcome[, correction]) tuples. With
+    complete=True the session is marked complete in the same transaction, so either
+    everything is recorded or nothing is.
+    """
+    now = datetime.now().isoformat()
+    params = []
+    for row in rows:
+        raw, normalized, final, source, outcome = row[:5]
+        correction = row[5] if len(row) > 5 else 0
+        params.append((session_id, raw, normalized, final, source, outcome, correction, now))
+
+    conn = get_connection()
+    with conn:
+        c = conn.cursor()
+        if complete:
+            c.execute("UPDATE sessions SET is_complete = 1, completed_at = ? WHERE id = ?", (now, session_id))
+        c.executemany("""INSERT INTO audit_log 
+                         (session_id, ingredient_raw, ingredient_normalized, ingredient_final, source_recipe, outcome, correction_made, created_at) 
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", params)
+    if complete:
+        backup_db()
+
 def complete_session(session_id):
+    log_audit_bulk(session_id, [], complete=True)
+
+_cache_counts = {}  # name -> [hits, misses] not yet in cache_stats
+_cache_counts_db = None  # the DB_FILE they were counted against
+_cache_counts_flushed = time.monotonic()
+_cache_counts_lock = threading.Lock()
+
+def _record_cache_access(name, hits=0, misses=0):
+    """Count cache lookups in memory, so a lookup is never a write; flushed every CACHE_STATS_FLUSH_INTERVAL."""
+    global _cache_counts_db
+    with _cache_counts_lock:
+        if _cache_counts_db != DB_FILE:
+            _cache_counts.clear()
+            _cache_counts_db = DB_FILE
+        counts = _cache_counts.setdefault(name, [0, 0])
+        counts[0] += hits
+        counts[1] += misses
+        due = time.monotonic() - _cache_counts_flushed >= CACHE_STATS_FLUSH_INTERVAL
+    if due:
+        try:
+            flush_cache_stats()
+        except Exception as e:
+            print(f"Cache stats flush failed: {e}")
+
+def flush_cache_stats():
+    """Add the in-memory hit/miss counts to cache_stats in one transaction."""
+    global _cache_counts_flushed
+    with _cache_counts_lock:
+        # Counts taken against another database (tests switch DB_FILE) are dropped
+        pending = [(name, hits, misses) for name, (hits, misses) in _cache_counts.items()] \
+            if _cache_counts_db == DB_FILE else []
+        _cache_counts.clear()
+        _cache_counts_flushed = time.monotonic()
+    if not pending or not os.path.exists(DB_FILE):
+        return
+    conn = get_connection()
+    conn.executemany("""INSERT INTO cache_stats (name, hits, misses) VALUES (?, ?, ?)
+                        ON CONFLICT(name) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses""",
+                     pending)
+    conn.commit()
+
+atexit.register(flush_cache_stats)
+
+def get_cache_stats():
+    flush_cache_stats()
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT name, hits, misses FROM cache_stats")
+    return {name: {"hits": hits, "misses": misses} for name, hits, misses in c.fetchall()}
+
+def get_pantry_version():
+    c = get_connection().cursor()
+    c.execute("SELECT version FROM pantry_version WHERE id = 1")
+    row = c.fetchone()
+    return row[0] if row else 0
+
+def get_pantry_items():
+    """{keyword: [exclusions]} for every pantry item."""
+    c = get_connection().cursor()
+    c.execute("SELECT keyword, exclusions FROM pantry_items ORDER BY keyword")
+    return {keyword: json.loads(exclusions) if exclusions else [] for keyword, exclusions in c.fetchall()}
+
+def set_pantry_item(keyword, exclusions=None):
+    conn = get_connection()
+    conn.execute("INSERT OR REPLACE INTO pantry_items (keyword, exclusions, updated_at) VALUES (?, ?, ?)",
+                 (keyword, json.dumps(exclusions or []), datetime.now().isoformat()))
+    conn.commit()
+
+def remove_pantry_item(keyword):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("DELETE FROM pantry_items WHERE keyword = ?", (keyword,))
+    conn.commit()
+    return c.rowcount
+
+def canonical_url(url):
+    """Normalize a recipe URL so trivially different links share one cache entry."""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+def get_cached_recipe(url, ttl=None):
+    """Return (title, ingredients) for a previously scraped URL, or None on a miss or expiry."""
+    ttl = RECIPE_CACHE_TTL if ttl is None else ttl
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT title, ingredients, fetched_at FROM recipe_cache WHERE url = ?", (canonical_url(url),))
+    row = c.fetchone()
+    hit = row is not None and datetime.fromisoformat(row[2]) > datetime.now() - timedelta(seconds=ttl)
+    _record_cache_access("recipe", hits=int(hit), misses=int(not hit))
+    if not hit:
+        return None
+    return row[0], json.loads(row[1])
+
+def cache_recipe(url, title, ingredients):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO recipe_cache (url, title, ingredients, fetched_at) VALUES (?, ?, ?, ?)",
+              (canonical_url(url), title, json.dumps(ingredients), datetime.now().isoformat()))
+    conn.commit()
+
+def invalidate_recipe_cache(url=None):
+    """Drop one cached recipe, or the whole cache when no URL is given. Returns rows removed."""
+    conn = get_connection()
+    c = conn.cursor()
+    if url:
+        c.execute("DELETE FROM recipe_cache WHERE url = ?", (canonical_url(url),))
+    else:
+        c.execute("DELETE FROM recipe_cache")
+    conn.commit()
+    return c.rowcount
+
+def get_normalization_memo(prompt_key, raws):
+    """Return {raw: [norm, ...]} for every raw string already normalized under prompt_key."""
+    unique = list(dict.fromkeys(raws))
+    conn = get_connection()
+    c = conn.cursor()
+    memo = {}
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(unique), 500):
+        chunk = unique[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT raw, normalized FROM normalization_memo WHERE prompt_key = ? AND raw IN ({placeholders})",
+                  [prompt_key] + chunk)
+        for raw, normalized in c.fetchall():
+            memo[raw] = json.loads(normalized)
+    _record_cache_access("normalization", hits=len(memo), misses=len(unique) - len(memo))
+    return memo
+
+def save_normalization_memo(prompt_key, normalized):
+    """Store {raw: [norm, ...]} results under prompt_key."""
+    now = datetime.now().isoformat()
+    conn = get_connection()
+    c = conn.cursor()
+    c.executemany("INSERT OR REPLACE INTO normalization_memo (prompt_key, raw, normalized, created_at) VALUES (?, ?, ?, ?)",
+                  [(prompt_key, raw, json.dumps(norms), now) for raw, norms in normalized.items()])
+    conn.commit()
+
+def get_task_results(task_ids):
+    """{task_id: {"fingerprint", "recipe_name", "normalized"}} for the tasks a previous scan processed."""
+    unique = list(dict.fromkeys(task_ids))
+    c = get_connection().cursor()
+    results = {}
+    for start in range(0, len(unique), 500):
+        chunk = unique[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT task_id, fingerprint, recipe_name, normalized FROM task_results WHERE task_id IN ({placeholders})",
+                  chunk)
+        for task_id, fingerprint, recipe_name, normalized in c.fetchall():
+            results[task_id] = {"fingerprint": fingerprint, "recipe_name": recipe_name,
+                                "normalized": json.loads(normalized)}
+    return results
+
+def save_task_results(session_id, results):
+    """Store [(task_id, fingerprint, recipe_name, normalized), ...] from a scan; normalized is any JSON value."""
+    now = datetime.now().isoformat()
+    conn = get_connection()
+    conn.executemany("""INSERT OR REPLACE INTO task_results (task_id, fingerprint, recipe_name, normalized, session_id, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?)""",
+                     [(task_id, fingerprint, recipe_name, json.dumps(normalized), session_id, now)
+                      for task_id, fingerprint, recipe_name, normalized in results])
+    conn.commit()
+
+def create_scan_job(session_id):
+    conn = get_connection()
+    conn.execute("""INSERT INTO scan_jobs (session_id, status, created_at, owner_pid, updated_at)
+                    VALUES (?, 'running', ?, ?, ?)""",
+                 (session_id, datetime.now().isoformat(), os.getpid(), time.time()))
+    conn.commit()
+
+def save_scan_event(session_id, seq, event):
+    """Store a progress event; it also counts as progress for fail_stale_scan_jobs."""
+    conn = get_connection()
+    conn.execute("INSERT INTO scan_events (session_id, seq, data, created_at) VALUES (?, ?, ?, ?)",
+                 (session_id, seq, json.dumps(event), datetime.now().isoformat()))
+    conn.execute("UPDATE scan_jobs SET updated_at = ? WHERE session_id = ?", (time.time(), session_id))
+    conn.commit()
+
+def finish_scan_job(session_id, status, result, seq=None):
+    """
+    Mark a scan 'done' or 'failed' and keep its final event (the ingredient
+    payload or the error), compressed like the aggregation log. When that event
+    is already stored as scan_events `seq`, the row is pointed at the result
+    (data NULL) instead of keeping a second copy.
+    """
+    payload, encoding = encode_event_data("aggregation", result)
     conn = get_connection()
     c = conn.cursor()
-    c.execute("UPDATE sessions SET is_complete = 1, completed_at = ? WHERE id = ?", (datetime.now().isoformat(), session_id))
+    # A scan already failed as stale keeps that outcome, matching the events its followers saw
+    c.execute("""UPDATE scan_jobs SET status = ?, result = ?, encoding = ?, finished_at = ?, updated_at = ?
+                 WHERE session_id = ? AND status = 'running'""",
+              (status, payload, encoding, datetime.now().isoformat(), time.time(), session_id))
+    if c.rowcount and seq is not None:
+        c.execute("UPDATE scan_events SET data = NULL WHERE session_id = ? AND seq = ?", (session_id, seq))
     conn.commit()
-    backup_db()
+
+def get_scan_job(session_id):
+    """{"status", "result", "created_at", "finished_at"} for a scan, or None if there is no such job."""
+    row = get_connection().execute("""SELECT status, result, encoding, created_at, finished_at FROM scan_jobs
+                                      WHERE session_id = ?""", (session_id,)).fetchone()
+    if row is None:
+        return None
+    status, result, encoding, created_at, finished_at = row
+    return {"status": status, "result": decode_event_data(result, encoding) if result else None,
+            "created_at": created_at, "finished_at": finished_at}
+
+def get_scan_events(session_id, after=0):
+    """[(seq, event), ...] of a scan's progress events with seq > after, in order."""
+    rows = get_connection().execute("""SELECT e.seq, e.data, j.result, j.encoding FROM scan_events e
+                                       LEFT JOIN scan_jobs j ON j.session_id = e.session_id
+                                       WHERE e.session_id = ? AND e.seq > ? ORDER BY e.seq""",
+                                    (session_id, after)).fetchall()
+    # data NULL: the final event, kept once as the job's result
+    return [(seq, json.loads(data) if data is not None else decode_event_data(result, encoding))
+            for seq, data, result, encoding in rows]
+
+def _process_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by someone else
+    return True
+
+SCAN_JOB_LOST_ERROR = "The scan stopped unexpectedly. Please run it again."
+
+def fail_stale_scan_jobs(max_age, session_id=None):
+    """
+    Fail 'running' scans whose process is gone or that made no progress for
+    max_age seconds (all of them, or just session_id). Each gets an error as
+    its last event and result, so followers stop. Returns the failed session ids.
+    """
+    query = "SELECT session_id, owner_pid, updated_at FROM scan_jobs WHERE status = 'running'"
+    params = ()
+    if session_id is not None:
+        query, params = query + " AND session_id = ?", (session_id,)
+
+    def stale(c):
+        now = time.time()
+        return [sid for sid, owner_pid, updated_at in c.execute(query, params).fetchall()
+                if updated_at is None or updated_at < now - max_age or not _process_alive(owner_pid)]
+
+    conn = get_connection()
+    c = conn.cursor()
+    # Followers call this on every idle poll; only take the write lock when something looks stale
+    if not stale(c):
+        return []
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        failed = stale(c)
+        error = {"error": SCAN_JOB_LOST_ERROR}
+        payload, encoding = encode_event_data("aggregation", error)
+        now = datetime.now().isoformat()
+        for sid in failed:
+            c.execute("""INSERT INTO scan_events (session_id, seq, data, created_at)
+                         SELECT ?, COALESCE(MAX(seq), 0) + 1, NULL, ? FROM scan_events WHERE session_id = ?""",
+                      (sid, now, sid))
+            c.execute("""UPDATE scan_jobs SET status = 'failed', result = ?, encoding = ?, finished_at = ?, updated_at = ?
+                         WHERE session_id = ?""", (payload, encoding, now, time.time(), sid))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return failed
+
+def get_shared_projects(token_key, max_age):
+    """Project list another worker fetched for this token within max_age seconds, or None."""
+    row = get_connection().execute("SELECT projects FROM project_cache WHERE token_key = ? AND fetched_at > ?",
+                                   (token_key, time.time() - max_age)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def save_shared_projects(token_key, projects, keep_for=86400):
+    """Store a freshly fetched project list, dropping entries (e.g. expired tokens) older than keep_for seconds."""
+    now = time.time()
+    conn = get_connection()
+    conn.execute("INSERT OR REPLACE INTO project_cache (token_key, projects, fetched_at) VALUES (?, ?, ?)",
+                 (token_key, json.dumps(projects), now))
+    conn.execute("DELETE FROM project_cache WHERE fetched_at < ?", (now - keep_for,))
+    conn.commit()
+
+def get_llm_title_cache(title, ignore_recipe, prompt_key):
+    """Return the cached ingredient list for a normalized dish title, or None."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT ingredients FROM llm_title_cache WHERE title = ? AND ignore_recipe = ? AND prompt_key = ?",
+              (title, ignore_recipe, prompt_key))
+    row = c.fetchone()
+    _record_cache_access("llm_title", hits=int(row is not None), misses=int(row is None))
+    return json.loads(row[0]) if row else None
+
+def save_llm_title_cache(title, ignore_recipe, prompt_key, ingredients):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""INSERT OR REPLACE INTO llm_title_cache (title, ignore_recipe, prompt_key, ingredients, created_at)
+                 VALUES (?, ?, ?, ?, ?)""",
+              (title, ignore_recipe, prompt_key, json.dumps(ingredients), datetime.now().isoformat()))
+    conn.commit()
+
+def purge_llm_title_cache(title):
+    """Delete every cached answer for a normalized dish title. Returns rows removed."""
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("DELETE FROM llm_title_cache WHERE title = ?", (title,))
+    conn.commit()
+    return c.rowcount
+
+def summarize_sessions(before, conn=None):
+    """Roll sessions whose logs predate `before` up into session_summaries. Returns sessions summarized."""
+    conn = conn or get_connection()
+    c = conn.cursor()
+    c.execute("""SELECT DISTINCT s.id, s.created_at, s.completed_at, s.is_complete FROM sessions s
+                 JOIN logs l ON l.session_id = s.id WHERE l.created_at < ?""", (before,))
+    sessions = c.fetchall()
+    now = datetime.now().isoformat()
+    for session_id, created_at, completed_at, is_complete in sessions:
+        c.execute("SELECT event_type, COUNT(*) FROM logs WHERE session_id = ? AND created_at < ? GROUP BY event_type",
+                  (session_id, before))
+        event_counts = dict(c.fetchall())
+        ingredient_count, skipped = None, None
+        c.execute("""SELECT event_type, data, encoding FROM logs
+                     WHERE session_id = ? AND created_at < ? AND event_type IN ('aggregation', 'skipped_meals')
+                     ORDER BY id""", (session_id, before))
+        for event_type, payload, encoding in c.fetchall():
+            data = decode_event_data(payload, encoding)
+            if event_type == "aggregation":
+                ingredient_count = len(data.get("result", []))
+            else:
+                skipped = data
+        # Merge with an earlier partial rollup of the same session
+        c.execute("SELECT event_counts, ingredient_count, skipped_meals FROM session_summaries WHERE session_id = ?", (session_id,))
+        previous = c.fetchone()
+        if previous:
+            for event_type, count in json.loads(previous[0]).items():
+                event_counts[event_type] = event_counts.get(event_type, 0) + count
+            if ingredient_count is None:
+                ingredient_count = previous[1]
+            if skipped is None and previous[2]:
+                skipped = json.loads(previous[2])
+        c.execute("""INSERT OR REPLACE INTO session_summaries
+                     (session_id, created_at, completed_at, is_complete, event_counts, ingredient_count, skipped_meals, summarized_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                  (session_id, created_at, completed_at, is_complete, json.dumps(event_counts), ingredient_count,
+                   json.dumps(skipped) if skipped is not None else None, now))
+    return len(sessions)
+
+def _advance_watermark(c, source, batch):
+    """
+    Returns (last_id, new_last_id, done) bounding the next `batch` ids of
+    `source` rows not yet rolled up, and stores the new mark. `done` is True
+    once the mark has reached the newest row.
+    """
+    c.execute("SELECT last_id FROM rollup_watermarks WHERE source = ?", (source,))
+    row = c.fetchone()
+    last_id = row[0] if row else 0
+    c.execute(f"SELECT COALESCE(MAX(id), 0) FROM {source}")
+    newest = max(c.fetchone()[0], last_id)
+    new_last_id = min(newest, last_id + batch)
+    c.execute("INSERT OR REPLACE INTO rollup_watermarks (source, last_id) VALUES (?, ?)", (source, new_last_id))
+    return last_id, new_last_id, new_last_id == newest
+
+def _upsert_counts(c, table, columns, counts):
+    keys = ", ".join(columns)
+    placeholders = ", ".join("?" * (len(columns) + 1))
+    c.executemany(f"""INSERT INTO {table} ({keys}, n) VALUES ({placeholders})
+                      ON CONFLICT({keys}) DO UPDATE SET n = n + excluded.n""",
+                  [(*key, n) for key, n in counts.items()])
+
+def extracted_lines(content):
+    """Ingredient lines of an llm_response payload, with list bullets stripped."""
+    for line in (content or '').split('\n'):
+        if line.strip():
+            yield re.sub(r'^[\-\*\s]+', '', line).strip()
+
+def refresh_rollups(conn=None, batch=None):
+    """
+    Fold audit_log and logs rows written since the last run into the rollup tables.
+
+    Cost is proportional to the new rows only. Rows are folded `batch` ids
+    (default ROLLUP_BATCH_SIZE) per table at a time, each batch in its own
+    transaction, so writers get the lock back between batches and a long
+    catch-up never loads the whole history. Each watermark is read and advanced
+    under the write lock, so concurrent callers never double count.
+    """
+    conn = conn or get_connection()
+    batch = batch or ROLLUP_BATCH_SIZE
+    while not _refresh_rollups_batch(conn, batch):
+        pass
+
+def _refresh_rollups_batch(conn, batch):
+    """Fold the next batch of rows in one transaction. Returns True once both tables are caught up."""
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        lo, hi, audit_done = _advance_watermark(c, "audit_log", batch)
+        if hi > lo:
+            c.execute("""INSERT INTO rollup_outcomes (day, outcome, n)
+                         SELECT substr(created_at, 1, 10), COALESCE(outcome, ''), COUNT(*) FROM audit_log
+                         WHERE id > ? AND id <= ? GROUP BY 1, 2
+                         ON CONFLICT(day, outcome) DO UPDATE SET n = n + excluded.n""", (lo, hi))
+            c.execute("""INSERT INTO rollup_rejections (raw, n)
+                         SELECT COALESCE(ingredient_raw, ''), COUNT(*) FROM audit_log
+                         WHERE id > ? AND id <= ? AND outcome LIKE 'rejected%' GROUP BY 1
+                         ON CONFLICT(raw) DO UPDATE SET n = n + excluded.n""", (lo, hi))
+            c.execute("""INSERT INTO rollup_corrections (raw, final, n)
+                         SELECT COALESCE(ingredient_raw, ''), COALESCE(ingredient_final, ''), COUNT(*) FROM audit_log
+                         WHERE id > ? AND id <= ? AND correction_made = 1 GROUP BY 1, 2
+                         ON CONFLICT(raw, final) DO UPDATE SET n = n + excluded.n""", (lo, hi))
+            c.execute("""INSERT INTO rollup_sources (source, n)
+                         SELECT COALESCE(source_recipe, ''), COUNT(*) FROM audit_log
+                         WHERE id > ? AND id <= ? GROUP BY 1
+                         ON CONFLICT(source) DO UPDATE SET n = n + excluded.n""", (lo, hi))
+
+        lo, hi, logs_done = _advance_watermark(c, "logs", batch)
+        if hi > lo:
+            c.execute("""INSERT INTO rollup_events (day, event_type, n)
+                         SELECT substr(created_at, 1, 10), COALESCE(event_type, ''), COUNT(*) FROM logs
+                         WHERE id > ? AND id <= ? GROUP BY 1, 2
+                         ON CONFLICT(day, event_type) DO UPDATE SET n = n + excluded.n""", (lo, hi))
+            normalizations, extractions = {}, {}
+            rows = conn.execute("""SELECT event_type, data, encoding FROM logs
+                                   WHERE id > ? AND id <= ? AND event_type IN ('normalization', 'llm_response')""",
+                                (lo, hi))
+            for event_type, payload, encoding in rows:
+                data = decode_event_data(payload, encoding)
+                if event_type == "normalization":
+                    output = data.get("output")
+                    if isinstance(output, dict):
+                        key = (data.get("input") or '', output.get("name") or '')
+                        normalizations[key] = normalizations.get(key, 0) + 1
+                else:
+                    for ingredient in extracted_lines(data.get("response", data.get("content"))):
+                        extractions[(ingredient,)] = extractions.get((ingredient,), 0) + 1
+            _upsert_counts(c, "rollup_normalizations", ("raw", "normalized"), normalizations)
+            _upsert_counts(c, "rollup_llm_extractions", ("ingredient",), extractions)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return audit_done and logs_done
+
+def get_rollups(top=10):
+    """Catch up, then return the report summaries (what /api/analytics serves)."""
+    refresh_rollups()
+    c = get_connection().cursor()
+    c.execute("SELECT outcome, SUM(n) FROM rollup_outcomes GROUP BY outcome ORDER BY SUM(n) DESC")
+    outcomes = c.fetchall()
+    c.execute("SELECT day, outcome, n FROM rollup_outcomes ORDER BY day, outcome")
+    by_day = {}
+    for day, outcome, n in c.fetchall():
+        by_day.setdefault(day, {})[outcome] = n
+    c.execute("SELECT event_type, SUM(n) FROM rollup_events GROUP BY event_type ORDER BY SUM(n) DESC")
+    events = c.fetchall()
+    c.execute("SELECT raw, final, n FROM rollup_corrections ORDER BY n DESC LIMIT ?", (top,))
+    corrections = [{"raw": raw, "final": final, "count": n} for raw, final, n in c.fetchall()]
+    c.execute("SELECT raw, n FROM rollup_rejections ORDER BY n DESC LIMIT ?", (top,))
+    rejections = [{"raw": raw, "count": n} for raw, n in c.fetchall()]
+    c.execute("SELECT source, n FROM rollup_sources ORDER BY n DESC LIMIT ?", (top,))
+    sources = [{"source": source, "count": n} for source, n in c.fetchall()]
+    c.execute("SELECT raw, normalized, n FROM rollup_normalizations ORDER BY n DESC LIMIT ?", (top,))
+    normalizations = [{"raw": raw, "normalized": norm, "count": n} for raw, norm, n in c.fetchall()]
+    c.execute("SELECT ingredient, n FROM rollup_llm_extractions ORDER BY n DESC LIMIT ?", (top,))
+    extractions = [{"ingredient": ing, "count": n} for ing, n in c.fetchall()]
+    return {
+        "total_samples": sum(n for _, n in outcomes),
+        "outcomes": dict(outcomes),
+        "outcomes_by_day": by_day,
+        "top_corrections": corrections,
+        "top_rejections": rejections,
+        "top_sources": sources,
+        "total_events": sum(n for _, n in events),
+        "event_counts": dict(events),
+        "top_normalizations": normalizations,
+        "top_llm_extractions": extractions,
+    }
+
+def run_retention(days=None, archive_path=None):
+    """
+    Summarize, then prune logs older than `days` (default LOG_RETENTION_DAYS).
+
+    With archive_path, pruned rows are first copied into a `logs` table in that
+    database (attached for the duration). Finished scan jobs and their events
+    go too; audit_log and sessions are kept.
+    """
+    days = LOG_RETENTION_DAYS if days is None else days
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    flush_events()
+    conn = get_connection()
+    # Pruned rows must already be counted in the rollups
+    refresh_rollups(conn)
+    c = conn.cursor()
+    if archive_path:
+        c.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            summarized = summarize_sessions(cutoff, conn)
+            archived = 0
+            if archive_path:
+                c.execute("""CREATE TABLE IF NOT EXISTS archive.logs
+                             (id INTEGER PRIMARY KEY, session_id TEXT, event_type TEXT, data TEXT, encoding TEXT, created_at TEXT)""")
+                c.execute("""INSERT OR IGNORE INTO archive.logs (id, session_id, event_type, data, encoding, created_at)
+                             SELECT id, session_id, event_type, data, encoding, created_at FROM logs WHERE created_at < ?""", (cutoff,))
+                archived = c.rowcount
+            c.execute("DELETE FROM logs WHERE created_at < ?", (cutoff,))
+            pruned = c.rowcount
+            # Scan jobs only matter to clients reconnecting to them; the aggregation log keeps each result
+            c.execute("DELETE FROM scan_jobs WHERE created_at < ? AND status != 'running'", (cutoff,))
+            c.execute("""DELETE FROM scan_events WHERE created_at < ?
+                         AND session_id NOT IN (SELECT session_id FROM scan_jobs WHERE status = 'running')""", (cutoff,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        if archive_path:
+            c.execute("DETACH DATABASE archive")
+    return {"sessions_summarized": summarized, "logs_archived": archived, "logs_pruned": pruned}
@@ -0,0 +1,131 @@
+import math
+import os
+import re
+import unicodedata
+
+# Minimum trigram Jaccard similarity (0-1] for two base names to be merged into one card;
+# above 1, only names that fold to the same key (plurals, stopwords) are merged
+FUZZY_MERGE_THRESHOLD = float(os.getenv("FUZZY_MERGE_THRESHOLD", "0.75"))
+
+# Not "diced"/"crushed": those name canned products ("diced tomatoes")
+STOPWORDS = {"a", "an", "the", "of", "fresh", "large", "small", "medium", "whole", "organic",
+             "chopped", "minced", "sliced", "grated", "shredded"}
+# A word that adds nothing after certain others: "parmesan cheese" is just "parmesan".
+# Only listed varieties lose the word, so "cream cheese" and "cottage cheese" keep it.
+IMPLIED_WORDS = {
+    "cheese": {"parmesan", "parmigiano", "cheddar", "mozzarella", "feta", "ricotta", "gouda", "gruyere",
+               "pecorino", "provolone", "mascarpone", "brie", "asiago", "manchego", "halloumi", "fontina"},
+    "clove": {"garlic"},
+    "leaf": {"basil", "bay", "mint", "cilantro", "parsley", "thyme", "sage", "oregano", "rosemary"},
+}
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def singular(word):
+    """Cheap plural folding; only needs to be consistent, not correct English."""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("ves") and word[:-3] in ("lea", "loa", "hal"):
+        return word[:-3] + "f"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def name_key(name):
+    """'Fresh Parmesan Cheeses' -> 'parmesan': accents, case, plurals, stopwords and implied words folded."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    words = [singular(w) for w in WORD_PATTERN.findall(text)]
+    kept = []
+    for word in words:
+        if word in STOPWORDS:
+            continue
+        if kept and kept[-1] in IMPLIED_WORDS.get(word, ()):
+            continue
+        kept.append(word)
+    return " ".join(kept) or text.strip()
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similar_pairs(keys, threshold):
+    """
+    (i, j) index pairs of keys whose trigram Jaccard similarity is >= threshold.
+
+    Prefix filtering: trigrams are ranked rarest first, and only each key's
+    first |A| - ceil(t * |A|) + 1 trigrams are indexed and probed. Two sets
+    that reach the threshold must share one of those, so only keys with a
+    rare trigram in common are ever compared, never every pair.
+    """
+    grams = [trigrams(key) for key in keys]
+    frequency = {}
+    for gram_set in grams:
+        for gram in gram_set:
+            frequency[gram] = frequency.get(gram, 0) + 1
+
+    index = {}
+    pairs = []
+    for i, gram_set in enumerate(grams):
+        size = len(gram_set)
+        ordered = sorted(gram_set, key=lambda g: (frequency[g], g))
+        prefix = ordered[:size - math.ceil(threshold * size) + 1]
+        candidates = set()
+        for gram in prefix:
+            candidates.update(index.get(gram, ()))
+        for j in candidates:
+            other = grams[j]
+            if not threshold * size <= len(other) <= size / threshold:
+                continue
+            shared = len(gram_set & other)
+            if shared / (size + len(other) - shared) >= threshold:
+                pairs.append((j, i))
+        for gram in prefix:
+            index.setdefault(gram, []).append(i)
+    return pairs
+
+def adds_head_noun(key_a, key_b):
+    """True when one key is the other plus trailing words: 'peanut butter' / 'peanut butter cup' are different items."""
+    words_a, words_b = key_a.split(), key_b.split()
+    shorter, longer = sorted((words_a, words_b), key=len)
+    return len(shorter) < len(longer) and longer[:len(shorter)] == shorter
+
+def cluster_names(weights, threshold=None):
+    """
+    Group near-duplicate names. `weights` maps name -> weight (e.g. instance
+    count), in first-seen order. Returns {name: representative} for the names
+    that merge into another; each cluster is represented by its heaviest name
+    (first seen on ties). Similar keys where one only adds a head noun to the
+    other never merge.
+    """
+    threshold = FUZZY_MERGE_THRESHOLD if threshold is None else threshold
+    names = list(weights)
+    key_ids = {}
+    key_of = [key_ids.setdefault(name_key(name), len(key_ids)) for name in names]
+    parent = list(range(len(key_ids)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    if threshold <= 1:
+        keys = list(key_ids)
+        for i, j in similar_pairs(keys, threshold):
+            if adds_head_noun(keys[i], keys[j]):
+                continue
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    best = {}
+    for position, name in enumerate(names):
+        root = find(key_of[position])
+        current = best.get(root)
+        if current is None or weights[name] > weights[current]:
+            best[root] = name
+    return {name: best[find(key_of[position])] for position, name in enumerate(names)
+            if best[find(key_of[position])] != name}
@@ -0,0 +1,44 @@
+"""
+Production server settings: `gunicorn -c gunicorn.conf.py` (the container's CMD).
+
+Scans are streamed over SSE and hold a thread for their whole run, so workers
+are threaded (gthread): a stream ties up one of a worker's threads, not the
+worker, and the worker keeps heartbeating to the master however long a stream
+lasts. CPU-heavy parts of a scan (parsing, aggregation) scale with the
+number of worker processes.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "app:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# One process per core by default; each serves up to GUNICORN_THREADS concurrent requests/streams
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# gthread workers heartbeat from their main loop, so this only catches hung workers, not long streams
+timeout = 60
+# On restart/shutdown, give running scans this long to finish
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "120"))
+keepalive = 5
+
+# app.py is imported in each worker rather than in the master (it is cheap to import, see
+# benchmarks/bench_startup.py), so no SQLite connection or background thread is shared across fork
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+def post_worker_init(worker):
+    # Apply migrations and open this worker's connection before it takes requests
+    import app
+    app.ensure_db()
+
+def worker_exit(server, worker):
+    # gunicorn handles SIGTERM in workers, so app.graceful_shutdown never runs there
+    import database
+    database.flush_events()
+    database.flush_cache_stats()
+    database.close_db()
@@ -0,0 +1,169 @@
+import re
+import fuzzy
+import units
+
+# Rule-based parser for ingredient lines such as "1 1/2 cups flour, sifted".
+# It produces the same {"name", "quantity", "unit"} dicts as the LLM normalizer,
+# plus a confidence in [0, 1]; lines it is unsure of are left to the LLM.
+
+UNICODE_FRACTIONS = {
+    "½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅕": "1/5", "⅖": "2/5",
+    "⅗": "3/5", "⅘": "4/5", "⅙": "1/6", "⅚": "5/6", "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8",
+}
+UNICODE_FRACTION_PATTERN = re.compile(r"(\d*)\s*([" + "".join(UNICODE_FRACTIONS) + r"])")
+
+NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?|\.\d+"
+QUANTITY_PATTERN = re.compile(rf"^(?P<low>{NUMBER})(?:\s*(?:-|–|to)\s*(?P<high>{NUMBER}))?\s*")
+PARENTHETICAL_PATTERN = re.compile(r"\(([^()]*)\)")
+PRICE_PATTERN = re.compile(r"\$\s*\d+(?:\.\d+)?")
+WORD_PATTERN = re.compile(r"[a-z]+\.?")
+
+# Units as the LLM prompt spells them; anything else keeps its units.py name
+UNIT_NAMES = {"teaspoon": "tsp", "tablespoon": "tbsp", "ounce": "oz", "pound": "lb", "package": "pkg",
+              "fluid_ounce": "fl oz"}
+# One-letter recipe abbreviations; case matters ("1 T" is a tablespoon, "1 t" a teaspoon)
+UNIT_ABBREVIATIONS = {"T": "tablespoon", "t": "teaspoon", "c": "cup", "C": "cup"}
+# Units whose parenthetical size is the real amount: "1 (15 oz) can" is 15 oz
+CONTAINERS = {"can", "jar", "package", "pkg", "box", "bag", "bottle", "container"}
+
+# Words dropped from the front of a name, and words that start a prep note after a comma
+DESCRIPTORS = {"large", "small", "medium", "fresh", "freshly", "finely", "roughly", "coarsely", "thinly",
+               "chopped", "minced", "sliced", "grated", "shredded", "packed", "heaping", "level", "of"}
+PREP_WORDS = DESCRIPTORS | {"diced", "crushed", "peeled", "softened", "melted", "divided", "drained", "rinsed",
+                            "beaten", "cubed", "halved", "quartered", "trimmed", "thawed", "cooked", "toasted",
+                            "seeded", "deveined", "torn", "crumbled", "sifted", "zested", "juiced", "cut", "to",
+                            "for", "plus", "about", "at", "room", "optional", "or", "if", "warmed", "cold",
+                            "lightly", "well", "very", "cored", "pitted", "stemmed", "removed", "separated"}
+# Words that leave a more generic name when dropped ("kosher salt" is "salt"); the LLM decides those
+QUALIFIERS = {"kosher", "sea", "coarse", "flaky", "extra-virgin", "extra", "virgin", "unsalted", "salted",
+              "boneless", "skinless", "diced", "crushed", "canned", "frozen", "dried", "ripe", "raw", "whole",
+              "organic", "plain", "low-sodium", "reduced-sodium", "low-fat", "nonfat"}
+# Head nouns that stay as written: no singular, or one fuzzy.singular gets wrong ("cookies" -> "cooky")
+PLURAL_NOUNS = {"molasses": "molasses", "grits": "grits", "greens": "greens", "oats": "oats", "cloves": "cloves",
+                "sprinkles": "sprinkles", "bitters": "bitters", "cookies": "cookie", "brownies": "brownie",
+                "veggies": "veggie", "pies": "pie", "smoothies": "smoothie"}
+NOISE_PATTERN = re.compile(r"\*|\boptional\b|\bto taste\b|\bfor (?:serving|garnish)\b", re.IGNORECASE)
+COMPOUND_PATTERN = re.compile(r"\b(?:and|or|with)\b|[&/+]")
+
+def _number(text):
+    """'1 1/2' -> 1.5, '1/2' -> 0.5, '.5' -> 0.5."""
+    parts = text.split()
+    total = 0.0
+    for part in parts:
+        if "/" in part:
+            num, den = part.split("/")
+            total += int(num) / int(den)
+        else:
+            total += float(part)
+    return total
+
+def _quantity_str(value):
+    return f"{round(value, 3)}".rstrip("0").rstrip(".") if value != int(value) else str(int(value))
+
+def parse_quantity(text):
+    """
+    Split a leading quantity off `text`. Returns (quantity string, value, rest):
+    mixed numbers stay as written ('1 1/2'), ranges as 'low-high' (aggregation
+    sums the upper bound) and unicode fractions are spelled out.
+    """
+    text = UNICODE_FRACTION_PATTERN.sub(
+        lambda m: f"{m.group(1)} {UNICODE_FRACTIONS[m.group(2)]}" if m.group(1) else UNICODE_FRACTIONS[m.group(2)], text)
+    match = QUANTITY_PATTERN.match(text)
+    if not match:
+        return None, None, text
+    low, high = match.group("low"), match.group("high")
+    rest = text[match.end():]
+    if high:
+        if "/" in low or "/" in high or " " in high:
+            return high, _number(high), rest
+        return f"{low}-{high}", _number(high), rest
+    if low.startswith("."):
+        low = "0" + low
+    return " ".join(low.split()), _number(low), rest
+
+def _take_unit(text):
+    """(canonical unit, rest) for a unit at the start of `text`, or (None, text)."""
+    for size in (2, 1):
+        words = text.split(None, size)
+        if len(words) < size:
+            continue
+        candidate = " ".join(words[:size]).rstrip(".")
+        canonical = UNIT_ABBREVIATIONS.get(candidate) or units.lookup(candidate)
+        if canonical:
+            return canonical, words[size] if len(words) > size else ""
+    return None, text
+
+def parse_ingredient(raw):
+    """
+    Parse one ingredient line. Returns (norm, confidence); norm is None when
+    nothing usable was found. Confidence drops for compound items, unknown
+    trailing notes, leftover numbers or letters, leading qualifiers and long
+    names. The last word is made singular, as the LLM prompt asks.
+    """
+    text = PRICE_PATTERN.sub("", raw or "")
+    confidence = 1.0
+
+    qty_str, value, text = parse_quantity(text.strip())
+    text = text.strip()
+
+    # "1 (15 oz) can beans": the parenthetical carries the amount
+    size = None
+    if text.startswith("("):
+        inner = PARENTHETICAL_PATTERN.match(text)
+        if inner:
+            size = inner.group(1)
+            text = text[inner.end():].strip()
+
+    unit, text = _take_unit(text)
+    if unit in CONTAINERS or (unit is None and value is not None and size):
+        if size is None and text.startswith("("):
+            inner = PARENTHETICAL_PATTERN.match(text)
+            if inner:
+                size, text = inner.group(1), text[inner.end():].strip()
+        if size:
+            size_qty, size_value, size_rest = parse_quantity(size.strip())
+            size_unit, _ = _take_unit(size_rest.strip())
+            if size_value is not None and size_unit:
+                count = value if value is not None else 1.0
+                qty_str, value, unit = _quantity_str(count * size_value), count * size_value, size_unit
+
+    # Parentheticals and noise go; the first comma separates the name from prep notes
+    text = NOISE_PATTERN.sub("", PARENTHETICAL_PATTERN.sub("", text)).lower()
+    name, _, note = text.partition(",")
+    note_words = WORD_PATTERN.findall(note)
+    if note_words and note_words[0].rstrip(".") not in PREP_WORDS:
+        confidence = min(confidence, 0.5)  # could be a second item: "salt, pepper"
+
+    words = name.split()
+    while words and words[0] in DESCRIPTORS:
+        words.pop(0)
+    # "2 garlic cloves" is 2 cloves of garlic
+    if unit is None and len(words) > 1 and words[-1].rstrip(".") in ("clove", "cloves"):
+        unit, words = "clove", words[:-1]
+    if words:
+        head = words[-1].rstrip(".-:;")
+        words[-1] = PLURAL_NOUNS.get(head) or fuzzy.singular(head)
+    name = " ".join(words).strip(" .-:;")
+    if not name:
+        return None, 0.0
+
+    if COMPOUND_PATTERN.search(name):
+        confidence = min(confidence, 0.3)
+    if re.search(r"\d", name):
+        confidence = min(confidence, 0.4)
+    if not re.fullmatch(r"[a-z][a-z' \-éèñ]*", name):
+        confidence = min(confidence, 0.6)
+    if len(words) > 3:
+        confidence = min(confidence, 0.6)
+    if words[0] in QUALIFIERS:
+        confidence = min(confidence, 0.6)
+    if len(words[0]) == 1:
+        confidence = min(confidence, 0.5)  # likely an unknown unit abbreviation: "2 x flour"
+    if qty_str is None and unit is None:
+        confidence = min(confidence, 0.9)  # bare names ("salt") default to one count
+
+    return {
+        "name": name,
+        "quantity": qty_str or "1",
+        "unit": UNIT_NAMES.get(unit, unit) if unit else "count",
+    }, confidence
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import database
+
+# Scans run as background jobs, so they outlive the request that started them.
+# Every progress event is stored in scan_events under a per-scan sequence number
+# (the SSE event id) and the final event, compressed, in scan_jobs, keyed by session id.
+
+# Scans running at once per process; more wait in the executor's queue
+SCAN_JOB_WORKERS = int(os.getenv("SCAN_JOB_WORKERS", "4"))
+# Seconds without an event before a stream sends a heartbeat comment, so proxies keep it open
+SCAN_HEARTBEAT_INTERVAL = float(os.getenv("SCAN_HEARTBEAT_INTERVAL", "15"))
+# How often a stream re-reads scan_events for a job running in another worker process
+SCAN_POLL_INTERVAL = float(os.getenv("SCAN_POLL_INTERVAL", "0.5"))
+# A running scan with no new event for this many seconds (or whose worker process is gone) is failed
+SCAN_JOB_STALE_AFTER = float(os.getenv("SCAN_JOB_STALE_AFTER", "600"))
+
+_executor = ThreadPoolExecutor(max_workers=SCAN_JOB_WORKERS, thread_name_prefix="scan-job")
+_running = {}  # session_id -> ScanJob, for jobs in this process
+_running_lock = threading.Lock()
+
+class ScanJob:
+    """A scan running in this process. Events are kept in memory for live streams and persisted for replay."""
+    __slots__ = ("session_id", "events", "done", "_cond")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.events = []
+        self.done = False
+        self._cond = threading.Condition()
+
+    def append(self, event):
+        """Add the next event; returns its sequence number."""
+        with self._cond:
+            self.events.append(event)
+            seq = len(self.events)
+        try:
+            database.save_scan_event(self.session_id, seq, event)
+        except Exception as e:
+            # Live streams still get it; only a replay from another worker would miss it
+            print(f"Could not store event {seq} of scan job {self.session_id}: {e}")
+        with self._cond:
+            self._cond.notify_all()
+        return seq
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def follow(self, after=0, heartbeat=None):
+        """Yield (seq, event) for events after `after` until the job ends; None after `heartbeat` idle seconds."""
+        heartbeat = SCAN_HEARTBEAT_INTERVAL if heartbeat is None else heartbeat
+        seq = after
+        while True:
+            with self._cond:
+                if len(self.events) <= seq and not self.done:
+                    self._cond.wait(heartbeat)
+                batch = self.events[seq:]
+                finished = self.done
+            for event in batch:
+                seq += 1
+                yield seq, event
+            if finished and seq >= len(self.events):
+                return
+            if not batch:
+                yield None
+
+def _run(job, produce):
+    """Drain the scan's SSE chunks into the job; the last event becomes the stored result."""
+    last, seq = None, None
+    try:
+        for chunk in produce():
+            last = json.loads(chunk[len("data: "):])
+            seq = job.append(last)
+    except Exception as e:
+        print(f"Scan job {job.session_id} failed: {e}")
+        last = {"error": "A critical error occurred during processing."}
+        seq = job.append(last)
+    finally:
+        result = last if last is not None else {"error": "Scan ended without a result."}
+        try:
+            database.finish_scan_job(job.session_id, "done" if "ingredients" in result else "failed", result, seq)
+        except Exception as e:
+            print(f"Could not record the end of scan job {job.session_id}: {e}")
+        finally:
+            with _running_lock:
+                _running.pop(job.session_id, None)
+            job.finish()
+            # Job threads are reused; each job opens its own connection
+            database.close_db()
+
+def start(session_id, produce):
+    """
+    Run a scan in the background. `produce` is a callable returning the scan's
+    SSE chunks ("data: {...}\\n\\n"); it runs outside the request, so it must not
+    touch request or session state. Returns the ScanJob.
+    """
+    job = ScanJob(session_id)
+    database.create_scan_job(session_id)
+    with _running_lock:
+        _running[session_id] = job
+    _executor.submit(_run, job, produce)
+    return job
+
+def follow(session_id, after=0, heartbeat=None):
+    """
+    Yield (seq, event) for a scan's events after `after`, and None as a
+    heartbeat when nothing happened for `heartbeat` seconds, until the scan
+    ends. Events of a job in this process come from memory; otherwise they are
+    replayed from scan_events, polling while another worker is still running it;
+    if that worker died or stalls, the scan is failed and its error is the last event.
+    """
+    heartbeat = SCAN_HEARTBEAT_INTERVAL if heartbeat is None else heartbeat
+    with _running_lock:
+        job = _running.get(session_id)
+    if job is not None:
+        yield from job.follow(after, heartbeat)
+        return
+
+    idle_since = time.monotonic()
+    while True:
+        # Status first: once it is no longer running, every event is already stored
+        status = database.get_scan_job(session_id)
+        events = database.get_scan_events(session_id, after)
+        for seq, event in events:
+            after = seq
+            yield seq, event
+        if status is None or status["status"] != "running":
+            return
+        if events:
+            idle_since = time.monotonic()
+        elif database.fail_stale_scan_jobs(SCAN_JOB_STALE_AFTER, session_id):
+            continue  # the next pass yields the error event and sees the job failed
+        elif time.monotonic() - idle_since >= heartbeat:
+            idle_since = time.monotonic()
+            yield None
+        time.sleep(SCAN_POLL_INTERVAL)
+
+def fail_stale():
+    """Fail scans left 'running' by a worker that died (run at worker start). Returns how many."""
+    return len(database.fail_stale_scan_jobs(SCAN_JOB_STALE_AFTER))
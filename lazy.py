@@ -0,0 +1,38 @@
+import functools
+import threading
+
+class LazyProxy:
+    """Stands in for an object that is built (once, thread-safely) on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    @property
+    def initialized(self):
+        return self._obj is not None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+def once(func):
+    """Run func on the first call only; later calls are no-ops returning the first result."""
+    lock = threading.Lock()
+    state = {}
+
+    @functools.wraps(func)
+    def wrapper():
+        if "result" not in state:
+            with lock:
+                if "result" not in state:
+                    state["result"] = func()
+        return state["result"]
+    return wrapper
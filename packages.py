@@ -0,0 +1,84 @@
+import json
+import os
+import re
+import units
+
+# Package sizes live in a JSON catalog: a list of
+#   {"keywords": [...], "size": 16, "size_unit": "ounce", "unit": "box",
+#    "stores": {"<store>": {"size": ..., "size_unit": ..., "unit": ...}}}
+PACKAGE_CATALOG = os.getenv("PACKAGE_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "package_sizes.json"))
+# Store whose size variants apply (a key of an entry's "stores"); unset means the default sizes
+GROCERY_STORE = os.getenv("GROCERY_STORE", "").strip().lower()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class Package:
+    """One purchasable package: its size as a units.Quantity and the container name ('can', 'box')."""
+    __slots__ = ("size", "unit")
+
+    def __init__(self, size, unit):
+        self.size = size
+        self.unit = unit
+
+    def __repr__(self):
+        return f"<Package({self.size!r}, '{self.unit}')>"
+
+def tokenize(text):
+    """Lowercase word tokens with a plural 's' dropped, so 'Black Beans' and 'black bean' agree."""
+    return tuple(t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+                 for t in TOKEN_PATTERN.findall(text.lower()))
+
+class PackageCatalog:
+    """
+    Keyword token tuples -> Package, looked up by whole words.
+
+    A name is resolved with a handful of dict probes (one per word and keyword
+    length), however many products the catalog holds. The longest keyword
+    wins; between equally long ones, the later in the name wins, since that is
+    usually the noun ('rice noodles' is pasta, 'brown rice' is rice).
+    """
+    __slots__ = ("index", "max_tokens")
+
+    def __init__(self, entries, store=""):
+        self.index = {}
+        self.max_tokens = 0
+        for entry in entries:
+            variant = dict(entry, **entry.get("stores", {}).get(store, {})) if store else entry
+            package = Package(units.Quantity(variant["size"], units.lookup(variant["size_unit"])), variant["unit"])
+            for keyword in entry["keywords"]:
+                tokens = tokenize(keyword)
+                if tokens:
+                    # First entry wins a duplicated keyword, as the old list scan did
+                    self.index.setdefault(tokens, package)
+                    self.max_tokens = max(self.max_tokens, len(tokens))
+
+    def lookup(self, name):
+        """The Package for an ingredient name, or None."""
+        tokens = tokenize(name)
+        for length in range(min(self.max_tokens, len(tokens)), 0, -1):
+            for start in range(len(tokens) - length, -1, -1):
+                package = self.index.get(tokens[start:start + length])
+                if package is not None:
+                    return package
+        return None
+
+def load_catalog(path=None, store=None):
+    with open(path or PACKAGE_CATALOG) as f:
+        entries = json.load(f)
+    return PackageCatalog(entries, GROCERY_STORE if store is None else store.strip().lower())
+
+_catalog = None
+
+def get_catalog():
+    """The catalog for GROCERY_STORE, loaded on first use. A missing or invalid file means no package rounding."""
+    global _catalog
+    if _catalog is None:
+        try:
+            _catalog = load_catalog()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Could not load package catalog {PACKAGE_CATALOG}: {e}")
+            _catalog = PackageCatalog([])
+    return _catalog
+
+def lookup(name):
+    return get_catalog().lookup(name)
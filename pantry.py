@@ -0,0 +1,81 @@
+import os
+import re
+import threading
+import time
+import database
+
+# How often (seconds) a cached matcher re-reads pantry_version to pick up edits from other processes
+PANTRY_CHECK_INTERVAL = float(os.getenv("PANTRY_CHECK_INTERVAL", "5"))
+
+TOKEN_PATTERN = re.compile(r"\w+")
+_END = ""  # trie key marking a complete keyword (never a \w+ token)
+
+class PantryMatcher:
+    """
+    All pantry keywords in one token trie, so a name is classified in a single
+    pass over its words. Matching is on whole words, like the old \\b...\\b
+    regexes; each keyword's exclusions are one compiled substring alternation.
+    """
+    __slots__ = ("trie", "exclusions", "version")
+
+    def __init__(self, items, version=None):
+        self.trie = {}
+        self.exclusions = {}
+        self.version = version
+        for keyword, exclusions in items.items():
+            tokens = TOKEN_PATTERN.findall(keyword.lower())
+            if not tokens:
+                continue
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = keyword
+            if exclusions:
+                self.exclusions[keyword] = re.compile("|".join(re.escape(e.lower()) for e in exclusions))
+
+    def matches(self, name):
+        name_lower = name.lower()
+        tokens = TOKEN_PATTERN.findall(name_lower)
+        for start in range(len(tokens)):
+            node = self.trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                keyword = node.get(_END)
+                if keyword is not None:
+                    excluded = self.exclusions.get(keyword)
+                    if excluded is None or not excluded.search(name_lower):
+                        return True
+        return False
+
+_lock = threading.Lock()
+_matcher = None
+_next_check = 0.0
+
+def get_matcher():
+    """The compiled matcher, rebuilt when pantry_version changes (checked every PANTRY_CHECK_INTERVAL)."""
+    global _matcher, _next_check
+    if _matcher is not None and time.monotonic() < _next_check:
+        return _matcher
+    with _lock:
+        if _matcher is None or time.monotonic() >= _next_check:
+            try:
+                version = (database.DB_FILE, database.get_pantry_version())
+                if _matcher is None or version != _matcher.version:
+                    _matcher = PantryMatcher(database.get_pantry_items(), version)
+            except Exception as e:
+                print(f"Could not load pantry, using defaults: {e}")
+                if _matcher is None:
+                    _matcher = PantryMatcher(database.PANTRY_SEED)
+            _next_check = time.monotonic() + PANTRY_CHECK_INTERVAL
+    return _matcher
+
+def invalidate():
+    """Drop the compiled matcher so the next lookup reloads it (after a local edit)."""
+    global _matcher
+    with _lock:
+        _matcher = None
+
+def is_likely_have(name):
+    return get_matcher().matches(name)
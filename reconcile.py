@@ -0,0 +1,35 @@
+import fuzzy
+import ingredient_parser
+
+def item_key(title):
+    """Base-name key of a grocery line: '2 cans black beans (30 oz)' and 'Black bean' share 'black bean'."""
+    norm, _ = ingredient_parser.parse_ingredient(title)
+    return fuzzy.name_key(norm["name"] if norm else title)
+
+def same_title(a, b):
+    return " ".join(a.lower().split()) == " ".join(b.lower().split())
+
+def plan(items, open_tasks):
+    """
+    Decide what to write for the selected grocery lines, given the open tasks
+    already in the list. Returns (creates, updates, skips): lines to create,
+    (task, line) pairs whose title should become the new line, and lines an
+    identical task already covers. Each open task absorbs at most one line, so
+    nothing selected is ever dropped.
+    """
+    index = {}
+    for task in open_tasks:
+        title = task.get("title") or ""
+        if title and task.get("status", 0) == 0:
+            index.setdefault(item_key(title), task)
+
+    creates, updates, skips = [], [], []
+    for item in items:
+        task = index.pop(item_key(item), None)
+        if task is None:
+            creates.append(item)
+        elif same_title(task["title"], item):
+            skips.append(item)
+        else:
+            updates.append((task, item))
+    return creates, updates, skips
@@ -0,0 +1,17 @@
+import argparse
+import database
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll up and prune old rows from the logs table.")
+    parser.add_argument("--days", type=int, default=database.LOG_RETENTION_DAYS,
+                        help="keep logs newer than this many days (default: LOG_RETENTION_DAYS)")
+    parser.add_argument("--archive", help="copy pruned logs into this SQLite file before deleting them")
+    args = parser.parse_args()
+
+    database.init_db()
+    result = database.run_retention(days=args.days, archive_path=args.archive)
+    print(f"Summarized {result['sessions_summarized']} sessions, "
+          f"archived {result['logs_archived']} and pruned {result['logs_pruned']} log rows.")
+
+if __name__ == "__main__":
+    main()
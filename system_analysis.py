@@ -1,59 +1,92 @@
 import database
-import json
 from collections import Counter
-import re
+from audit_analysis import build_filters, parse_args
+
+def _stream_compressed(c, event_type, since, until, session_id):
+    """Yield decoded payloads of compressed rows, which SQLite's JSON functions cannot read."""
+    where, params = build_filters(since, until, session_id, ["event_type = ?", "encoding IS NOT NULL"])
+    c.execute(f"SELECT data, encoding FROM logs{where}", [event_type] + params)
+    for payload, encoding in c:
+        yield database.decode_event_data(payload, encoding)
+
+def analyze_system_logs(since=None, until=None, session_id=None):
+    if not (since or until or session_id):
+        # Unfiltered reports come straight from the incrementally maintained rollups
+        rollups = database.get_rollups()
+        print_report(rollups["event_counts"].items(),
+                     [((r["raw"], r["normalized"]), r["count"]) for r in rollups["top_normalizations"]],
+                     [(r["ingredient"], r["count"]) for r in rollups["top_llm_extractions"]])
+        return
 
-def analyze_system_logs():
     conn = database.get_connection()
     c = conn.cursor()
-    c.execute("SELECT event_type, data FROM logs")
-    rows = c.fetchall()
-    
-    if not rows:
+
+    where, params = build_filters(since, until, session_id)
+    c.execute(f"SELECT event_type, COUNT(*) FROM logs{where} GROUP BY event_type ORDER BY COUNT(*) DESC", params)
+    event_counts = c.fetchall()
+    counts = dict(event_counts)
+
+    # Analyze Normalizations: grouped in SQL, compressed rows (rare for this type) merged in
+    common_norms = []
+    if counts.get('normalization'):
+        where_norm, params_norm = build_filters(since, until, session_id, [
+            "event_type = 'normalization'", "encoding IS NULL", "json_type(data, '$.output') = 'object'"])
+        c.execute(f"""SELECT json_extract(data, '$.input'), json_extract(data, '$.output.name'), COUNT(*) AS n
+                      FROM logs{where_norm} GROUP BY 1, 2 ORDER BY n DESC""", params_norm)
+        raw_to_norm = Counter()
+        for raw, norm, count in c.fetchmany(10):
+            raw_to_norm[(raw, norm)] = count
+        compressed = Counter()
+        for n in _stream_compressed(conn.cursor(), 'normalization', since, until, session_id):
+            output_val = n.get('output', {})
+            if isinstance(output_val, dict):
+                compressed[(n.get('input'), output_val.get('name'))] += 1
+        if compressed:
+            # Exact merge needs every SQL group, not just the top 10
+            for raw, norm, count in c:
+                raw_to_norm[(raw, norm)] = count
+            raw_to_norm.update(compressed)
+        common_norms = raw_to_norm.most_common(10)
+
+    # Analyze LLM Responses (if available): lines are split in Python, streamed row by row
+    common_extracted = None
+    if counts.get('llm_response'):
+        extracted = Counter()
+        where_llm, params_llm = build_filters(since, until, session_id, ["event_type = 'llm_response'", "encoding IS NULL"])
+        c.execute(f"SELECT COALESCE(json_extract(data, '$.response'), json_extract(data, '$.content')) FROM logs{where_llm}", params_llm)
+        for (content,) in c:
+            extracted.update(database.extracted_lines(content))
+        for resp in _stream_compressed(conn.cursor(), 'llm_response', since, until, session_id):
+            extracted.update(database.extracted_lines(resp.get('response', resp.get('content'))))
+        common_extracted = extracted.most_common(10)
+
+    print_report(event_counts, common_norms, common_extracted)
+
+def print_report(event_counts, common_norms, common_extracted):
+    event_counts = list(event_counts)
+    if not event_counts:
         print("No system logs found.")
         return
 
     print("### System Log Trend Analysis")
-    print(f"\n**Total Events:** {len(rows)}")
+    print(f"\n**Total Events:** {sum(count for _, count in event_counts)}")
 
-    event_counts = Counter(r[0] for r in rows)
     print("\n#### Event Types")
-    for event, count in event_counts.items():
+    for event, count in event_counts:
         print(f"- {event}: {count}")
 
-    # Analyze Normalizations
-    normalizations = [json.loads(r[1]) for r in rows if r[0] == 'normalization']
-    if normalizations:
+    if common_norms:
         print("\n#### Normalization Trends")
-        raw_to_norm = []
-        for n in normalizations:
-            # Handle both list and dict formats if they vary
-            input_val = n.get('input')
-            output_val = n.get('output', {})
-            if isinstance(output_val, dict):
-                norm_name = output_val.get('name')
-                raw_to_norm.append((input_val, norm_name))
-        
-        common_norms = Counter(raw_to_norm).most_common(10)
         print("Top 10 Normalizations (Raw -> Norm):")
         for (raw, norm), count in common_norms:
             print(f"- '{raw}' -> '{norm}' (count: {count})")
 
-    # Analyze LLM Responses (if available)
-    llm_responses = [json.loads(r[1]) for r in rows if r[0] == 'llm_response']
-    if llm_responses:
+    if common_extracted:
         print("\n#### LLM Ingredient Extractions")
-        all_extracted = []
-        for resp in llm_responses:
-            content = resp.get('content', '')
-            # Simple bullet point extraction
-            ingredients = [re.sub(r'^[\-\*\s]+', '', line).strip() for line in content.split('\n') if line.strip()]
-            all_extracted.extend(ingredients)
-        
-        common_extracted = Counter(all_extracted).most_common(10)
         print("Top 10 LLM Extracted Ingredients:")
         for ing, count in common_extracted:
             print(f"- {ing} ({count})")
 
 if __name__ == "__main__":
-    analyze_system_logs()
+    args = parse_args("Summarize pipeline events from the logs table.")
+    analyze_system_logs(since=args.since, until=args.until, session_id=args.session)
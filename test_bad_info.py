@@ -3,6 +3,7 @@ import json
 import os
 import sqlite3
 from unittest.mock import patch, MagicMock
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
 from app import app
 import database
 
@@ -28,8 +29,12 @@ class TestBadInfo(unittest.TestCase):
     def tearDown(self):
         if os.path.exists(self.bad_info_file):
             os.remove(self.bad_info_file)
-        if os.path.exists(self.test_db):
-            os.remove(self.test_db)
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
         if os.path.exists(self.test_dir):
             try:
                 os.rmdir(self.test_dir)
@@ -37,8 +42,8 @@ class TestBadInfo(unittest.TestCase):
                 pass
 
     @patch('app.load_token')
-    @patch('app.requests.get')
-    @patch('app.requests.post')
+    @patch('app.ticktick.session.get')
+    @patch('app.ticktick.session.post')
     def test_save_bad_info(self, mock_post, mock_get, mock_load_token):
         # Create a session to link logs to
         session_id = database.create_session()
@@ -3,6 +3,7 @@ import json
 import os
 import sqlite3
 from unittest.mock import patch, MagicMock
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
 import app
 import database
 
@@ -23,13 +24,17 @@ class TestLogging(unittest.TestCase):
         app.PROJECT_CACHE.clear()
 
     def tearDown(self):
-        if os.path.exists(self.test_db):
-            os.remove(self.test_db)
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_scan_meals_logging(self):
         # Mock dependencies
         with patch('app.load_token') as mock_load_token, \
-             patch('app.requests.get') as mock_get, \
+             patch('app.ticktick.session.get') as mock_get, \
              patch('app.scrape_me') as mock_scrape, \
              patch('app.llm_client.chat.completions.create') as mock_llm_create:
 
@@ -108,8 +113,8 @@ class TestLogging(unittest.TestCase):
         session_id = database.create_session()
 
         with patch('app.load_token') as mock_load_token, \
-             patch('app.requests.get') as mock_get, \
-             patch('app.requests.post') as mock_post:
+             patch('app.ticktick.session.get') as mock_get, \
+             patch('app.ticktick.session.post') as mock_post:
 
             mock_load_token.return_value = "fake_token"
             with self.app.session_transaction() as sess:
@@ -153,8 +158,8 @@ class TestLogging(unittest.TestCase):
         session_id = database.create_session()
 
         with patch('app.load_token') as mock_load_token, \
-             patch('app.requests.get') as mock_get, \
-             patch('app.requests.post') as mock_post:
+             patch('app.ticktick.session.get') as mock_get, \
+             patch('app.ticktick.session.post') as mock_post:
 
             mock_load_token.return_value = "fake_token"
             with self.app.session_transaction() as sess:
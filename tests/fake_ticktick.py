@@ -0,0 +1,106 @@
+"""A local stand-in for the TickTick Open API, for exercising the HTTP client end to end."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeTickTick:
+    """
+    Serves /open/v1/project, /open/v1/project/<id>/data, POST /open/v1/task and
+    POST /open/v1/task/<id> on 127.0.0.1. Created tasks show up in their
+    project's data. `failures` is a list of (status, headers) answered before
+    the real responses; `delay` stalls every response. Requests and
+    connections are recorded.
+    """
+
+    def __init__(self, projects=None, project_data=None):
+        self.projects = projects or [{"id": "p1", "name": "Week's Meal Ideas"}, {"id": "g1", "name": "Groceries"}]
+        self.project_data = project_data or {}
+        self.failures = []
+        self.delay = 0.0
+        self.requests = []
+        self.connections = 0
+        self.tasks = []
+        self.updates = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        # Clients that time out hang up mid-reply; that is expected here
+        self.server.handle_error = lambda request, client_address: None
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/open/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=None, headers=None):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with fake._lock:
+                    fake.requests.append((method, self.path, self.headers.get("Authorization"), time.monotonic()))
+                    failure = fake.failures.pop(0) if fake.failures else None
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if failure:
+                    return self._reply(failure[0], {"error": "injected"}, failure[1])
+                if method == "GET" and self.path == "/open/v1/project":
+                    return self._reply(200, fake.projects)
+                if method == "GET" and self.path.startswith("/open/v1/project/") and self.path.endswith("/data"):
+                    project_id = self.path.split("/")[4]
+                    data = fake.project_data.get(project_id, {"tasks": [], "columns": []})
+                    with fake._lock:
+                        created = [t for t in fake.tasks if t.get("projectId") == project_id]
+                    return self._reply(200, dict(data, tasks=data.get("tasks", []) + created))
+                if method == "POST" and self.path == "/open/v1/task":
+                    with fake._lock:
+                        task = dict(json.loads(body), id=f"task-{len(fake.tasks) + 1}")
+                        fake.tasks.append(task)
+                    return self._reply(200, task)
+                if method == "POST" and self.path.startswith("/open/v1/task/"):
+                    task_id = self.path.split("/")[4]
+                    changes = json.loads(body)
+                    with fake._lock:
+                        existing = [t for data in fake.project_data.values() for t in data.get("tasks", [])] + fake.tasks
+                        for task in existing:
+                            if task.get("id") == task_id:
+                                task.update(changes)
+                                fake.updates.append(task_id)
+                                return self._reply(200, task)
+                    return self._reply(404, {"error": "no such task"})
+                self._reply(404, {"error": "not found"})
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+        return Handler
@@ -4,6 +4,7 @@ import json
 import os
 import app
 import database
+import aggregation
 
 class TestAggregation(unittest.TestCase):
     def setUp(self):
@@ -14,8 +15,12 @@ class TestAggregation(unittest.TestCase):
 
     def tearDown(self):
         database.close_db()
-        if os.path.exists(self.test_db):
-            os.remove(self.test_db)
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_process_tasks_instances_structure(self):
         # Setup dummy tasks
@@ -97,5 +102,49 @@ class TestAggregation(unittest.TestCase):
             self.assertTrue(res_map['olive oil']['likely_have'])
             self.assertFalse(res_map['chicken breast']['likely_have'])
 
+class TestAggregationEngine(unittest.TestCase):
+    def fold(self, rows):
+        groups = {}
+        for task_id, raw, name, quantity, unit, source in rows:
+            aggregation.add_ingredient(groups, {"raw": raw, "source": source},
+                                       {"name": name, "quantity": quantity, "unit": unit}, task_id, app.is_likely_have)
+        return groups
+
+    def test_totals_follow_first_unit(self):
+        groups = self.fold([
+            ("t1", "1 cup milk", "milk", "1", "cup", "A"),
+            ("t1", "2 tbsp milk", "milk", "2", "tablespoon", "A"),
+            ("t2", "1/2 cup milk", "milk", "1/2", "cup", "B"),
+            ("t2", "1 milk", "milk", "1", "count", "B"),
+            ("t3", "1 1/2 cup milk", "milk", "1 1/2", "cup", "C"),
+        ])
+        total = groups["milk"].total_quantity()
+        self.assertEqual(total.unit, "cup")
+        self.assertAlmostEqual(total.magnitude, 3.125)
+        self.assertEqual(groups["milk"].task_ids, ["t1", "t2", "t3"])
+
+    def test_unparseable_quantities_count_as_one(self):
+        groups = self.fold([
+            ("t1", "some eggs", "egg", "some", "count", "A"),
+            ("t1", "2 eggs", "egg", "2-3", None, "A"),
+            ("t2", "3 smidgens egg", "egg", "3", "smidgen", "B"),
+        ])
+        self.assertEqual(groups["egg"].total_quantity().magnitude, 5)
+
+    def test_serialize_matches_payload_schema(self):
+        groups = self.fold([("t1", "1 cup rice", "rice", "1", "cup", "Bowl"),
+                            ("t2", "salt", "salt", "1", "", "Bowl")])
+        results = aggregation.serialize(groups, lambda name, qty: f"{name}!")
+        self.assertEqual(results[0], {
+            "base_name": "rice", "name": "rice!",
+            "instances": [{"raw": "1 cup rice", "quantity": "1", "unit": "cup", "source": "Bowl", "original_name": "rice"}],
+            "original_task_ids": ["t1"], "likely_have": False})
+        self.assertTrue(results[1]["likely_have"])
+        self.assertEqual(results[1]["instances"][0]["unit"], "")
+
+        first, second = groups["rice"].instances[0], groups["salt"].instances[0]
+        self.assertIs(first.source, second.source)
+        self.assertFalse(hasattr(first, "__dict__"))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import patch
+import io
+import os
+from contextlib import redirect_stdout
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+import app
+import database
+import audit_analysis
+import system_analysis
+
+def capture(func, **kwargs):
+    out = io.StringIO()
+    with redirect_stdout(out):
+        func(**kwargs)
+    return out.getvalue()
+
+class TestAnalysisScripts(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_analysis.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_audit_counts_every_row_in_sql(self):
+        s1 = database.create_session()
+        s2 = database.create_session()
+        rows = [("1 cup flour", "flour", "flour", "Pasta", "accepted_as_is")] * 1200
+        rows += [("2 eggs", "egg", "eggs", "Pasta", "accepted_with_edits", 1),
+                 ("salt", "salt", None, "Bread", "rejected_likely_have")]
+        database.log_audit_bulk(s1, rows)
+        database.log_audit_bulk(s2, [("1 lime", "lime", None, "Tacos", "rejected_user")])
+
+        report = capture(audit_analysis.perform_audit)
+        self.assertIn("**Total Samples Analyzed:** 1203", report)
+        self.assertIn("- accepted_as_is: 1200 (99.8%)", report)
+        self.assertIn("- '2 eggs' -> 'eggs' (count: 1)", report)
+        self.assertIn("- 'salt' (count: 1)", report)
+        self.assertIn("- Pasta: 1201 ingredients", report)
+
+        report = capture(audit_analysis.perform_audit, session_id=s2)
+        self.assertIn("**Total Samples Analyzed:** 1", report)
+        self.assertNotIn("Pasta", report)
+
+        self.assertIn("No audit logs found.", capture(audit_analysis.perform_audit, since="2999-01-01"))
+
+    def test_system_report_merges_plain_and_compressed_rows(self):
+        database.log_event("s1", "normalization", {"input": "2 eggs", "output": {"name": "egg"}})
+        database.log_event("s1", "normalization", {"input": "2 eggs", "output": {"name": "egg"}})
+        database.log_event("s2", "normalization", {"input": "salt", "output": "salt"})
+        database.log_event("s1", "llm_response", {"response": "- tortillas\n- beef"})
+        with patch.dict(database.EVENT_POLICIES, {"normalization": {"compress": True}}), \
+             patch('database.COMPRESS_MIN_BYTES', 0):
+            database.log_event("s2", "normalization", {"input": "2 eggs", "output": {"name": "egg"}})
+
+        report = capture(system_analysis.analyze_system_logs)
+        self.assertIn("**Total Events:** 5", report)
+        self.assertIn("- normalization: 4", report)
+        self.assertIn("- '2 eggs' -> 'egg' (count: 3)", report)
+        self.assertNotIn("'salt'", report)
+        self.assertIn("- tortillas (1)", report)
+
+        report = capture(system_analysis.analyze_system_logs, session_id="s2")
+        self.assertIn("- '2 eggs' -> 'egg' (count: 1)", report)
+        self.assertNotIn("LLM Ingredient Extractions", report)
+
+        self.assertIn("No system logs found.", capture(system_analysis.analyze_system_logs, until="2000-01-01"))
+
+    def test_unfiltered_reports_and_endpoint_use_rollups(self):
+        session_id = database.create_session()
+        database.log_audit_bulk(session_id, [("1 lime", "lime", None, "Tacos", "rejected_user")])
+        database.log_event(session_id, "normalization", {"input": "1 lime", "output": {"name": "lime"}})
+
+        with patch('database.get_rollups', wraps=database.get_rollups) as mock_rollups:
+            audit_report = capture(audit_analysis.perform_audit)
+            system_report = capture(system_analysis.analyze_system_logs)
+        self.assertEqual(mock_rollups.call_count, 2)
+        self.assertIn("- rejected_user: 1 (100.0%)", audit_report)
+        self.assertIn("- Tacos: 1 ingredients", audit_report)
+        self.assertIn("- '1 lime' -> 'lime' (count: 1)", system_report)
+
+        response = app.app.test_client().get('/api/analytics?top=1')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["outcomes"], {"rejected_user": 1})
+        self.assertEqual(data["top_normalizations"], [{"raw": "1 lime", "normalized": "lime", "count": 1}])
+
+if __name__ == '__main__':
+    unittest.main()
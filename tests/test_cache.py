@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import app
+import database
+from cache import LRUCache
+from ticktick_client import TickTickClient
+from tests.fake_ticktick import FakeTickTick
+
+class TestLRUCache(unittest.TestCase):
+    def test_bounded_and_expiring(self):
+        cache = LRUCache(maxsize=2, ttl=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)  # evicts "b", the least recently used
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+
+    def test_concurrent_misses_load_once(self):
+        cache = LRUCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: cache.get_or_load("k", loader), range(8)))
+        self.assertEqual(results, ["value"] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["loads"], 1)
+
+    def test_none_is_not_cached_and_errors_reach_waiters(self):
+        cache = LRUCache()
+        self.assertIsNone(cache.get_or_load("k", lambda: None))
+        self.assertEqual(cache.get_or_load("k", lambda: 1), 1)
+
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(cache.get_or_load, "x", failing)
+            started.wait()
+            second = pool.submit(cache.get_or_load, "x", failing)
+            for future in (first, second):
+                with self.assertRaises(ValueError):
+                    future.result()
+        self.assertEqual(cache.get_or_load("x", lambda: 2), 2)
+
+class TestProjectCache(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_cache.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        app.PROJECT_CACHE.clear()
+        self.fake = FakeTickTick(projects=[{"id": "p1", "name": "Week's Meal Ideas"},
+                                           {"id": "g1", "name": "Groceries"},
+                                           {"id": "g2", "name": "groceries"}]).__enter__()
+        patcher = patch('app.ticktick', TickTickClient(base_url=self.fake.url, sleep=lambda s: None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        app.PROJECT_CACHE.clear()
+        self.fake.__exit__()
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def project_fetches(self):
+        return sum(1 for request in self.fake.requests if request[1].endswith("/project"))
+
+    def test_lookup_by_name(self):
+        self.assertEqual(app.find_project_id("tok", "week's meal ideas"), "p1")
+        self.assertEqual(app.find_project_id("tok", "GROCERIES"), "g1")  # first match wins, as before
+        self.assertIsNone(app.find_project_id("tok", "Missing"))
+        self.assertEqual(self.project_fetches(), 1)
+
+    def test_concurrent_requests_fetch_once(self):
+        self.fake.delay = 0.1
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            ids = list(pool.map(lambda _: app.find_project_id("tok", "Groceries"), range(6)))
+        self.assertEqual(ids, ["g1"] * 6)
+        self.assertEqual(self.project_fetches(), 1)
+
+    def test_failed_fetch_is_retried_next_time(self):
+        self.fake.failures = [(500, {})] * 4  # first attempt plus three retries
+        self.assertIsNone(app.find_project_id("tok", "Groceries"))
+        self.assertEqual(app.find_project_id("tok", "Groceries"), "g1")
+
+    def test_shared_tier_serves_other_workers(self):
+        with patch('app.PROJECT_CACHE_SHARED', True):
+            self.assertEqual(app.find_project_id("tok", "Groceries"), "g1")
+            app.PROJECT_CACHE.clear()  # a different worker: empty memory tier, same database
+            self.assertEqual(app.find_project_id("tok", "Week's Meal Ideas"), "p1")
+        self.assertEqual(self.project_fetches(), 1)
+        stored = database.get_connection().execute("SELECT token_key FROM project_cache").fetchall()
+        self.assertEqual(len(stored), 1)
+        self.assertNotIn("tok", stored[0][0])
+
+if __name__ == '__main__':
+    unittest.main()
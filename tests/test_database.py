@@ -1,6 +1,10 @@
 import unittest
+from unittest.mock import patch
 import os
+import json
 import sqlite3
+import subprocess
+import sys
 import database
 
 class TestDatabase(unittest.TestCase):
@@ -12,15 +16,18 @@ class TestDatabase(unittest.TestCase):
         database.init_db()
 
     def tearDown(self):
+        database.wait_for_backup(timeout=5)
         # We need to close the connection in the current thread before removing the file
         if hasattr(database._local, "conn"):
             database._local.conn.close()
             del database._local.conn
-        if os.path.exists(self.test_db):
-            try:
-                os.remove(self.test_db)
-            except PermissionError:
-                pass
+        for path in ([self.test_db, database.backup_path() + ".lock"] +
+                     [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except PermissionError:
+                    pass
 
     def test_init_db(self):
         conn = sqlite3.connect(self.test_db)
@@ -33,6 +40,48 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNotNone(c.fetchone())
         conn.close()
 
+    def test_schema_version(self):
+        self.assertEqual(database.get_schema_version(), len(database.MIGRATIONS))
+        conn = sqlite3.connect(self.test_db)
+        c = conn.cursor()
+        c.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_audit_log_created_at'")
+        self.assertIsNotNone(c.fetchone())
+        c.execute("EXPLAIN QUERY PLAN SELECT * FROM audit_log ORDER BY created_at DESC LIMIT 10")
+        self.assertIn("idx_audit_log_created_at", " ".join(str(row) for row in c.fetchall()))
+        conn.close()
+
+    def test_migrate_legacy_database(self):
+        # A database created before migrations: tables exist, user_version is 0
+        database.close_db()
+        os.remove(self.test_db)
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("CREATE TABLE sessions (id TEXT PRIMARY KEY, created_at TEXT, completed_at TEXT, is_complete INTEGER DEFAULT 0)")
+        conn.execute("INSERT INTO sessions (id, created_at) VALUES ('old', '2024-01-01')")
+        conn.commit()
+        conn.close()
+
+        database.init_db()
+        database.init_db()
+
+        self.assertEqual(database.get_schema_version(), len(database.MIGRATIONS))
+        c = database.get_connection().cursor()
+        c.execute("SELECT id FROM sessions")
+        self.assertEqual(c.fetchall(), [("old",)])
+
+    def test_failed_migration_rolls_back(self):
+        def broken(c):
+            c.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        with patch('database.MIGRATIONS', database.MIGRATIONS + [broken]):
+            with self.assertRaises(RuntimeError):
+                database.migrate()
+
+        self.assertEqual(database.get_schema_version(), len(database.MIGRATIONS))
+        c = database.get_connection().cursor()
+        c.execute("SELECT name FROM sqlite_master WHERE name='half_done'")
+        self.assertIsNone(c.fetchone())
+
     def test_log_audit(self):
         session_id = database.create_session()
         database.log_audit(session_id, "1 cup raw", "raw", "final", "recipe", "added_asis")
@@ -48,6 +97,38 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(row[4], "added_asis")
         conn.close()
 
+    def test_log_audit_bulk_completes_session(self):
+        session_id = database.create_session()
+        database.log_audit_bulk(session_id, [
+            ("1 cup flour", "flour", "1 cup flour", "Bread", "added"),
+            ("1 rejected raw", "salt", "salt", "Unknown", "rejected_have_it"),
+            ("N/A", "milk", "milk", "Manual Entry", "added_manual", 1),
+        ], complete=True)
+
+        conn = sqlite3.connect(self.test_db)
+        c = conn.cursor()
+        c.execute("SELECT ingredient_raw, outcome, correction_made FROM audit_log WHERE session_id=? ORDER BY id", (session_id,))
+        self.assertEqual(c.fetchall(), [("1 cup flour", "added", 0), ("1 rejected raw", "rejected_have_it", 0), ("N/A", "added_manual", 1)])
+        c.execute("SELECT is_complete FROM sessions WHERE id=?", (session_id,))
+        self.assertEqual(c.fetchone()[0], 1)
+        conn.close()
+
+    def test_log_audit_bulk_is_atomic(self):
+        session_id = database.create_session()
+        with self.assertRaises(sqlite3.Error):
+            database.log_audit_bulk(session_id, [
+                ("1 cup flour", "flour", "1 cup flour", "Bread", "added"),
+                ({"not": "storable"}, "flour", "1 cup flour", "Bread", "added"),
+            ], complete=True)
+
+        conn = sqlite3.connect(self.test_db)
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM audit_log WHERE session_id=?", (session_id,))
+        self.assertEqual(c.fetchone()[0], 0)
+        c.execute("SELECT is_complete FROM sessions WHERE id=?", (session_id,))
+        self.assertEqual(c.fetchone()[0], 0)
+        conn.close()
+
     def test_create_session(self):
         session_id = database.create_session()
         self.assertTrue(len(session_id) > 0)
@@ -70,6 +151,25 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(row[1], '{"key": "value"}')
         conn.close()
 
+    def test_buffered_log_event(self):
+        session_id = database.create_session()
+        with patch('database.LOG_BUFFERED', True), patch('database.LOG_FLUSH_INTERVAL', 60):
+            for i in range(50):
+                database.log_event(session_id, "normalization", {"i": i})
+            database.flush_events()
+
+        conn = sqlite3.connect(self.test_db)
+        c = conn.cursor()
+        c.execute("SELECT data FROM logs WHERE session_id=? ORDER BY id", (session_id,))
+        self.assertEqual([row[0] for row in c.fetchall()], ['{"i": %d}' % i for i in range(50)])
+        conn.close()
+
+    def test_wal_journal_mode(self):
+        database.close_db()
+        with patch('database.JOURNAL_MODE', "WAL"):
+            mode = database.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
     def test_complete_session(self):
         session_id = database.create_session()
         database.complete_session(session_id)
@@ -80,5 +180,192 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(c.fetchone()[0], 1)
         conn.close()
 
+    def test_recipe_cache_roundtrip(self):
+        self.assertIsNone(database.get_cached_recipe("https://example.com/pasta/"))
+        database.cache_recipe("https://example.com/pasta/", "Pasta", ["1 cup flour"])
+
+        # Trailing slash, host case, fragments and tracking params share one entry
+        cached = database.get_cached_recipe("https://EXAMPLE.com/pasta?utm_source=x#step-2")
+        self.assertEqual(cached, ("Pasta", ["1 cup flour"]))
+        self.assertIsNone(database.get_cached_recipe("https://example.com/pasta", ttl=-1))
+
+        self.assertEqual(database.get_cache_stats()["recipe"], {"hits": 1, "misses": 2})
+
+    def test_cache_lookups_do_not_write(self):
+        conn = database.get_connection()
+        database.get_cache_stats()
+        changes = conn.total_changes
+        for _ in range(5):
+            database.get_cached_recipe("https://example.com/pasta")
+        self.assertEqual(conn.total_changes, changes)
+        self.assertEqual(database.get_cache_stats()["recipe"], {"hits": 0, "misses": 5})
+
+        with patch('database.CACHE_STATS_FLUSH_INTERVAL', 0):
+            database.get_cached_recipe("https://example.com/pasta")
+        self.assertEqual(conn.execute("SELECT misses FROM cache_stats WHERE name = 'recipe'").fetchone(), (6,))
+
+    def test_invalidate_recipe_cache(self):
+        database.cache_recipe("https://example.com/a", "A", ["salt"])
+        database.cache_recipe("https://example.com/b", "B", ["pepper"])
+
+        self.assertEqual(database.invalidate_recipe_cache("https://example.com/a"), 1)
+        self.assertIsNone(database.get_cached_recipe("https://example.com/a"))
+        self.assertIsNotNone(database.get_cached_recipe("https://example.com/b"))
+
+        self.assertEqual(database.invalidate_recipe_cache(), 1)
+        self.assertIsNone(database.get_cached_recipe("https://example.com/b"))
+
+    def test_run_backup_rotates_generations(self):
+        for i in range(database.BACKUP_GENERATIONS + 1):
+            database.create_session()
+            database.run_backup()
+
+        counts = []
+        for generation in range(database.BACKUP_GENERATIONS):
+            conn = sqlite3.connect(database.backup_path(generation))
+            counts.append(conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0])
+            conn.close()
+        newest = database.BACKUP_GENERATIONS + 1
+        self.assertEqual(counts, list(range(newest, newest - database.BACKUP_GENERATIONS, -1)))
+        self.assertFalse(os.path.exists(database.backup_path(database.BACKUP_GENERATIONS)))
+
+    def test_concurrent_backups_from_several_processes(self):
+        for _ in range(200):
+            database.create_session()
+        script = "import database; database.DB_FILE = sys.argv[1]; [database.run_backup() for _ in range(3)]"
+        workers = [subprocess.Popen([sys.executable, "-c", "import sys; " + script, self.test_db],
+                                    cwd=os.path.dirname(os.path.abspath(database.__file__)))
+                   for _ in range(4)]
+        self.assertEqual([worker.wait(timeout=60) for worker in workers], [0] * 4)
+
+        for generation in range(database.BACKUP_GENERATIONS):
+            conn = sqlite3.connect(database.backup_path(generation))
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0], 200)
+            conn.close()
+        self.assertEqual([name for name in os.listdir(".") if name.startswith(self.test_db) and name.endswith(".tmp")], [])
+
+    def test_backup_db_runs_in_background(self):
+        session_id = database.create_session()
+        database.backup_db()
+        self.assertTrue(database.wait_for_backup(timeout=5))
+
+        conn = sqlite3.connect(database.backup_path())
+        self.assertEqual(conn.execute("SELECT id FROM sessions").fetchall(), [(session_id,)])
+        conn.close()
+
+    def test_event_policies(self):
+        session_id = database.create_session()
+        big = {"result": [{"base_name": f"item {i}", "instances": []} for i in range(200)]}
+        database.log_event(session_id, "aggregation", big)
+        database.log_event(session_id, "llm_response", {"response": "x" * 5000})
+        with patch.dict(database.EVENT_POLICIES, {"normalization": {"sample": 0.0}}):
+            database.log_event(session_id, "normalization", {"input": "1 cup rice"})
+
+        conn = sqlite3.connect(self.test_db)
+        c = conn.cursor()
+        c.execute("SELECT event_type, encoding, length(data) FROM logs WHERE session_id=? ORDER BY id", (session_id,))
+        rows = c.fetchall()
+        conn.close()
+        self.assertEqual([(r[0], r[1]) for r in rows], [("aggregation", "zlib"), ("llm_response", "zlib")])
+        self.assertLess(rows[0][2], len(json.dumps(big)) / 4)
+
+        events = list(database.iter_events(session_id=session_id))
+        self.assertEqual(events[0][2], big)
+        self.assertEqual(events[1][2], {"response": "x" * 5000})
+
+    def test_run_retention_archives_and_summarizes(self):
+        old_session = database.create_session()
+        new_session = database.create_session()
+        database.log_event(old_session, "start_scan", {"input_list": "Meals"})
+        database.log_event(old_session, "aggregation", {"result": [{"base_name": "rice"}, {"base_name": "beans"}]})
+        database.log_event(old_session, "skipped_meals", ["Leftovers"])
+        database.log_event(new_session, "start_scan", {"input_list": "Meals"})
+        conn = database.get_connection()
+        conn.execute("UPDATE logs SET created_at = '2020-01-01T00:00:00' WHERE session_id = ?", (old_session,))
+        conn.commit()
+
+        archive = self.test_db + ".archive"
+        try:
+            result = database.run_retention(days=30, archive_path=archive)
+            self.assertEqual(result, {"sessions_summarized": 1, "logs_archived": 3, "logs_pruned": 3})
+
+            self.assertEqual([e[0] for e in database.iter_events()], [new_session])
+            c = conn.cursor()
+            c.execute("SELECT event_counts, ingredient_count, skipped_meals FROM session_summaries WHERE session_id=?", (old_session,))
+            counts, ingredient_count, skipped = c.fetchone()
+            self.assertEqual(json.loads(counts), {"start_scan": 1, "aggregation": 1, "skipped_meals": 1})
+            self.assertEqual(ingredient_count, 2)
+            self.assertEqual(json.loads(skipped), ["Leftovers"])
+
+            archived = sqlite3.connect(archive)
+            rows = archived.execute("SELECT event_type, data, encoding FROM logs ORDER BY id").fetchall()
+            archived.close()
+            self.assertEqual(database.decode_event_data(rows[1][1], rows[1][2]), {"result": [{"base_name": "rice"}, {"base_name": "beans"}]})
+        finally:
+            if os.path.exists(archive):
+                os.remove(archive)
+
+    def test_run_retention_prunes_finished_scan_jobs(self):
+        for session_id in ("old-done", "old-running", "new-done"):
+            database.create_scan_job(session_id)
+            database.save_scan_event(session_id, 1, {"status": "Working"})
+        database.finish_scan_job("old-done", "done", {"ingredients": []})
+        database.finish_scan_job("new-done", "done", {"ingredients": []})
+        conn = database.get_connection()
+        for table in ("scan_jobs", "scan_events"):
+            conn.execute(f"UPDATE {table} SET created_at = '2020-01-01T00:00:00' WHERE session_id LIKE 'old-%'")
+        conn.commit()
+
+        database.run_retention(days=30)
+        self.assertIsNone(database.get_scan_job("old-done"))
+        self.assertEqual(database.get_scan_events("old-done"), [])
+        self.assertEqual(database.get_scan_job("old-running")["status"], "running")
+        self.assertEqual(len(database.get_scan_events("old-running")), 1)
+        self.assertEqual(database.get_scan_job("new-done")["status"], "done")
+
+    def test_rollups_are_incremental(self):
+        session_id = database.create_session()
+        database.log_audit_bulk(session_id, [("salt", "salt", None, "Bread", "rejected_likely_have"),
+                                             ("2 eggs", "egg", "eggs", "Pasta", "accepted_with_edits", 1)])
+        database.log_event(session_id, "normalization", {"input": "2 eggs", "output": {"name": "egg"}})
+        database.log_event(session_id, "llm_response", {"response": "- tortillas\n- beef"})
+        first = database.get_rollups()
+        self.assertEqual(first["outcomes"], {"rejected_likely_have": 1, "accepted_with_edits": 1})
+        self.assertEqual(first["event_counts"], {"normalization": 1, "llm_response": 1})
+
+        # A second refresh with nothing new must not double count
+        database.refresh_rollups()
+        database.log_audit(session_id, "salt", "salt", None, "Soup", "rejected_likely_have")
+        database.log_event(session_id, "normalization", {"input": "2 eggs", "output": {"name": "egg"}})
+        rollups = database.get_rollups()
+
+        self.assertEqual(rollups["total_samples"], 3)
+        self.assertEqual(rollups["top_rejections"], [{"raw": "salt", "count": 2}])
+        self.assertEqual(rollups["top_corrections"], [{"raw": "2 eggs", "final": "eggs", "count": 1}])
+        self.assertEqual(rollups["top_normalizations"], [{"raw": "2 eggs", "normalized": "egg", "count": 2}])
+        self.assertEqual({r["ingredient"] for r in rollups["top_llm_extractions"]}, {"tortillas", "beef"})
+        self.assertEqual(list(rollups["outcomes_by_day"].values())[0]["rejected_likely_have"], 2)
+
+        # Pruned history stays counted
+        database.get_connection().execute("UPDATE logs SET created_at = '2020-01-01T00:00:00'")
+        database.get_connection().commit()
+        database.run_retention(days=30)
+        self.assertEqual(database.get_rollups()["event_counts"]["normalization"], 2)
+
+    def test_rollups_catch_up_in_batches(self):
+        session_id = database.create_session()
+        database.log_audit_bulk(session_id, [("salt", "salt", None, "Bread", "rejected_likely_have")] * 7)
+        for _ in range(5):
+            database.log_event(session_id, "normalization", {"input": "2 eggs", "output": {"name": "egg"}})
+
+        transactions = []
+        batch = database._refresh_rollups_batch
+        with patch('database._refresh_rollups_batch', side_effect=lambda *a: transactions.append(a) or batch(*a)):
+            database.refresh_rollups(batch=2)
+        self.assertEqual(len(transactions), 4)  # 7 audit rows, 2 per transaction
+        rollups = database.get_rollups()
+        self.assertEqual(rollups["top_rejections"], [{"raw": "salt", "count": 7}])
+        self.assertEqual(rollups["top_normalizations"], [{"raw": "2 eggs", "normalized": "egg", "count": 5}])
+
 if __name__ == '__main__':
     unittest.main()
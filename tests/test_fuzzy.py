@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch
+import itertools
+import json
+import os
+import random
+import aggregation
+import app
+import database
+import fuzzy
+
+class TestFuzzyMerge(unittest.TestCase):
+    def test_name_key(self):
+        self.assertEqual(fuzzy.name_key("Fresh Parmesan Cheese"), "parmesan")
+        self.assertEqual(fuzzy.name_key("parmesans"), "parmesan")
+        self.assertEqual(fuzzy.name_key("Jalapeños"), "jalapeno")
+        self.assertEqual(fuzzy.name_key("basil leaves"), "basil")
+        self.assertEqual(fuzzy.name_key("cream cheese"), "cream cheese")
+        self.assertEqual(fuzzy.name_key("diced tomatoes"), "diced tomato")
+
+    def test_clusters_near_duplicates_only(self):
+        weights = {"parmesan cheese": 1, "parmesan": 3, "parmesans": 1, "cream cheese": 2, "cottage cheese": 1,
+                   "cream": 1, "garlic": 2, "garlic powder": 1, "white wine": 1, "white wine vinegar": 1,
+                   "red bell pepper": 1, "bell pepper": 1, "tomatoes": 1, "cherry tomatoes": 1}
+        self.assertEqual(fuzzy.cluster_names(weights), {"parmesan cheese": "parmesan", "parmesans": "parmesan"})
+        # Typos need similarity, not just folding
+        self.assertEqual(fuzzy.cluster_names({"worcestershire sauce": 2, "worchestershire sauce": 1}),
+                         {"worchestershire sauce": "worcestershire sauce"})
+        self.assertEqual(fuzzy.cluster_names({"worcestershire sauce": 2, "worchestershire sauce": 1}, threshold=1.01), {})
+
+    def test_extra_head_noun_is_another_item(self):
+        for a, b in [("peanut butter", "peanut butter cups"), ("graham crackers", "graham cracker crust"),
+                     ("chicken broth", "chicken broth cubes")]:
+            self.assertEqual(fuzzy.cluster_names({a: 2, b: 1}), {}, (a, b))
+            self.assertEqual(fuzzy.cluster_names({a: 2, b: 1}, threshold=0.5), {}, (a, b))
+        self.assertTrue(fuzzy.adds_head_noun("graham cracker", "graham cracker crust"))
+        self.assertFalse(fuzzy.adds_head_noun("bell pepper", "red bell pepper"))
+
+    def test_index_matches_all_pairs(self):
+        rng = random.Random(3)
+        words = ["chicken", "thigh", "breast", "green", "onion", "red", "bean", "black", "rice", "brown", "sauce"]
+        keys = list(dict.fromkeys(" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(300)))
+        keys += [key[:-1] + "z" for key in keys[:40]]  # one-letter typos
+        for threshold in (0.5, 0.75, 0.9):
+            expected = set()
+            for i, j in itertools.combinations(range(len(keys)), 2):
+                a, b = fuzzy.trigrams(keys[i]), fuzzy.trigrams(keys[j])
+                if len(a & b) / len(a | b) >= threshold:
+                    expected.add((i, j))
+            self.assertEqual(set(fuzzy.similar_pairs(keys, threshold)), expected)
+
+    def test_merge_groups(self):
+        groups = {}
+        for task_id, name, qty, unit in [("t1", "parmesan cheese", "1", "oz"), ("t2", "salt", "1", "tsp"),
+                                         ("t2", "parmesan", "1/2", "cup"), ("t3", "parmesan", "2", "oz")]:
+            aggregation.add_ingredient(groups, {"raw": f"{qty} {unit} {name}", "source": task_id},
+                                       {"name": name, "quantity": qty, "unit": unit}, task_id, lambda name: False)
+        merged = aggregation.merge_groups(groups, {"parmesan cheese": "parmesan"})
+        self.assertEqual(list(merged), ["parmesan", "salt"])
+        parmesan = merged["parmesan"]
+        self.assertEqual([i.original_name for i in parmesan.instances], ["parmesan cheese", "parmesan", "parmesan"])
+        self.assertEqual(parmesan.task_ids, ["t1", "t2", "t3"])
+        self.assertEqual(parmesan.totals, {"oz": [3.0, 2], "cup": [0.5, 1]})
+
+class TestScanMerging(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_fuzzy.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_scan_returns_one_card(self):
+        tasks = [{"id": "t1", "title": "Pasta", "content": "", "desc": ""}]
+        with patch('app.get_ingredients_from_llm', return_value=["2 oz parmesan cheese", "1 oz parmesan", "3 eggs"]):
+            final = None
+            for chunk in app.process_tasks(tasks, "s1"):
+                data = json.loads(chunk[6:])
+                if 'ingredients' in data:
+                    final = data
+        self.assertEqual([g['base_name'] for g in final['ingredients']], ["parmesan cheese", "egg"])
+        self.assertEqual(final['ingredients'][0]['name'], "3 oz parmesan cheese")
+        self.assertEqual(len(final['ingredients'][0]['instances']), 2)
+
+if __name__ == '__main__':
+    unittest.main()
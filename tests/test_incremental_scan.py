@@ -0,0 +1,150 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import os
+import app
+import database
+
+def run_scan(tasks, session_id="s1", incremental=True):
+    statuses = []
+    final = None
+    for chunk in app.process_tasks(tasks, session_id, incremental=incremental):
+        data = json.loads(chunk[6:])
+        if 'ingredients' in data:
+            final = data
+        else:
+            statuses.append(data.get('status') or data.get('error'))
+    return statuses, final
+
+def fake_llm(text, session_id=None, ignore_recipe=None):
+    return [f"1 cup {word}" for word in text.lower().split()[1:]]
+
+def fake_normalize(ingredient_lists, session_id=None, pool=None, fallbacks=None):
+    return [[(item, {"name": item['raw'].split()[-1], "quantity": "1", "unit": "cup"}) for item in items]
+            for items in ingredient_lists]
+
+class TestIncrementalScan(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_incremental_scan.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        self.tasks = [
+            {"id": "t1", "title": "Bowl rice beans", "content": "", "desc": ""},
+            {"id": "t2", "title": "Salad kale beans", "content": "", "desc": ""},
+            {"id": "t3", "title": "Soup leek", "content": "", "desc": ""},
+        ]
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def scan(self, tasks, incremental=True):
+        with patch('app.get_ingredients_from_llm', side_effect=fake_llm) as llm, \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize) as normalize:
+            statuses, final = run_scan(tasks, incremental=incremental)
+        return statuses, final, [c.args[0] for c in llm.call_args_list], normalize
+
+    def test_only_changed_tasks_are_reprocessed(self):
+        self.scan(self.tasks)
+        edited = [dict(self.tasks[0]), self.tasks[1], self.tasks[2]]
+        edited[0]["title"] = "Bowl rice tofu"
+
+        statuses, final, prompts, normalize = self.scan(edited)
+
+        self.assertEqual(prompts, ["Bowl rice tofu"])
+        self.assertEqual(len(normalize.call_args.args[0]), 1)
+        self.assertIn('[2/3] Unchanged since last scan: Salad kale beans', statuses)
+        _, full, _, _ = self.scan(edited, incremental=False)
+        self.assertEqual(final, full)
+        self.assertEqual([g['base_name'] for g in final['ingredients']], ["rice", "tofu", "kale", "beans", "leek"])
+
+    def test_unchanged_scan_skips_llm_and_normalization(self):
+        _, first, _, _ = self.scan(self.tasks)
+        _, second, prompts, normalize = self.scan(self.tasks)
+
+        self.assertEqual(prompts, [])
+        normalize.assert_not_called()
+        self.assertEqual(second, first)
+
+    def test_prompt_change_invalidates(self):
+        self.scan(self.tasks)
+        with patch('app.NORMALIZE_SYSTEM_PROMPT', app.NORMALIZE_SYSTEM_PROMPT + " Be brief."):
+            _, _, prompts, _ = self.scan(self.tasks)
+        self.assertEqual(len(prompts), 3)
+
+    def test_empty_results_are_not_kept(self):
+        tasks = [{"id": "t9", "title": "Leftovers", "content": "", "desc": ""}]
+        self.scan(tasks)
+        self.assertEqual(database.get_task_results(["t9"]), {})
+        _, _, prompts, _ = self.scan(tasks)
+        self.assertEqual(prompts, ["Leftovers"])
+
+    def test_llm_fallbacks_are_not_kept(self):
+        tasks = [{"id": "t7", "title": "Lemonade", "content": "", "desc": ""}]
+        lines = lambda text, session_id=None, ignore_recipe=None: ["juice of 1 lemon", "salt and pepper"]
+        reply = MagicMock()
+        reply.choices[0].message.content = json.dumps({"ingredients": [
+            {"name": "lemon", "quantity": "1", "unit": "count", "original_index": 0},
+            {"name": "salt", "quantity": "1", "unit": "count", "original_index": 1},
+            {"name": "pepper", "quantity": "1", "unit": "count", "original_index": 1}]})
+
+        with patch('app.get_ingredients_from_llm', side_effect=lines), \
+             patch('app.llm_client.chat.completions.create', side_effect=RuntimeError("LLM down")):
+            _, outage = run_scan(tasks)
+        self.assertIn("salt and pepper", [g['base_name'] for g in outage['ingredients']])
+        self.assertEqual(database.get_task_results(["t7"]), {})
+
+        with patch('app.get_ingredients_from_llm', side_effect=lines), \
+             patch('app.llm_client.chat.completions.create', return_value=reply) as create:
+            _, recovered = run_scan(tasks)
+        create.assert_called_once()
+        self.assertEqual(sorted(g['base_name'] for g in recovered['ingredients']), ["lemon", "pepper", "salt"])
+        self.assertIn("t7", database.get_task_results(["t7"]))
+
+    def test_failed_scrape_is_not_kept(self):
+        tasks = [{"id": "t6", "title": "Chili con carne", "content": "https://example.com/chili", "desc": ""}]
+        scraper = MagicMock()
+        scraper.ingredients.return_value = ["1 cup beans"]
+        scraper.title.return_value = "Chili con carne"
+
+        with patch('app.scrape_me', side_effect=RuntimeError("site down")):
+            _, outage, prompts, _ = self.scan(tasks)
+        self.assertEqual(prompts, ["Chili con carne"])  # the LLM guessed from the title
+        self.assertEqual(database.get_task_results(["t6"]), {})
+
+        with patch('app.scrape_me', return_value=scraper) as scrape:
+            statuses, _, _, _ = self.scan(tasks)
+        scrape.assert_called_once_with("https://example.com/chili")
+        self.assertNotIn('[1/1] Unchanged since last scan: Chili con carne', statuses)
+        self.assertIn("t6", database.get_task_results(["t6"]))
+
+    def test_failed_extraction_is_not_kept(self):
+        tasks = [{"id": "t5", "title": "Tacos https://example.com/tacos", "content": "Guacamole", "desc": ""}]
+        scraper = MagicMock()
+        scraper.ingredients.return_value = ["1 cup beans"]
+        scraper.title.return_value = "Street tacos"
+
+        with patch('app.scrape_me', return_value=scraper), \
+             patch('app.get_ingredients_from_llm', side_effect=RuntimeError("LLM down")), \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize):
+            _, partial = run_scan(tasks)
+        self.assertEqual([g['base_name'] for g in partial['ingredients']], ["beans"])
+        self.assertEqual(database.get_task_results(["t5"]), {})
+
+        with patch('app.scrape_me', return_value=scraper):
+            _, final, prompts, _ = self.scan(tasks)
+        self.assertEqual(prompts, ["Tacos  Guacamole"])
+        self.assertIn("t5", database.get_task_results(["t5"]))
+
+    def test_plain_scan_does_not_touch_task_results(self):
+        self.scan(self.tasks, incremental=False)
+        self.assertEqual(database.get_task_results(["t1", "t2", "t3"]), {})
+
+if __name__ == '__main__':
+    unittest.main()
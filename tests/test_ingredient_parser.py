@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import app
+import database
+from ingredient_parser import parse_ingredient
+
+class TestIngredientParser(unittest.TestCase):
+    def test_quantities_and_units(self):
+        cases = {
+            "1 cup flour": ("flour", "1", "cup"),
+            "200g flour": ("flour", "200", "gram"),
+            "1½ cups sugar": ("sugar", "1 1/2", "cup"),
+            "1 1/2 cups milk": ("milk", "1 1/2", "cup"),
+            "2 to 3 tbsp olive oil": ("olive oil", "2-3", "tbsp"),
+            ".5 lb beef": ("beef", "0.5", "lb"),
+            "2 eggs": ("egg", "2", "count"),
+            "3 garlic cloves, minced": ("garlic", "3", "clove"),
+            "2 cloves garlic": ("garlic", "2", "clove"),
+            "1 tsp ground cloves": ("ground cloves", "1", "tsp"),
+            "4 roma tomatoes": ("roma tomato", "4", "count"),
+            "2 tbsp molasses": ("molasses", "2", "tbsp"),
+            "pinch salt (optional)": ("salt", "1", "pinch"),
+            "2 c flour": ("flour", "2", "cup"),
+            "1 T sugar": ("sugar", "1", "tbsp"),
+            "1 t. vanilla": ("vanilla", "1", "tsp"),
+        }
+        for raw, expected in cases.items():
+            norm, confidence = parse_ingredient(raw)
+            self.assertEqual((norm["name"], norm["quantity"], norm["unit"]), expected, raw)
+            self.assertGreaterEqual(confidence, app.PARSER_MIN_CONFIDENCE, raw)
+
+    def test_notes_prices_and_package_sizes(self):
+        self.assertEqual(parse_ingredient("1 Tbsp oil* ($0.02) (optional)")[0]["name"], "oil")
+        self.assertEqual(parse_ingredient("3 large eggs, beaten")[0]["name"], "egg")
+        self.assertEqual(parse_ingredient("1 (15 oz) can black beans, drained")[0],
+                         {"name": "black bean", "quantity": "15", "unit": "oz"})
+        self.assertEqual(parse_ingredient("2 cans (14.5 oz) diced tomatoes")[0],
+                         {"name": "diced tomato", "quantity": "29", "unit": "oz"})
+
+    def test_ambiguous_lines_have_low_confidence(self):
+        for raw in ["Cilantro and avocado", "salt, pepper", "Juice of 1 lemon",
+                    "1 lb boneless skinless chicken thighs", "2 x flour",
+                    "1 tsp kosher salt", "2 tbsp extra-virgin olive oil"]:
+            self.assertLess(parse_ingredient(raw)[1], app.PARSER_MIN_CONFIDENCE, raw)
+        self.assertEqual(parse_ingredient("($0.50)"), (None, 0.0))
+
+class TestParserFastPath(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_ingredient_parser.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_only_low_confidence_lines_reach_llm(self):
+        items = [{"raw": "1 cup flour", "source": "A", "type": "scrape"},
+                 {"raw": "Salt and pepper to taste", "source": "A", "type": "scrape"}]
+        with patch('app.llm_client.chat.completions.create') as mock_create:
+            mock_create.return_value.choices[0].message.content = json.dumps({"ingredients": [
+                {"name": "salt", "quantity": "1", "unit": "pinch", "original_index": 0},
+                {"name": "pepper", "quantity": "1", "unit": "pinch", "original_index": 0},
+            ]})
+            results = app.normalize_ingredients_batch(items)
+
+        user_prompt = mock_create.call_args.kwargs["messages"][1]["content"]
+        self.assertEqual(user_prompt.splitlines()[1:], ["0: Salt and pepper to taste"])
+        self.assertEqual([norm["name"] for _, norm in results], ["flour", "salt", "pepper"])
+
+if __name__ == '__main__':
+    unittest.main()
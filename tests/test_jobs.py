@@ -0,0 +1,163 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+import app
+import database
+import jobs
+
+def parse_stream(body):
+    """[(event id or None, data)] for the data events of an SSE body; comments (heartbeats) are skipped."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if 'data' in fields:
+            events.append((int(fields['id']) if 'id' in fields else None, json.loads(fields['data'])))
+    return events
+
+def fake_normalize(ingredient_lists, session_id=None, pool=None, fallbacks=None):
+    return [[(item, {"name": item['raw'].split()[-1], "quantity": "1", "unit": "cup"}) for item in items]
+            for items in ingredient_lists]
+
+def chunks(*events, gate=None):
+    """A `produce` callable yielding SSE chunks, optionally waiting on `gate` before the last one."""
+    def produce():
+        for i, event in enumerate(events):
+            if gate is not None and i == len(events) - 1:
+                gate.wait(5)
+            yield f"data: {json.dumps(event)}\n\n"
+    return produce
+
+class TestScanJobs(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_jobs.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        self.app = app.app.test_client()
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_stream_replay_and_result(self):
+        with patch('app.get_ingredients_from_llm', side_effect=lambda text, **kw: ["1 cup rice"]), \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize):
+            body = self.app.post('/api/test_scan', json={"text": "Bowl\nSoup"}).data.decode()
+        live = parse_stream(body)
+        self.assertEqual(list(live[0][1]), ["job_id"])
+        job_id = live[0][1]["job_id"]
+        self.assertTrue(all(event_id is None for event_id, _ in live))
+        self.assertIn('ingredients', live[-1][1])
+
+        replay = parse_stream(self.app.get(f'/api/scans/{job_id}/events', headers={"Last-Event-ID": "2"}).data.decode())
+        self.assertEqual([event_id for event_id, _ in replay], list(range(3, len(live))))
+        self.assertEqual([data for _, data in replay], [data for _, data in live[3:]])
+
+        result = self.app.get(f'/api/scans/{job_id}/result').get_json()
+        self.assertEqual(result["status"], "done")
+        self.assertEqual(result["ingredients"], live[-1][1]["ingredients"])
+        self.assertEqual(self.app.get('/api/scans/nope/result').status_code, 404)
+        self.assertEqual(self.app.get('/api/scans/nope/events').status_code, 404)
+
+    def test_scan_outlives_its_stream(self):
+        gate = threading.Event()
+        job = jobs.start("job-1", chunks({"status": "Working"}, {"ingredients": [], "session_id": "job-1"}, gate=gate))
+        follower = job.follow()
+        self.assertEqual(next(follower), (1, {"status": "Working"}))
+        follower.close()  # the client went away
+        self.assertEqual(self.app.get('/api/scans/job-1/result').status_code, 202)
+
+        gate.set()
+        self.assertEqual(list(job.follow(after=1)), [(2, {"ingredients": [], "session_id": "job-1"})])
+        self.assertEqual(database.get_scan_job("job-1")["status"], "done")
+        self.assertEqual([seq for seq, _ in database.get_scan_events("job-1")], [1, 2])
+
+    def test_failures_are_recorded(self):
+        def produce():
+            yield f"data: {json.dumps({'status': 'Working'})}\n\n"
+            raise RuntimeError("boom")
+
+        job = jobs.start("job-2", produce)
+        events = [item[1] for item in job.follow() if item is not None]
+        self.assertIn("error", events[-1])
+        result = database.get_scan_job("job-2")
+        self.assertEqual((result["status"], result["result"]), ("failed", events[-1]))
+
+    def test_final_event_is_stored_once_compressed(self):
+        payload = {"ingredients": [{"base_name": "rice"}] * 50, "session_id": "job-8"}
+        job = jobs.start("job-8", chunks({"status": "Working"}, payload))
+        list(job.follow())
+        rows = database.get_connection().execute(
+            "SELECT seq, data FROM scan_events WHERE session_id = 'job-8' ORDER BY seq").fetchall()
+        self.assertEqual([(seq, data is None) for seq, data in rows], [(1, False), (2, True)])
+        encoding, = database.get_connection().execute("SELECT encoding FROM scan_jobs WHERE session_id = 'job-8'").fetchone()
+        self.assertEqual(encoding, "zlib")
+        self.assertEqual(database.get_scan_events("job-8"), [(1, {"status": "Working"}), (2, payload)])
+        self.assertEqual(database.get_scan_job("job-8")["result"], payload)
+
+    def test_heartbeats_while_idle(self):
+        gate = threading.Event()
+        job = jobs.start("job-3", chunks({"status": "Working"}, {"ingredients": []}, gate=gate))
+        threading.Timer(0.3, gate.set).start()
+        items = list(job.follow(heartbeat=0.05))
+        self.assertIn(None, items)
+        self.assertEqual([item[0] for item in items if item is not None], [1, 2])
+
+    def test_follow_job_running_in_another_worker(self):
+        # Only the database is shared with the worker running this job
+        database.create_scan_job("job-4")
+        database.save_scan_event("job-4", 1, {"status": "Working"})
+
+        def other_worker():
+            time.sleep(0.2)
+            database.save_scan_event("job-4", 2, {"ingredients": []})
+            database.finish_scan_job("job-4", "done", {"ingredients": []})
+            database.close_db()
+
+        threading.Thread(target=other_worker).start()
+        with patch('jobs.SCAN_POLL_INTERVAL', 0.02):
+            items = [item for item in jobs.follow("job-4", after=0, heartbeat=0.1) if item is not None]
+        self.assertEqual(items, [(1, {"status": "Working"}), (2, {"ingredients": []})])
+
+    def test_jobs_of_a_dead_worker_are_failed(self):
+        dead = subprocess.Popen([sys.executable, "-c", ""])
+        dead.wait()
+        database.create_scan_job("job-5")
+        database.save_scan_event("job-5", 1, {"status": "Working"})
+        conn = database.get_connection()
+        conn.execute("UPDATE scan_jobs SET owner_pid = ? WHERE session_id = 'job-5'", (dead.pid,))
+        conn.commit()
+        database.create_scan_job("job-6")  # this process, so still alive
+
+        self.assertEqual(jobs.fail_stale(), 1)
+        self.assertEqual(database.get_scan_job("job-6")["status"], "running")
+        result = self.app.get('/api/scans/job-5/result')
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.get_json(), {"error": database.SCAN_JOB_LOST_ERROR, "status": "failed"})
+        self.assertEqual(database.get_scan_events("job-5"), [(1, {"status": "Working"}), (2, {"error": database.SCAN_JOB_LOST_ERROR})])
+
+    def test_stalled_job_stops_its_followers(self):
+        database.create_scan_job("job-7")
+        database.save_scan_event("job-7", 1, {"status": "Working"})
+        with patch('jobs.SCAN_POLL_INTERVAL', 0.02), patch('jobs.SCAN_JOB_STALE_AFTER', 0.2):
+            self.assertEqual(self.app.get('/api/scans/job-7/result').status_code, 202)
+            items = [item for item in jobs.follow("job-7", after=0, heartbeat=0.05) if item is not None]
+        self.assertEqual(items, [(1, {"status": "Working"}), (2, {"error": database.SCAN_JOB_LOST_ERROR})])
+
+        # The worker turning up late does not undo what followers were told
+        database.finish_scan_job("job-7", "done", {"ingredients": []})
+        self.assertEqual(database.get_scan_job("job-7")["status"], "failed")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import os
+import time
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+import app
+import database
+from cache import LRUCache
+
+def llm_reply(content):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(maxsize=2, ttl=0.05)
+        cache.set("a", [])
+        self.assertEqual(cache.get("a"), [])
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_discard_where(self):
+        cache = LRUCache()
+        cache.set(("tacos", ""), 1)
+        cache.set(("tacos", "Salsa"), 2)
+        cache.set(("pizza", ""), 3)
+        self.assertEqual(cache.discard_where(lambda key: key[0] == "tacos"), 2)
+        self.assertEqual(len(cache), 1)
+
+class TestLLMTitleCache(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_llm_cache.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        app.LLM_TITLE_CACHE.clear()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.LLM_TITLE_CACHE.clear()
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_repeated_title_hits_cache(self):
+        with patch('app.llm_client.chat.completions.create', return_value=llm_reply("- tortillas\n- beef")) as mock_create:
+            first = app.get_ingredients_from_llm("Tacos")
+            second = app.get_ingredients_from_llm("  tacos ")
+
+        self.assertEqual(mock_create.call_count, 1)
+        self.assertEqual(first, ["tortillas", "beef"])
+        self.assertEqual(second, first)
+
+    def test_key_includes_ignore_recipe_and_model(self):
+        with patch('app.llm_client.chat.completions.create', return_value=llm_reply("- beef")) as mock_create:
+            app.get_ingredients_from_llm("Tacos")
+            app.get_ingredients_from_llm("Tacos", ignore_recipe="Salsa")
+            with patch('app.LLM_MODEL', "other-model"):
+                app.get_ingredients_from_llm("Tacos")
+
+        self.assertEqual(mock_create.call_count, 3)
+
+    def test_sqlite_tier_survives_memory_loss(self):
+        with patch('app.llm_client.chat.completions.create', return_value=llm_reply("")) as mock_create:
+            self.assertEqual(app.get_ingredients_from_llm("Leftovers", session_id="s1"), [])
+            app.LLM_TITLE_CACHE.clear()
+            self.assertEqual(app.get_ingredients_from_llm("Leftovers", session_id="s1"), [])
+
+        self.assertEqual(mock_create.call_count, 1)
+        self.assertEqual(database.get_cache_stats()["llm_title"], {"hits": 1, "misses": 1})
+
+    def test_failed_call_is_not_cached(self):
+        with patch('app.llm_client.chat.completions.create', side_effect=Exception("boom")):
+            with self.assertRaises(Exception):
+                app.get_ingredients_from_llm("Tacos")
+        self.assertEqual(len(app.LLM_TITLE_CACHE), 0)
+
+    def test_purge_endpoint(self):
+        with patch('app.llm_client.chat.completions.create', return_value=llm_reply("- beef")) as mock_create:
+            app.get_ingredients_from_llm("Tacos")
+            app.get_ingredients_from_llm("Tacos", ignore_recipe="Salsa")
+
+            response = self.client.post('/api/admin/llm_cache/purge', json={"title": "TACOS"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)["removed"], 2)
+
+            app.get_ingredients_from_llm("Tacos")
+
+        self.assertEqual(mock_create.call_count, 3)
+        self.assertEqual(self.client.post('/api/admin/llm_cache/purge', json={}).status_code, 400)
+
+    def test_recipe_cache_is_cleared_only_on_request(self):
+        database.cache_recipe("https://example.com/a", "A", ["salt"])
+        database.cache_recipe("https://example.com/b", "B", ["pepper"])
+        for body in ({}, {"urls": "https://example.com/a"}, {"all": "yes"}):
+            self.assertEqual(self.client.post('/api/admin/recipe_cache/invalidate', json=body).status_code, 400, body)
+
+        response = self.client.post('/api/admin/recipe_cache/invalidate', json={"url": "https://example.com/a"})
+        self.assertEqual(response.get_json()["removed"], 1)
+        response = self.client.post('/api/admin/recipe_cache/invalidate', json={"all": True})
+        self.assertEqual(response.get_json()["removed"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ import json
 import os
 import sqlite3
 from unittest.mock import patch, MagicMock
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
 import app
 import database
 
@@ -16,8 +17,12 @@ class TestAppTestMode(unittest.TestCase):
         self.app.testing = True
 
     def tearDown(self):
-        if os.path.exists(self.test_db):
-            os.remove(self.test_db)
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
 
     def test_test_scan_endpoint(self):
         # Mock LLM and scraper
@@ -48,7 +53,7 @@ class TestAppTestMode(unittest.TestCase):
             # Flatten ingredients to check names
             ing_names = [i['name'] for i in last_chunk['ingredients']]
             self.assertTrue(any('flour' in name for name in ing_names))
-            self.assertTrue(any('eggs' in name for name in ing_names))
+            self.assertTrue(any('egg' in name for name in ing_names))
 
             # 2. Test with LLM (raw text)
             mock_llm_response = MagicMock()
@@ -88,7 +93,7 @@ class TestAppTestMode(unittest.TestCase):
 
         # We don't need to mock requests.post because it shouldn't be called
         # But we can patch it just to assert it's NOT called
-        with patch('app.requests.post') as mock_post:
+        with patch('app.ticktick.session.post') as mock_post:
             response = self.app.post('/api/create_grocery_list',
                                      data=json.dumps(payload),
                                      content_type='application/json')
@@ -0,0 +1,161 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import app
+import database
+
+def llm_reply(ingredients):
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps({"ingredients": ingredients})
+    return response
+
+class TestNormalizationMemo(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_normalization.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        # These cover the LLM path, so no line takes the local parser's fast path
+        parser_patch = patch('app.PARSER_MIN_CONFIDENCE', 1.01)
+        parser_patch.start()
+        self.addCleanup(parser_patch.stop)
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_only_misses_are_sent_to_llm(self):
+        items = [{"raw": "2 cloves garlic, minced", "source": "A", "type": "scrape"}]
+        with patch('app.llm_client.chat.completions.create') as mock_create:
+            mock_create.return_value = llm_reply([
+                {"name": "garlic", "quantity": "2", "unit": "clove", "original_index": 0}
+            ])
+            app.normalize_ingredients_batch(items)
+
+            items = [
+                {"raw": "1 cup rice", "source": "B", "type": "scrape"},
+                {"raw": "2 cloves garlic, minced", "source": "B", "type": "scrape"},
+            ]
+            mock_create.return_value = llm_reply([
+                {"name": "rice", "quantity": "1", "unit": "cup", "original_index": 0}
+            ])
+            results = app.normalize_ingredients_batch(items)
+
+        user_prompt = mock_create.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("0: 1 cup rice", user_prompt)
+        self.assertNotIn("garlic", user_prompt)
+        self.assertEqual([(item["source"], norm["name"]) for item, norm in results], [("B", "rice"), ("B", "garlic")])
+        self.assertEqual(database.get_cache_stats()["normalization"], {"hits": 1, "misses": 2})
+
+    def test_full_hit_skips_llm(self):
+        items = [{"raw": "Cilantro and avocado", "source": "A", "type": "llm"}]
+        with patch('app.llm_client.chat.completions.create') as mock_create:
+            mock_create.return_value = llm_reply([
+                {"name": "cilantro", "quantity": "1", "unit": "count", "original_index": 0},
+                {"name": "avocado", "quantity": "1", "unit": "count", "original_index": 0},
+            ])
+            first = app.normalize_ingredients_batch(items)
+            second = app.normalize_ingredients_batch(items)
+
+        self.assertEqual(mock_create.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual([norm["name"] for _, norm in second], ["cilantro", "avocado"])
+
+    def test_prompt_change_invalidates_memo(self):
+        items = [{"raw": "1 cup rice", "source": "A", "type": "scrape"}]
+        with patch('app.llm_client.chat.completions.create') as mock_create:
+            mock_create.return_value = llm_reply([
+                {"name": "rice", "quantity": "1", "unit": "cup", "original_index": 0}
+            ])
+            app.normalize_ingredients_batch(items)
+            with patch('app.NORMALIZE_SYSTEM_PROMPT', app.NORMALIZE_SYSTEM_PROMPT + " Be terse."):
+                app.normalize_ingredients_batch(items)
+            with patch('app.LLM_MODEL', "other-model"):
+                app.normalize_ingredients_batch(items)
+
+        self.assertEqual(mock_create.call_count, 3)
+
+    def test_failed_llm_call_is_not_memoized(self):
+        items = [{"raw": "1 cup rice", "source": "A", "type": "scrape"},
+                 {"raw": "???", "source": "A", "type": "scrape"}]
+        with patch('app.llm_client.chat.completions.create', side_effect=Exception("boom")):
+            results = app.normalize_ingredients_batch(items)
+
+        # The parser's guess stands in for the LLM; unparseable lines keep the raw text
+        self.assertEqual(results[0][1], {"name": "rice", "quantity": "1", "unit": "cup"})
+        self.assertEqual(results[1][1], {"name": "???", "quantity": "1", "unit": "count"})
+        self.assertEqual(database.get_normalization_memo(app.prompt_key(app.NORMALIZE_SYSTEM_PROMPT), ["1 cup rice"]), {})
+
+class TestScanWideNormalization(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_normalization.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        # These cover the LLM path, so no line takes the local parser's fast path
+        parser_patch = patch('app.PARSER_MIN_CONFIDENCE', 1.01)
+        parser_patch.start()
+        self.addCleanup(parser_patch.stop)
+
+    def tearDown(self):
+        database.close_db()
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def test_chunk_by_token_budget(self):
+        items = [f"{i} cups of something" for i in range(10)]
+        chunks = app.chunk_by_token_budget(items, budget=100)
+        self.assertEqual([raw for chunk in chunks for raw in chunk], items)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            cost = sum(app.estimate_tokens(f"{i}: {raw}") + app.NORMALIZE_TOKENS_PER_ITEM for i, raw in enumerate(chunk))
+            self.assertLessEqual(cost, 100)
+
+        self.assertEqual(app.chunk_by_token_budget(["x" * 1000], budget=10), [["x" * 1000]])
+        self.assertEqual(len(app.chunk_by_token_budget(items, budget=100000)), 1)
+
+    def test_recipes_share_one_deduplicated_request(self):
+        pasta = [{"raw": "1 cup flour", "source": "Pasta", "type": "scrape"},
+                 {"raw": "2 eggs", "source": "Pasta", "type": "scrape"}]
+        bread = [{"raw": "1 cup flour", "source": "Bread", "type": "scrape"}]
+
+        with patch('app.llm_client.chat.completions.create') as mock_create:
+            mock_create.return_value = llm_reply([
+                {"name": "flour", "quantity": "1", "unit": "cup", "original_index": 0},
+                {"name": "egg", "quantity": "2", "unit": "count", "original_index": 1},
+            ])
+            results = app.normalize_ingredient_lists([pasta, [], bread])
+
+        self.assertEqual(mock_create.call_count, 1)
+        user_prompt = mock_create.call_args.kwargs["messages"][1]["content"]
+        self.assertEqual(user_prompt.count("1 cup flour"), 1)
+        self.assertEqual([[(item["source"], norm["name"]) for item, norm in r] for r in results],
+                         [[("Pasta", "flour"), ("Pasta", "egg")], [], [("Bread", "flour")]])
+
+    def test_chunks_are_mapped_back(self):
+        recipes = [[{"raw": f"{i} cup item{i}", "source": f"R{i}", "type": "scrape"}] for i in range(6)]
+
+        def reply(model, messages, response_format):
+            lines = messages[1]["content"].split("\n")[1:]
+            return llm_reply([
+                {"name": line.split()[-1], "quantity": "1", "unit": "cup", "original_index": int(line.split(":")[0])}
+                for line in lines
+            ])
+
+        with patch('app.llm_client.chat.completions.create', side_effect=reply) as mock_create, \
+             patch('app.NORMALIZE_TOKEN_BUDGET', 80):
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                results = app.normalize_ingredient_lists(recipes, pool=pool)
+
+        self.assertGreater(mock_create.call_count, 1)
+        self.assertEqual([r[0][1]["name"] for r in results], [f"item{i}" for i in range(6)])
+
+if __name__ == '__main__':
+    unittest.main()
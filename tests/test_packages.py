@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import tempfile
+import app
+import packages
+import units
+
+class TestPackages(unittest.TestCase):
+    def setUp(self):
+        self.catalog = packages.load_catalog(store="")
+
+    def test_whole_word_longest_match(self):
+        self.assertEqual(self.catalog.lookup("Brown Rice").unit, "bag")
+        self.assertIsNone(self.catalog.lookup("licorice"))  # used to match "rice"
+        self.assertIsNone(self.catalog.lookup("stockfish"))
+        self.assertEqual(self.catalog.lookup("rice noodles").unit, "box")
+        self.assertEqual(self.catalog.lookup("black bean").size.magnitude, 15)  # plural-insensitive
+        self.assertIsNone(self.catalog.lookup("cherry tomatoes"))
+
+        catalog = packages.PackageCatalog([
+            {"keywords": ["tomatoes"], "size": 1, "size_unit": "pound", "unit": "bag"},
+            {"keywords": ["crushed tomatoes"], "size": 28, "size_unit": "oz", "unit": "can"},
+        ])
+        self.assertEqual(catalog.lookup("crushed tomatoes").unit, "can")
+        self.assertEqual(catalog.lookup("roma tomatoes").unit, "bag")
+
+    def test_store_variants(self):
+        costco = packages.load_catalog(store="Costco")
+        self.assertEqual(costco.lookup("rice").size.unit, "pound")
+        self.assertEqual(costco.lookup("chicken broth").size.magnitude, 32)  # no variant, default size
+        self.assertEqual(packages.load_catalog(store="nowhere").lookup("rice").size.magnitude, 32)
+
+    def test_formatting_uses_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalog.json")
+            with open(path, "w") as f:
+                json.dump([{"keywords": ["oats"], "size": 42, "size_unit": "ounce", "unit": "canister"}], f)
+            with patch("packages._catalog", packages.load_catalog(path, store="")):
+                self.assertEqual(app.format_ingredient_quantity("rolled oats", units.Quantity(50, "ounce")),
+                                 "2 canisters rolled oats (3.12 lb)")
+                self.assertEqual(app.format_ingredient_quantity("rice", units.Quantity(32, "ounce")), "2 lb rice")
+
+if __name__ == '__main__':
+    unittest.main()
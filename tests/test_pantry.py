@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+import os
+import re
+import sqlite3
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+import app
+import database
+import pantry
+
+def legacy_is_likely_have(name):
+    """The per-keyword regex loop app.py used before the compiled matcher."""
+    name_lower = name.lower()
+    for kw in database.PANTRY_SEED:
+        if re.search(r'\b' + re.escape(kw) + r'\b', name_lower):
+            if kw == "pepper":
+                fresh_peppers = ["bell", "chili", "chile", "jalapeno", "serrano", "habanero", "poblano", "sweet", "anaheim"]
+                if any(p in name_lower for p in fresh_peppers):
+                    continue
+            return True
+    return False
+
+class TestPantry(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_pantry.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        pantry.invalidate()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        pantry.invalidate()
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_matches_legacy_classifier(self):
+        names = ["salt", "Kosher Salt", "saltines", "black pepper", "red bell pepper", "jalapeno pepper",
+                 "chili powder", "chili pepper flakes", "sweet pepper", "pepper jack", "garlic cloves",
+                 "all-purpose flour", "flour tortillas", "peanut butter", "buttermilk", "chicken stock",
+                 "stockfish", "apple cider vinegar", "fresh basil", "Thai basil", "brown sugar", "sugar snap peas",
+                 "dijon mustard", "mustard greens", "tomatoes", "", "soy sauce", "soy milk", "olive oil spray"]
+        for name in names:
+            self.assertEqual(app.is_likely_have(name), legacy_is_likely_have(name), name)
+        # Words are tokenized, so hyphenated spellings now match too
+        self.assertTrue(app.is_likely_have("olive-oil spray"))
+
+    def test_overlapping_keywords_respect_exclusions(self):
+        matcher = pantry.PantryMatcher({"garlic": [], "garlic powder": ["smoked"], "pepper": ["bell"]})
+        self.assertTrue(matcher.matches("smoked garlic powder"))  # "garlic" still applies
+        self.assertFalse(matcher.matches("bell pepper"))
+        self.assertFalse(matcher.matches("smoked paprika"))
+
+    def test_pantry_edits_recompile(self):
+        self.assertFalse(app.is_likely_have("rice"))
+        response = self.client.post('/api/pantry', json={"keyword": "Rice", "exclusions": ["wild"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(app.is_likely_have("jasmine rice"))
+        self.assertFalse(app.is_likely_have("wild rice"))
+        self.assertEqual(self.client.get('/api/pantry').get_json()["rice"], ["wild"])
+
+        self.assertEqual(self.client.delete('/api/pantry/rice').status_code, 200)
+        self.assertFalse(app.is_likely_have("jasmine rice"))
+        self.assertEqual(self.client.delete('/api/pantry/rice').status_code, 404)
+        self.assertEqual(self.client.post('/api/pantry', json={"exclusions": []}).status_code, 400)
+
+    def test_edits_from_another_connection_are_picked_up(self):
+        self.assertTrue(app.is_likely_have("salt"))
+        other = sqlite3.connect(self.test_db)
+        other.execute("DELETE FROM pantry_items WHERE keyword = 'salt'")
+        other.commit()
+        other.close()
+
+        self.assertTrue(app.is_likely_have("salt"))  # cached until the next version check
+        with patch('pantry._next_check', 0.0):  # the check interval has elapsed
+            self.assertFalse(app.is_likely_have("salt"))
+
+if __name__ == '__main__':
+    unittest.main()
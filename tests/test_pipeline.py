@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import os
+import time
+import app
+import database
+
+def run_scan(tasks, session_id="s1"):
+    statuses = []
+    final = None
+    for chunk in app.process_tasks(tasks, session_id):
+        data = json.loads(chunk[6:])
+        if 'ingredients' in data:
+            final = data
+        else:
+            statuses.append(data.get('status') or data.get('error'))
+    return statuses, final
+
+def fake_normalize(ingredient_lists, session_id=None, pool=None, fallbacks=None):
+    return [[(item, {"name": item['raw'].split()[-1], "quantity": "1", "unit": "cup"}) for item in items]
+            for items in ingredient_lists]
+
+class TestScanPipeline(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_pipeline.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_tasks_run_concurrently(self):
+        tasks = [{"id": f"t{i}", "title": f"Dish {i}", "content": "", "desc": ""} for i in range(6)]
+
+        def slow_llm(text, session_id=None, ignore_recipe=None):
+            time.sleep(0.3)
+            return [f"1 cup {text.split()[-1]}"]
+
+        with patch('app.get_ingredients_from_llm', side_effect=slow_llm), \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize), \
+             patch('app.LLM_WORKERS', 6):
+            start = time.time()
+            statuses, final = run_scan(tasks)
+            elapsed = time.time() - start
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual([g['base_name'] for g in final['ingredients']], [str(i) for i in range(6)])
+
+    def test_payload_is_in_task_order(self):
+        tasks = [
+            {"id": "t1", "title": "Slow", "content": "", "desc": ""},
+            {"id": "t2", "title": "Leftovers", "content": "", "desc": ""},
+            {"id": "t3", "title": "Fast", "content": "", "desc": ""},
+        ]
+
+        def llm(text, session_id=None, ignore_recipe=None):
+            if text == "Slow":
+                time.sleep(0.2)
+                return ["1 cup rice", "1 cup beans"]
+            if text == "Fast":
+                return ["1 cup beans"]
+            return []
+
+        with patch('app.get_ingredients_from_llm', side_effect=llm), \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize):
+            statuses, final = run_scan(tasks)
+
+        self.assertEqual([g['base_name'] for g in final['ingredients']], ["rice", "beans"])
+        beans = final['ingredients'][1]
+        self.assertEqual([i['source'] for i in beans['instances']], ["LLM: Slow", "LLM: Fast"])
+        self.assertTrue(beans['name'].endswith("cup beans"))
+        self.assertEqual(final['skipped_meals'], ["Leftovers"])
+        self.assertIn('⏩ Skipping Leftovers (no ingredients found)', statuses)
+
+    def test_scrape_then_llm_for_remaining_text(self):
+        tasks = [{"id": "t1", "title": "Monday: http://example.com/pasta", "content": "", "desc": "garlic bread"}]
+
+        mock_scraper = MagicMock()
+        mock_scraper.ingredients.return_value = ["1 cup flour"]
+        mock_scraper.title.return_value = "Pasta"
+
+        with patch('app.scrape_me', return_value=mock_scraper), \
+             patch('app.get_ingredients_from_llm', return_value=["1 cup bread"]) as mock_llm, \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize):
+            statuses, final = run_scan(tasks)
+
+        mock_llm.assert_called_once_with("garlic bread", session_id="s1", ignore_recipe="Pasta")
+        self.assertEqual([g['base_name'] for g in final['ingredients']], ["flour", "bread"])
+        self.assertTrue(statuses[0].startswith('[1/1] Scraping recipe'))
+
+    def test_cached_recipe_skips_scraper(self):
+        tasks = [{"id": "t1", "title": "http://example.com/pasta", "content": "", "desc": ""}]
+        database.cache_recipe("http://example.com/pasta", "Pasta", ["1 cup flour"])
+
+        with patch('app.scrape_me') as mock_scrape, \
+             patch('app.normalize_ingredient_lists', side_effect=fake_normalize):
+            statuses, final = run_scan(tasks)
+
+        mock_scrape.assert_not_called()
+        self.assertEqual(final['ingredients'][0]['instances'][0]['source'], "Pasta")
+
+    def test_stage_failure_reports_error(self):
+        tasks = [{"id": "t1", "title": "Tacos", "content": "", "desc": ""}]
+        with patch('app.get_ingredients_from_llm', return_value=["1 cup beans"]), \
+             patch('app.normalize_ingredient_lists', side_effect=RuntimeError("boom")):
+            statuses, final = run_scan(tasks)
+
+        self.assertIsNone(final)
+        self.assertEqual(statuses[-1], 'A critical error occurred during processing.')
+
+if __name__ == '__main__':
+    unittest.main()
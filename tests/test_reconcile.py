@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+import os
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+import app
+import database
+import reconcile
+from ticktick_client import TickTickClient
+from tests.fake_ticktick import FakeTickTick
+
+class TestReconcile(unittest.TestCase):
+    def test_plan(self):
+        open_tasks = [{"id": "1", "title": "1 gal milk", "status": 0},
+                      {"id": "2", "title": "2 cans black beans (30 oz)", "status": 0},
+                      {"id": "3", "title": "Paper towels", "status": 0},
+                      {"id": "4", "title": "3 eggs", "status": 2}]  # completed: ignored
+        creates, updates, skips = reconcile.plan(
+            ["1 gal Milk", "3 cans black beans (45 oz)", "3 eggs", "2 cup flour", "1 cup flour"], open_tasks)
+        self.assertEqual(skips, ["1 gal Milk"])
+        self.assertEqual([(task["id"], item) for task, item in updates], [("2", "3 cans black beans (45 oz)")])
+        # Each open task absorbs one line at most, so the second flour line is still created
+        self.assertEqual(creates, ["3 eggs", "2 cup flour", "1 cup flour"])
+
+    def test_keys_fold_quantities_and_plurals(self):
+        self.assertEqual(reconcile.item_key("2 cans black beans (30 oz)"), reconcile.item_key("Black bean"))
+        self.assertEqual(reconcile.item_key("3 oz parmesan cheese"), reconcile.item_key("parmesan"))
+        self.assertNotEqual(reconcile.item_key("1 cup cream"), reconcile.item_key("8 oz cream cheese"))
+
+class TestGrocerySync(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_reconcile.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        app.PROJECT_CACHE.clear()
+        self.fake = FakeTickTick(project_data={"g1": {"tasks": [
+            {"id": "old-1", "projectId": "g1", "title": "1 gal milk", "status": 0},
+            {"id": "old-2", "projectId": "g1", "title": "2 cup flour", "status": 0}]}}).__enter__()
+        patcher = patch('app.ticktick', TickTickClient(base_url=self.fake.url, sleep=lambda s: None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.app = app.app.test_client()
+        with self.app.session_transaction() as sess:
+            sess['access_token'] = 'tok'
+
+    def tearDown(self):
+        app.PROJECT_CACHE.clear()
+        self.fake.__exit__()
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_only_new_items_are_created(self):
+        session_id = database.create_session()
+        items = ["1 gal milk", "3 cup flour", "2 lb rice"]
+        data = self.app.post('/api/create_grocery_list', json={"items": items, "session_id": session_id}).get_json()
+        self.assertEqual((data["created"], data["updated"], data["skipped"]), (1, 1, 1))
+        self.assertEqual([t["title"] for t in self.fake.tasks], ["2 lb rice"])
+        self.assertEqual(self.fake.updates, ["old-2"])
+        self.assertEqual(self.fake.project_data["g1"]["tasks"][1]["title"], "3 cup flour")
+
+        # Running the same list again writes nothing
+        writes = sum(1 for method, *_ in self.fake.requests if method == "POST")
+        data = self.app.post('/api/create_grocery_list', json={"items": items}).get_json()
+        self.assertEqual((data["created"], data["updated"], data["skipped"]), (0, 0, 3))
+        self.assertEqual(sum(1 for method, *_ in self.fake.requests if method == "POST"), writes)
+
+if __name__ == '__main__':
+    unittest.main()
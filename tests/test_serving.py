@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import patch
+import os
+import runpy
+import tempfile
+import app
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestSecretKey(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "secret_key")
+        for patcher in (patch('app.SECRET_KEY_FILE', self.path), patch.dict(os.environ, {"SECRET_KEY": ""})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_generated_once_and_reused(self):
+        key = app.load_secret_key()
+        self.assertEqual(len(key), 64)
+        self.assertEqual(app.load_secret_key(), key)  # another worker, or a restart
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.listdir(self.tmp.name), ["secret_key"])
+
+    def test_generated_on_first_session_not_on_import(self):
+        self.assertFalse(os.path.exists(self.path))
+        with patch.dict(app.app.config, {"SECRET_KEY": None}):
+            with app.app.test_client().session_transaction() as session:
+                session["user"] = "someone"
+            self.assertEqual(app.app.secret_key, app.load_secret_key())
+
+    def test_environment_wins(self):
+        with patch.dict(os.environ, {"SECRET_KEY": "from-env"}):
+            self.assertEqual(app.load_secret_key(), "from-env")
+        self.assertFalse(os.path.exists(self.path))
+
+class TestGunicornConfig(unittest.TestCase):
+    def test_threaded_workers_from_environment(self):
+        with patch.dict(os.environ, {"GUNICORN_WORKERS": "3", "GUNICORN_THREADS": "4", "PORT": "8000"}):
+            config = runpy.run_path(os.path.join(REPO, "gunicorn.conf.py"))
+        self.assertEqual((config["workers"], config["threads"], config["worker_class"]), (3, 4, "gthread"))
+        self.assertEqual(config["bind"], "0.0.0.0:8000")
+        self.assertFalse(config["preload_app"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import json
+import os
 import sys
 
 # Mock modules before importing app
@@ -11,12 +12,14 @@ sys.modules['database'].create_session.return_value = 'test_session_id'
 sys.modules['openai'] = MagicMock()
 sys.modules['recipe_scrapers'] = MagicMock()
 
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+
 # Now import app
 import app
 
 class TestSkippedMeals(unittest.TestCase):
 
-    @patch('app.requests.get')
+    @patch('app.ticktick.session.get')
     @patch('app.get_ingredients_from_llm')
     @patch('app.scrape_me')
     def test_scan_meals_skips_empty_ingredients(self, mock_scraper, mock_llm, mock_get):
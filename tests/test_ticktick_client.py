@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch
+import os
+import requests
+os.environ.setdefault("SECRET_KEY", "test")  # sessions need a key; don't generate one in the working directory
+import app
+import database
+from ticktick_client import TickTickClient, retry_after_seconds
+from tests.fake_ticktick import FakeTickTick
+
+class TestTickTickClient(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeTickTick().__enter__()
+        self.addCleanup(self.fake.__exit__)
+        self.sleeps = []
+        self.client = TickTickClient(base_url=self.fake.url, max_retries=3, backoff=0.01, sleep=self.sleeps.append)
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get_projects("tok").status_code, 200)
+        self.assertEqual(self.fake.connections, 1)
+        self.assertEqual({auth for _, _, auth, _ in self.fake.requests}, {"Bearer tok"})
+
+    def test_retries_honor_retry_after(self):
+        self.fake.failures = [(429, {"Retry-After": "2"}), (503, {})]
+        res = self.client.get_projects("tok")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(self.fake.requests), 3)
+        self.assertEqual(self.sleeps[0], 2.0)
+        self.assertLessEqual(self.sleeps[1], 0.02)  # jittered backoff, attempt 1
+        stats = self.client.stats()["projects"]
+        self.assertEqual((stats["calls"], stats["retries"], stats["errors"]), (3, 2, 2))
+        self.assertEqual(stats["statuses"], {"429": 1, "503": 1, "200": 1})
+
+    def test_gives_up_after_max_retries(self):
+        self.fake.failures = [(500, {})] * 5
+        self.assertEqual(self.client.get_projects("tok").status_code, 500)
+        self.assertEqual(len(self.fake.requests), 4)
+
+    def test_posts_are_not_retried_after_server_errors(self):
+        self.fake.failures = [(500, {}), (429, {"Retry-After": "0"})]
+        self.assertEqual(self.client.create_task("tok", {"title": "Milk"}).status_code, 500)
+        self.assertEqual(self.client.create_task("tok", {"title": "Milk"}).status_code, 200)
+        self.assertEqual([t["title"] for t in self.fake.tasks], ["Milk"])
+
+    def test_timeouts(self):
+        self.fake.delay = 0.3
+        client = TickTickClient(base_url=self.fake.url, timeout=(1, 0.05), max_retries=1, sleep=self.sleeps.append)
+        with self.assertRaises(requests.Timeout):
+            client.get_projects("tok")
+        self.assertEqual(client.stats()["projects"]["errors"], 2)
+
+    def test_retry_after_formats(self):
+        self.assertEqual(retry_after_seconds("5"), 5.0)
+        self.assertEqual(retry_after_seconds("100000"), 60.0)
+        self.assertEqual(retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(retry_after_seconds("soon"))
+
+class TestAppUsesClient(unittest.TestCase):
+    def setUp(self):
+        self.test_db = "test_ticktick_client.db"
+        database.DB_FILE = self.test_db
+        database.close_db()
+        database.init_db()
+        app.PROJECT_CACHE.clear()
+        self.fake = FakeTickTick(project_data={"p1": {
+            "tasks": [{"id": "t1", "title": "Leftovers", "columnId": "c1"}],
+            "columns": [{"id": "c1", "name": "Weekly Plan"}]}}).__enter__()
+        client = TickTickClient(base_url=self.fake.url, backoff=0.01, sleep=lambda s: None)
+        patcher = patch('app.ticktick', client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.app = app.app.test_client()
+        with self.app.session_transaction() as sess:
+            sess['access_token'] = 'tok'
+
+    def tearDown(self):
+        app.PROJECT_CACHE.clear()
+        self.fake.__exit__()
+        database.close_db()
+        # A completed session starts a background backup next to the test database
+        database.wait_for_backup(timeout=5)
+        for path in [self.test_db, database.backup_path() + ".lock"] + \
+                    [database.backup_path(g) for g in range(database.BACKUP_GENERATIONS)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_scan_and_create_through_fake_server(self):
+        self.fake.failures = [(429, {"Retry-After": "0"})]
+        with patch('app.get_ingredients_from_llm', return_value=[]):
+            body = self.app.post('/api/scan_meals', json={"input_list_name": "Week's Meal Ideas"}).data.decode()
+        self.assertIn('"skipped_meals": ["Leftovers"]', body)
+
+        database.create_session()
+        response = self.app.post('/api/create_grocery_list', json={"items": ["Milk", "Eggs"], "output_list_name": "Groceries"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(t["title"] for t in self.fake.tasks), ["Eggs", "Milk"])
+        self.assertEqual({t["projectId"] for t in self.fake.tasks}, {"g1"})
+        self.assertEqual(set(self.app.get('/api/admin/ticktick_stats').get_json()),
+                         {"projects", "project_data", "create_task"})
+
+if __name__ == '__main__':
+    unittest.main()
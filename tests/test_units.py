@@ -0,0 +1,54 @@
+import unittest
+import app
+import units
+
+class TestUnits(unittest.TestCase):
+    def test_table_agrees_with_pint(self):
+        ureg = units.get_ureg()
+        for spelling in ["tsp", "tbsp", "cups", "floz", "pints", "qt", "gal", "ml", "l",
+                         "mg", "g", "kg", "oz", "ounces", "lb", "lbs"]:
+            canonical = units.lookup(spelling)
+            dimension, factor = units.UNITS[canonical]
+            expected = (1 * ureg(spelling)).to(units.BASE_UNITS[dimension]).magnitude
+            self.assertAlmostEqual(factor, expected, places=9, msg=spelling)
+        self.assertEqual(units.lookup("Tbsp"), "tablespoon")
+        self.assertIsNone(units.lookup("smidgen"))
+
+    def test_sum_stays_in_first_unit(self):
+        total = units.sum_quantities({"cup": [3, 2], "tbsp": [4, 1], "clove": [2, 1]})
+        self.assertEqual((total.unit, total.magnitude), ("cup", 3.25))
+        # Every culinary count unit shares one dimension ('bag' is a mass unit in Pint)
+        total = units.sum_quantities({"clove": [3, 3], "count": [2, 1], "bag": [1, 1]})
+        self.assertEqual((total.unit, total.magnitude), ("clove", 6))
+
+    def test_pint_fallback_for_unknown_units(self):
+        total = units.sum_quantities({"cup": [1, 1], "gill": [2, 1]})
+        self.assertIsInstance(total, units.Quantity)
+        self.assertEqual(units.format_quantity(total), ("2", "cup"))
+        total = units.sum_quantities({"smidgen": [3, 2], "clove": [2, 1]})
+        self.assertEqual((total.unit, total.magnitude), ("count", 4))
+        total = units.sum_quantities({"inch": [2, 1]})
+        self.assertEqual(units.format_quantity(total), ("2", "inch"))
+
+    def test_format_simplifies_volume_and_mass(self):
+        cases = [
+            (units.Quantity(48, "teaspoon"), ("1", "cup")),
+            (units.Quantity(6, "tablespoon"), ("6", "tbsp")),
+            (units.Quantity(2, "pinch"), ("0.12", "tsp")),
+            (units.Quantity(500, "gram"), ("1.1", "lb")),
+            (units.Quantity(8, "ounce"), ("8", "oz")),
+            (units.Quantity(10, "clove"), ("10", "clove")),
+            (units.Quantity(2, "count"), ("2", "")),
+        ]
+        for qty, expected in cases:
+            self.assertEqual(units.format_quantity(qty), expected)
+
+    def test_package_sizes(self):
+        self.assertEqual(app.format_ingredient_quantity("rice", units.Quantity(32, "ounce")), "1 bag rice (2 lb)")
+        self.assertEqual(app.format_ingredient_quantity("penne pasta", units.Quantity(20, "ounce")),
+                         "2 boxes penne pasta (1.25 lb)")
+        self.assertEqual(app.format_ingredient_quantity("rice", units.Quantity(2, "cup")), "2 cup rice")
+        self.assertEqual(app.format_ingredient_quantity("eggs", units.Quantity(0, "count")), "eggs")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import collections
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+
+API_ROOT = "https://api.ticktick.com/open/v1"
+
+# Seconds to establish a connection / to wait for a response
+TICKTICK_CONNECT_TIMEOUT = float(os.getenv("TICKTICK_CONNECT_TIMEOUT", "3.05"))
+TICKTICK_READ_TIMEOUT = float(os.getenv("TICKTICK_READ_TIMEOUT", "15"))
+# Retries after the first attempt; the backoff before retry n is up to TICKTICK_BACKOFF * 2**n seconds
+TICKTICK_MAX_RETRIES = int(os.getenv("TICKTICK_MAX_RETRIES", "3"))
+TICKTICK_BACKOFF = float(os.getenv("TICKTICK_BACKOFF", "0.5"))
+# Keep-alive connections held open to the API host (create_grocery_list posts tasks 5 at a time)
+TICKTICK_POOL_SIZE = int(os.getenv("TICKTICK_POOL_SIZE", "10"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A POST may already have been applied when it fails, so it is only retried when the server said it was not
+UNAPPLIED_STATUSES = {429, 503}
+MAX_RETRY_AFTER = 60.0
+LATENCY_SAMPLES = 200
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+class TickTickClient:
+    """
+    TickTick Open API calls over one pooled keep-alive session.
+
+    Every call has a (connect, read) timeout. Calls are retried with jittered
+    exponential backoff on connection errors and 429/5xx; a Retry-After header
+    takes precedence over the backoff. Latency and outcome are recorded per
+    endpoint (see stats()).
+    """
+
+    def __init__(self, base_url=API_ROOT, timeout=None, max_retries=None, backoff=None, pool_size=None,
+                 sleep=time.sleep):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout or (TICKTICK_CONNECT_TIMEOUT, TICKTICK_READ_TIMEOUT)
+        self.max_retries = TICKTICK_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = TICKTICK_BACKOFF if backoff is None else backoff
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size or TICKTICK_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _record(self, endpoint, elapsed, status=None, error=False, retried=False):
+        with self._lock:
+            entry = self._metrics.get(endpoint)
+            if entry is None:
+                entry = self._metrics[endpoint] = {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0,
+                                                   "max_ms": 0.0, "statuses": {},
+                                                   "recent": collections.deque(maxlen=LATENCY_SAMPLES)}
+            ms = elapsed * 1000
+            entry["calls"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["recent"].append(ms)
+            if error:
+                entry["errors"] += 1
+            if retried:
+                entry["retries"] += 1
+            if status is not None:
+                entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+
+    def stats(self):
+        """Per-endpoint call counts, statuses and latency (avg, p50/p95 of recent calls, max) in ms."""
+        with self._lock:
+            result = {}
+            for endpoint, entry in self._metrics.items():
+                recent = sorted(entry["recent"])
+                result[endpoint] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "retries": entry["retries"],
+                    "statuses": {str(k): v for k, v in entry["statuses"].items()},
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 1),
+                    "p50_ms": round(recent[len(recent) // 2], 1),
+                    "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                }
+            return result
+
+    def _delay(self, attempt, response=None):
+        if response is not None:
+            wait = retry_after_seconds(response.headers.get("Retry-After"))
+            if wait is not None:
+                return wait
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def request(self, method, path, endpoint, access_token=None, idempotent=None, **kwargs):
+        """
+        Send one API call; `endpoint` names it in the metrics. Returns the last
+        response (which may still be an error status once retries run out) and
+        raises the last connection error if no response was ever received.
+        `idempotent` overrides the method's default (POSTs that only set fields
+        are safe to repeat).
+        """
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        if access_token:
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, Authorization=f"Bearer {access_token}")
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE")
+        send = getattr(self.session, method.lower())
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = send(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                retry = idempotent and attempt < self.max_retries
+                self._record(endpoint, time.perf_counter() - start, error=True, retried=retry)
+                if not retry:
+                    raise
+                self.sleep(self._delay(attempt))
+                continue
+            status = response.status_code
+            retryable = status in (RETRY_STATUSES if idempotent else UNAPPLIED_STATUSES)
+            retry = retryable and attempt < self.max_retries
+            self._record(endpoint, time.perf_counter() - start, status=status, error=status >= 400, retried=retry)
+            if not retry:
+                return response
+            self.sleep(self._delay(attempt, response))
+
+    def get_projects(self, access_token):
+        return self.request("GET", "/project", "projects", access_token)
+
+    def get_project_data(self, access_token, project_id):
+        return self.request("GET", f"/project/{project_id}/data", "project_data", access_token)
+
+    def create_task(self, access_token, payload):
+        return self.request("POST", "/task", "create_task", access_token, json=payload)
+
+    def update_task(self, access_token, task_id, payload):
+        """Overwrite fields of an existing task; repeating it is harmless, so it retries like a GET."""
+        return self.request("POST", f"/task/{task_id}", "update_task", access_token, idempotent=True, json=payload)
+
+    def exchange_code(self, token_url, payload):
+        """OAuth authorization-code exchange (form-encoded, no bearer token)."""
+        return self.request("POST", token_url, "oauth_token", data=payload)
@@ -0,0 +1,187 @@
+import math
+
+# Culinary units as (dimension, factor to the dimension's base unit).
+# Bases: teaspoon for volume, gram for mass, count for countable items.
+UNITS = {
+    "teaspoon": ("volume", 1.0),
+    "tablespoon": ("volume", 3.0),
+    "fluid_ounce": ("volume", 6.0),
+    "cup": ("volume", 48.0),
+    "pint": ("volume", 96.0),
+    "quart": ("volume", 192.0),
+    "gallon": ("volume", 768.0),
+    "milliliter": ("volume", 1 / 4.92892159375),
+    "liter": ("volume", 1000 / 4.92892159375),
+    "pinch": ("volume", 0.0625),
+    "dash": ("volume", 0.125),
+    "milligram": ("mass", 0.001),
+    "gram": ("mass", 1.0),
+    "kilogram": ("mass", 1000.0),
+    "ounce": ("mass", 28.349523125),
+    "pound": ("mass", 453.59237),
+    "count": ("count", 1.0),
+    "clove": ("count", 1.0),  # garlic cloves
+    "can": ("count", 1.0),
+    "jar": ("count", 1.0),
+    "package": ("count", 1.0),
+    "pkg": ("count", 1.0),
+    "bunch": ("count", 1.0),
+    "head": ("count", 1.0),
+    "bag": ("count", 1.0),
+    "slice": ("count", 1.0),
+    "piece": ("count", 1.0),
+    "box": ("count", 1.0),
+    "container": ("count", 1.0),
+    "bottle": ("count", 1.0),
+    "stalk": ("count", 1.0),
+    "sprig": ("count", 1.0),
+}
+
+# Spelling -> canonical unit name. Plurals are added below.
+ALIASES = {
+    "tsp": "teaspoon", "tsps": "teaspoon",
+    "tbsp": "tablespoon", "tbsps": "tablespoon", "tbs": "tablespoon",
+    "floz": "fluid_ounce", "fl oz": "fluid_ounce",
+    "qt": "quart", "gal": "gallon",
+    "ml": "milliliter", "l": "liter",
+    "mg": "milligram", "g": "gram", "kg": "kilogram",
+    "oz": "ounce", "lb": "pound", "lbs": "pound",
+    "pinches": "pinch", "dashes": "dash", "bunches": "bunch", "boxes": "box",
+    "pkgs": "pkg",
+}
+for _name in UNITS:
+    ALIASES[_name] = _name
+    ALIASES.setdefault(_name + "s", _name)
+
+def lookup(unit):
+    """Canonical name for a unit spelling, or None if it is not in the table."""
+    if not isinstance(unit, str):
+        return None
+    return ALIASES.get(unit) or ALIASES.get(unit.strip().lower())
+
+class Quantity:
+    """A float magnitude in a table unit: the Pint-free quantity used on the hot path."""
+    __slots__ = ("magnitude", "unit")
+
+    def __init__(self, magnitude, unit):
+        self.magnitude = float(magnitude)
+        self.unit = unit
+
+    @property
+    def dimension(self):
+        return UNITS[self.unit][0]
+
+    @property
+    def base_magnitude(self):
+        return self.magnitude * UNITS[self.unit][1]
+
+    def to(self, unit):
+        if unit == self.unit:
+            return self
+        dimension, factor = UNITS[unit]
+        if dimension != self.dimension:
+            raise ValueError(f"Cannot convert from '{self.unit}' to '{unit}'")
+        return Quantity(self.base_magnitude / factor, unit)
+
+    def __bool__(self):
+        return self.magnitude != 0
+
+    def __repr__(self):
+        return f"<Quantity({self.magnitude}, '{self.unit}')>"
+
+BASE_UNITS = {"volume": "teaspoon", "mass": "gram", "count": "count"}
+
+_ureg = None
+
+def get_ureg():
+    """The Pint registry, built on first use: it is only needed for units outside UNITS."""
+    global _ureg
+    if _ureg is None:
+        from pint import UnitRegistry
+        _ureg = UnitRegistry()
+    return _ureg
+
+def sum_quantities(totals):
+    """
+    Add up {unit: [magnitude, item count]} buckets, in the first bucket's unit.
+
+    Buckets of another dimension are dropped. If every unit is in the table the
+    result is a Quantity. Otherwise the sum is done in Pint (units Pint cannot
+    parse count as one item each) and converted back where the table allows.
+    """
+    if all(lookup(unit) for unit in totals):
+        total = None
+        for unit, (magnitude, _) in totals.items():
+            qty = Quantity(magnitude, lookup(unit))
+            if total is None:
+                total = qty
+            elif qty.dimension == total.dimension:
+                total = Quantity(total.magnitude + qty.to(total.unit).magnitude, total.unit)
+        return total
+
+    ureg = get_ureg()
+    total = None
+    for unit, (magnitude, count) in totals.items():
+        canonical = lookup(unit)
+        if canonical:
+            # Table units go in by their base unit, so Pint's own meaning of a name (e.g. 'bag') never applies
+            dimension, factor = UNITS[canonical]
+            qty = magnitude * factor * ureg(BASE_UNITS[dimension])
+        else:
+            try:
+                qty = magnitude * ureg(unit)
+            except Exception as e:
+                print(f"Pint parsing error for unit {unit}: {e}")
+                qty = count * ureg.count
+        if total is None:
+            total = qty
+            first_unit = canonical or "count"
+            continue
+        try:
+            total += qty.to(total.units)
+        except Exception:
+            pass
+    return from_pint(total, first_unit)
+
+def from_pint(qty, count_unit="count"):
+    """A Pint quantity as a Quantity when its dimension is in the table; anything else as-is."""
+    try:
+        if qty.check('[volume]'):
+            return Quantity(qty.to("teaspoon").magnitude, "teaspoon")
+        if qty.check('[mass]'):
+            return Quantity(qty.to("gram").magnitude, "gram")
+        if qty.dimensionless:
+            unit = count_unit if UNITS.get(count_unit, ("",))[0] == "count" else "count"
+            return Quantity(qty.to("dimensionless").magnitude, unit)
+    except Exception:
+        pass
+    return qty
+
+def round_str(value):
+    return f"{round(float(value), 2)}".rstrip('0').rstrip('.')
+
+def format_quantity(qty):
+    """(amount, unit) strings: volumes as cup/tbsp/tsp, masses as lb/oz, counts in their own unit."""
+    if isinstance(qty, Quantity):
+        if qty.dimension == "volume":
+            tsp = qty.base_magnitude
+            if tsp >= UNITS["cup"][1]:
+                return round_str(tsp / UNITS["cup"][1]), "cup"
+            if tsp >= UNITS["tablespoon"][1]:
+                return round_str(tsp / UNITS["tablespoon"][1]), "tbsp"
+            return round_str(tsp), "tsp"
+        if qty.dimension == "mass":
+            grams = qty.base_magnitude
+            if grams >= UNITS["pound"][1]:
+                return round_str(grams / UNITS["pound"][1]), "lb"
+            return round_str(grams / UNITS["ounce"][1]), "oz"
+        return round_str(qty.magnitude), "" if qty.unit == "count" else qty.unit
+    # Pint fallback for dimensions outside the table
+    return round_str(qty.magnitude), str(qty.units)
+
+def packages_needed(qty, size):
+    """How many packages of `size` (a Quantity) cover `qty`, or None if the dimensions differ."""
+    if not isinstance(qty, Quantity) or qty.dimension != size.dimension:
+        return None
+    # Tolerance keeps exact multiples (e.g. 32 oz of a 32 oz bag) from rounding up after conversion
+    return math.ceil(qty.to(size.unit).magnitude / size.magnitude - 1e-9)